@@ -0,0 +1,161 @@
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.auth import verify_token, oauth2_scheme
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.database import models
+from app.database.session import get_db
+
+logger = logging.getLogger("app.auth")
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """نسخة خفيفة من المستخدم تُحفظ في الذاكرة المؤقتة بدل كائن ORM المرتبط بجلسة"""
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str]
+    role: models.UserRole
+    is_active: bool
+    
+    @classmethod
+    def from_model(cls, user: models.User) -> "AuthenticatedUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=user.is_active
+        )
+
+# التوكن -> اسم المستخدم (تجنب إعادة فك وتحقق JWT)
+token_cache = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+# اسم المستخدم -> AuthenticatedUser (تجنب استعلام users)
+user_cache = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+# آخر ختم رأته هذه العملية لملف AUTH_CACHE_STAMP_PATH
+_seen_stamp = None
+
+def invalidate_user(username: str):
+    """إبطال بيانات المستخدم المحفوظة (عند تعطيله أو تغيير دوره أو كلمة مروره)
+    
+    يُبطل الذاكرة المحلية ويُحدّث ملف الختم المشترك فتُفرغ بقية العمليات
+    ذاكرتها عند طلبها التالي. التعديل عبر ORM يستدعيها تلقائيًا بعد الحفظ؛ أما
+    التعديل المباشر على جدول users (SQL يدوي) فيجب أن يتبعه استدعاؤها، وإلا بقيت
+    البيانات القديمة حتى AUTH_CACHE_TTL_SECONDS.
+    """
+    user_cache.delete(username)
+    _bump_stamp()
+
+def _bump_stamp():
+    # ملف جديد في كل مرة: يتغير رقم inode حتى لو تساوى وقت التعديل (دقة نظام الملفات)
+    path = settings.AUTH_CACHE_STAMP_PATH
+    temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path.write_bytes(b"")
+        os.replace(temp_path, path)
+    except OSError:
+        logger.exception("تعذر تحديث ختم ذاكرة المستخدمين؛ العمليات الأخرى تعتمد على مدة الصلاحية")
+
+def _check_stamp():
+    """إفراغ ذاكرة المستخدمين إن عدّلت عملية أخرى مستخدمًا منذ آخر فحص"""
+    global _seen_stamp
+    try:
+        stat = os.stat(settings.AUTH_CACHE_STAMP_PATH)
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+    except FileNotFoundError:
+        stamp = None
+    if stamp != _seen_stamp:
+        user_cache.clear()
+        _seen_stamp = stamp
+
+def auth_cache_stats() -> dict:
+    return {
+        "enabled": settings.AUTH_CACHE_ENABLED,
+        "tokens": token_cache.stats(),
+        "users": user_cache.stats()
+    }
+
+@event.listens_for(models.User, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    state = inspect(target)
+    for attr in ("role", "is_active", "hashed_password", "username"):
+        history = state.attrs[attr].history
+        if history.has_changes():
+            _pending_invalidations(target).update([target.username, *(history.deleted or ())])
+            return
+
+@event.listens_for(models.User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    _pending_invalidations(target).add(target.username)
+
+def _pending_invalidations(target: models.User) -> set:
+    # الإبطال بعد الحفظ: قبله قد تقرأ عملية أخرى القيمة القديمة وتحفظها من جديد
+    return object_session(target).info.setdefault("invalidate_users", set())
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for username in session.info.pop("invalidate_users", ()):
+        invalidate_user(username)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop("invalidate_users", None)
+
+def _resolve_token(token: str) -> str:
+    """التحقق من التوكن وإرجاع اسم المستخدم"""
+    if settings.AUTH_CACHE_ENABLED:
+        username = token_cache.get(token)
+        if username is not None:
+            return username
+    
+    payload = verify_token(token)
+    if not payload or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="توكن غير صالح")
+    
+    username = payload["sub"]
+    if settings.AUTH_CACHE_ENABLED:
+        # لا يبقى التوكن في الذاكرة بعد انتهاء صلاحيته
+        remaining = payload.get("exp", 0) - datetime.now(timezone.utc).timestamp()
+        token_cache.set(token, username, ttl=remaining)
+    return username
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> AuthenticatedUser:
+    """الحصول على المستخدم الحالي"""
+    username = _resolve_token(token)
+    
+    user = None
+    if settings.AUTH_CACHE_ENABLED:
+        _check_stamp()
+        user = user_cache.get(username)
+    if user is None:
+        db_user = await db.scalar(select(models.User).where(models.User.username == username))
+        if not db_user:
+            raise HTTPException(status_code=401, detail="المستخدم غير موجود")
+        user = AuthenticatedUser.from_model(db_user)
+        if settings.AUTH_CACHE_ENABLED:
+            user_cache.set(username, user)
+    
+    if not user.is_active:
+        raise HTTPException(status_code=401, detail="الحساب معطل")
+    
+    return user
+
+def require_admin(current_user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
+    """السماح للمسؤولين فقط"""
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="هذه العملية متاحة للمسؤولين فقط")
+    return current_user
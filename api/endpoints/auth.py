@@ -1,31 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from app.database.session import get_db
 from app.core import auth as core_auth
 from app.database import models
 from app.core.config import settings
+from app.api.deps import AuthenticatedUser, require_admin, auth_cache_stats
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 @router.post("/register")
-def register_user(
+async def register_user(
     username: str,
     email: str,
     password: str,
     full_name: str = "",
     role: str = "viewer",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """تسجيل مستخدم جديد"""
     
     # التحقق من وجود المستخدم
-    existing_user = db.query(models.User).filter(
+    existing_user = await db.scalar(select(models.User).where(
         (models.User.username == username) | (models.User.email == email)
-    ).first()
+    ))
     
     if existing_user:
         raise HTTPException(
@@ -34,7 +36,7 @@ def register_user(
         )
     
     # إنشاء مستخدم جديد
-    hashed_password = core_auth.get_password_hash(password)
+    hashed_password = await core_auth.password_hasher.hash(password, username=username)
     
     user = models.User(
         username=username,
@@ -45,20 +47,25 @@ def register_user(
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     
     return {"message": "تم إنشاء الحساب بنجاح", "user_id": user.id}
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """تسجيل الدخول"""
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
+    user = await db.scalar(select(models.User).where(models.User.username == form_data.username))
     
-    if not user or not core_auth.verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await core_auth.password_hasher.verify_and_update(
+            form_data.password, user.hashed_password, username=user.username
+        )
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="اسم المستخدم أو كلمة المرور غير صحيحة",
@@ -71,6 +78,11 @@ def login(
             detail="الحساب معطل"
         )
     
+    # إعادة التشفير بالتكلفة الحالية إذا تغيرت
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     # إنشاء توكن
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = core_auth.create_access_token(
@@ -89,3 +101,8 @@ def login(
             "full_name": user.full_name
         }
     }
+
+@router.get("/cache/stats")
+def cache_stats(current_user: AuthenticatedUser = Depends(require_admin)):
+    """نسبة الإصابة في ذاكرة التوكنات والمستخدمين"""
+    return auth_cache_stats()
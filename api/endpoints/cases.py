@@ -1,50 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import String, select, insert, and_, or_, type_coerce
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+import asyncio
+import base64
+import json
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from app.database.session import get_db
+from app.database.session import get_db, AsyncSessionLocal
 from app.database import models
-from app.core.auth import verify_token
-from app.rules_engine.classifier import RuleBasedClassifier, DEFAULT_RULES
-from app.evidence.engine import EvidenceEngine
+from app.database import entities, search, transfer
+from app.database.stats import read_case_stats, count_new_cases
+from app.api.deps import AuthenticatedUser, get_current_user, require_admin
+from app.api.endpoints.jobs import job_queue
+from app.pipeline.stages import CLASSIFY_CASE
+from app.rules_engine.classifier import DEFAULT_CHUNK_SIZE
+from app.rules_engine.registry import get_registry
+from app.evidence import bundle, custody
+from app.evidence.engine import get_evidence_engine
 from app.core.config import settings
 
 router = APIRouter()
-evidence_engine = EvidenceEngine(settings.EVIDENCE_STORAGE_PATH)
-classifier = RuleBasedClassifier(DEFAULT_RULES)
+# المصنف المترجم للنسخة الفعالة من القواعد (يُستبدل دون إعادة تشغيل)
+rule_registry = get_registry()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """الحصول على المستخدم الحالي"""
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="توكن غير صالح")
-    
-    username = payload.get("sub")
-    user = db.query(models.User).filter(models.User.username == username).first()
-    
-    if not user:
-        raise HTTPException(status_code=401, detail="المستخدم غير موجود")
-    
-    return user
+# الأعمدة المعادة افتراضيًا في القائمة (بدون الأعمدة الثقيلة مثل description)
+DEFAULT_LIST_FIELDS = [
+    "case_id", "title", "status", "priority", "category",
+    "reporter_id", "assigned_to", "created_at", "updated_at", "closed_at"
+]
+LIST_FIELDS = set(models.Case.__table__.columns.keys())
+MAX_PAGE_SIZE = 200
+
+# الاستيراد والتصدير بالجملة
+TRANSFER_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+# أقصى طول لسطر NDJSON في التصنيف بالجملة (نص قضية واحدة)
+MAX_NDJSON_LINE = 1024 * 1024
 
 @router.post("/create")
-def create_case(
+async def create_case(
     title: str = Form(...),
     description: str = Form(...),
     category: Optional[str] = Form(None),
     priority: str = Form("medium"),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """إنشاء قضية جديدة"""
     
     # توليد معرف فريد للقضية
     case_id = f"CASE-{uuid.uuid4().hex[:8].upper()}"
     
-    # تحليل النص وتصنيفه
-    classification = classifier.classify_text(description)
+    # تحليل النص وتصنيفه (في طابور المعالجة عند تفعيله)
+    classification = None
+    rule_version = None
+    if not settings.PIPELINE_ENABLED:
+        classifier = await rule_registry.current_async()
+        classification = classifier.classify_text(description)
+        rule_version = classifier.version
     
     # تحديد الفئة بناءً على التحليل
     if not category and classification:
@@ -57,56 +75,433 @@ def create_case(
         description=description,
         reporter_id=current_user.id,
         priority=priority,
-        category=category or "unknown"
+        category=category or "unknown",
+        rule_version=rule_version
     )
     
     db.add(case)
-    db.commit()
-    db.refresh(case)
+    await db.commit()
+    
+    # الطابور ملف منفصل فتُضاف المهمة بعد الحفظ لا في معاملته؛ إن توقفت العملية
+    # قبل إضافتها تضيفها recover_unclassified_cases عند بدء العمال
+    if classification is None:
+        job_id = await run_in_threadpool(
+            job_queue.enqueue,
+            CLASSIFY_CASE,
+            {"case_id": case_id, "set_category": not category},
+            user_id=current_user.id,
+            max_attempts=settings.PIPELINE_MAX_ATTEMPTS
+        )
+        return {
+            "message": "تم إنشاء القضية بنجاح، والتصنيف قيد المعالجة",
+            "case_id": case.case_id,
+            "classification": None,
+            "job_id": job_id
+        }
     
     return {
         "message": "تم إنشاء القضية بنجاح",
         "case_id": case.case_id,
-        "classification": [c.__dict__ for c in classification]
+        "classification": [c.__dict__ for c in classification],
+        "rule_version": rule_version
     }
 
+async def _read_ndjson_chunks(request: Request, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """قراءة جسم الطلب سطرًا بسطر وتجميعه في دفعات دون تحميله كاملاً
+    
+    السطر الأطول من MAX_NDJSON_LINE يُتجاوز حتى نهايته ويُعاد له خطأ في موضعه،
+    فلا تتجاوز الذاكرة حجم سطر واحد مهما كان الطلب.
+    """
+    chunk = []
+    line_number = 0
+    
+    async def lines():
+        # None مكان السطر الطويل؛ يُبحث عن الفاصل في البيانات الجديدة فقط
+        buffer = bytearray()
+        too_long = False
+        async for data in request.stream():
+            start = 0
+            while True:
+                end = data.find(b"\n", start)
+                if end < 0:
+                    if not too_long:
+                        buffer += data[start:]
+                        if len(buffer) > MAX_NDJSON_LINE:
+                            too_long = True
+                            buffer.clear()
+                    break
+                if not too_long:
+                    buffer += data[start:end]
+                yield None if too_long or len(buffer) > MAX_NDJSON_LINE else bytes(buffer)
+                buffer.clear()
+                too_long = False
+                start = end + 1
+        if too_long:
+            yield None
+        elif buffer:
+            yield bytes(buffer)
+    
+    async for line in lines():
+        line_number += 1
+        if line is None:
+            chunk.append((line_number, None, None, f"السطر أطول من {MAX_NDJSON_LINE} بايت"))
+        elif not line.strip():
+            continue
+        else:
+            try:
+                item = json.loads(line)
+                if isinstance(item, str):
+                    item = {"text": item}
+                text = item["text"]
+                if not isinstance(text, str):
+                    raise ValueError
+                chunk.append((line_number, item.get("id"), text, None))
+            except (ValueError, KeyError, TypeError):
+                chunk.append((line_number, None, None, "سطر غير صالح"))
+        
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    
+    if chunk:
+        yield chunk
+
+@router.post("/classify/batch")
+async def classify_batch(
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """تصنيف دفعة من النصوص بصيغة NDJSON وإرجاع النتائج كتدفق NDJSON"""
+    
+    # نسخة واحدة من القواعد لكامل الدفعة حتى لو فُعّلت نسخة جديدة أثناءها
+    classifier = await rule_registry.current_async()
+    
+    async def results():
+        async for chunk in _read_ndjson_chunks(request):
+            texts = [text for _, _, text, error in chunk if error is None]
+            # التصنيف في مجمع العمليات حتى لا تتوقف حلقة الأحداث
+            classified = iter(await asyncio.wrap_future(classifier.submit_batch(texts)))
+            
+            for line_number, item_id, _, error in chunk:
+                if error:
+                    row = {"line": line_number, "error": error}
+                else:
+                    row = {
+                        "line": line_number,
+                        "id": item_id,
+                        "classification": [c.__dict__ for c in next(classified)],
+                        "rule_version": classifier.version
+                    }
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+def _encode_cursor(created_at, pk: int) -> str:
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, as_text: bool):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, pk = json.loads(raw)
+        if not isinstance(created_at, str):
+            raise ValueError
+        return (created_at if as_text else datetime.fromisoformat(created_at)), int(pk)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+
 @router.get("/")
-def get_cases(
+async def get_cases(
     status: Optional[str] = None,
     priority: Optional[str] = None,
     category: Optional[str] = None,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """الحصول على القضايا"""
+    """الحصول على القضايا مقسمة إلى صفحات (keyset) مرتبة بالأحدث
+    
+    fields: قائمة أعمدة مفصولة بفواصل، مثل fields=case_id,title,description
+    cursor: قيمة next_cursor من الصفحة السابقة
+    """
+    
+    # تحديد الأعمدة المطلوبة
+    selected = DEFAULT_LIST_FIELDS
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = set(selected) - LIST_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"حقول غير معروفة: {', '.join(sorted(unknown))}")
+    
+    # SQLite يخزن التاريخ نصًا بصيغ مختلفة حسب مصدره (func.now() بلا أجزاء الثانية،
+    # والإدراج من بايثون بها) ويقارنه كنص، فالمؤشر يحمل القيمة المخزنة كما هي
+    # ويُقارن بها نصًا، لا تاريخًا يُعاد تنسيقه عند الربط فلا يساويها
+    as_text = db.bind.dialect.name == "sqlite"
+    created_at_key = type_coerce(models.Case.created_at, String) if as_text else models.Case.created_at
     
-    query = db.query(models.Case)
+    # created_at و id مطلوبان دائمًا لبناء المؤشر
+    columns = [created_at_key.label("cursor_created_at"), models.Case.id]
+    columns += [getattr(models.Case, f) for f in selected if f != "id"]
+    query = select(*columns)
     
     # التصفية حسب الصلاحيات
     if current_user.role in [models.UserRole.VIEWER, models.UserRole.REPORTER]:
-        query = query.filter(models.Case.reporter_id == current_user.id)
+        query = query.where(models.Case.reporter_id == current_user.id)
     
     # تطبيق الفلاتر
     if status:
-        query = query.filter(models.Case.status == status)
+        query = query.where(models.Case.status == status)
     if priority:
-        query = query.filter(models.Case.priority == priority)
+        query = query.where(models.Case.priority == priority)
+    if category:
+        query = query.where(models.Case.category == category)
+    
+    # متابعة الصفحة بعد آخر (created_at, id) دون OFFSET
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor, as_text)
+        query = query.where(or_(
+            created_at_key < cursor_created_at,
+            and_(created_at_key == cursor_created_at, models.Case.id < cursor_id)
+        ))
+    
+    query = query.order_by(created_at_key.desc(), models.Case.id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    cases = [{f: row._mapping[f] for f in selected} for row in rows]
+    next_cursor = _encode_cursor(rows[-1].cursor_created_at, rows[-1].id) if has_more else None
+    
+    return {"cases": cases, "next_cursor": next_cursor}
+
+@router.get("/search")
+async def search_cases(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    prefix: bool = True,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """بحث نصي مرتب حسب الصلة في عناوين القضايا وأوصافها ووسومها"""
+    
+    restrict = current_user.role in [models.UserRole.VIEWER, models.UserRole.REPORTER]
+    
+    if db.bind.dialect.name != "sqlite":
+        # قواعد البيانات الأخرى: بحث جزئي بسيط دون ترتيب حسب الصلة
+        # autoescape: % و _ في نص المستخدم حروف عادية لا محارف بدل
+        query = select(
+            models.Case.case_id, models.Case.title, models.Case.status,
+            models.Case.priority, models.Case.category, models.Case.created_at
+        ).where(or_(
+            models.Case.title.icontains(q, autoescape=True),
+            models.Case.description.icontains(q, autoescape=True)
+        ))
+        if restrict:
+            query = query.where(models.Case.reporter_id == current_user.id)
+        rows = (await db.execute(query.order_by(models.Case.created_at.desc()).limit(limit))).all()
+        return {"results": [dict(row._mapping) for row in rows]}
+    
+    match = search.build_match_query(q, prefix=prefix)
+    if match is None:
+        return {"results": []}
+    
+    params = {"match": match, "limit": limit}
+    if restrict:
+        params["reporter_id"] = current_user.id
+    rows = (await db.execute(search.search_query(restrict), params)).all()
+    
+    return {"results": [dict(row._mapping) for row in rows]}
+
+def _bucket_start(day, bucket: str):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+@router.get("/stats")
+async def get_case_stats(
+    days: int = Query(30, ge=1, le=366),
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """إحصائيات القضايا حسب الحالة والأولوية والفئة والمكلف بها
+    
+    totals: العدد الحالي لكل قيمة
+    series: عدد القضايا التي دخلت كل قيمة في كل فترة خلال آخر days يوم
+    """
+    
+    # الإحصائيات تشمل كل القضايا، فهي لفريق العمل فقط
+    if current_user.role in [models.UserRole.VIEWER, models.UserRole.REPORTER]:
+        raise HTTPException(status_code=403, detail="غير مصرح لك بعرض الإحصائيات")
+    
+    totals, rows = await read_case_stats(db, days)
+    
+    series = {dimension: {} for dimension in totals}
+    for day, dimension, value, count in rows:
+        key = (_bucket_start(day, bucket).isoformat(), value)
+        points = series.setdefault(dimension, {})
+        points[key] = points.get(key, 0) + count
+    
+    return {
+        "total_cases": sum(totals.get("status", {}).values()),
+        "totals": totals,
+        "bucket": bucket,
+        "series": {
+            dimension: [{"bucket": b, "value": v, "count": c} for (b, v), c in sorted(points.items())]
+            for dimension, points in series.items()
+        }
+    }
+
+def _insert_batch_sync(session, rows: List[dict]):
+    """إدراج دفعة بعبارة executemany واحدة ثم تحديث الفهارس والإحصائيات"""
+    table = models.Case.__table__
+    connection = session.connection()
+    ids = connection.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    # الإدراج عبر Core لا يمر بأحداث ORM، لذا يُحدَّث الفهارس والإحصائيات هنا
+    indexed_rows = [dict(row, id=pk) for row, pk in zip(rows, ids)]
+    search.index_rows(connection, indexed_rows)
+    entities.index_rows(connection, indexed_rows)
+    count_new_cases(connection, rows)
+
+async def _import_batch(db: AsyncSession, batch: List[tuple], classifier, errors: List[dict]) -> int:
+    """تصنيف دفعة وإدراجها وحفظها، وإرجاع عدد القضايا المضافة"""
+    # استبعاد المعرفات الموجودة مسبقًا أو المكررة داخل الدفعة
+    existing = set((await db.scalars(
+        select(models.Case.case_id).where(models.Case.case_id.in_([row["case_id"] for _, row in batch]))
+    )).all())
+    lines, rows = [], []
+    for line_number, row in batch:
+        if row["case_id"] in existing:
+            errors.append({"line": line_number, "error": f"القضية {row['case_id']} موجودة مسبقًا"})
+            continue
+        existing.add(row["case_id"])
+        lines.append(line_number)
+        rows.append(row)
+    if not rows:
+        return 0
+    
+    # تصنيف القضايا التي بلا فئة في مجمع العمليات دفعة واحدة
+    unclassified = [row for row in rows if not row["category"]]
+    if unclassified:
+        results = await asyncio.wrap_future(
+            classifier.submit_batch([row["description"] or "" for row in unclassified])
+        )
+        for row, classification in zip(unclassified, results):
+            row["category"] = classification[0].category if classification else "unknown"
+            row["rule_version"] = classifier.version
+    
+    try:
+        await db.run_sync(_insert_batch_sync, rows)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        errors.extend({"line": line, "error": "تعارض مع بيانات موجودة، لم تُحفظ الدفعة"} for line in lines)
+        return 0
+    
+    return len(rows)
+
+@router.post("/import")
+async def import_cases(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    current_user: AuthenticatedUser = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """استيراد قضايا بالجملة من جسم الطلب (NDJSON أو CSV أو Parquet)
+    
+    يُقرأ الجسم بشكل متدفق ويُصنف ويُدرج ويُحفظ كل TRANSFER_BATCH_SIZE سجل.
+    الحقول: title (مطلوب)، description، category، priority، status، tags،
+    assigned_to، created_at، closed_at، case_id (يُحفظ عند الترحيل).
+    """
+    if format == "parquet" and not transfer.PARQUET_AVAILABLE:
+        raise HTTPException(status_code=400, detail="صيغة Parquet تتطلب تثبيت pyarrow")
+    
+    # نسخة واحدة من القواعد لكامل الاستيراد
+    classifier = await rule_registry.current_async()
+    inserted = 0
+    errors: List[dict] = []
+    batch: List[tuple] = []
+    
+    async for line_number, record, error in transfer.read_records(request.stream(), format, TRANSFER_BATCH_SIZE):
+        if error is None:
+            try:
+                batch.append((line_number, transfer.parse_record(record, current_user.id)))
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            errors.append({"line": line_number, "error": error})
+        
+        if len(batch) >= TRANSFER_BATCH_SIZE:
+            inserted += await _import_batch(db, batch, classifier, errors)
+            batch = []
+    
+    if batch:
+        inserted += await _import_batch(db, batch, classifier, errors)
+    
+    return {
+        "message": "اكتمل الاستيراد",
+        "inserted": inserted,
+        "failed": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS],
+        "rule_version": classifier.version
+    }
+
+@router.get("/export")
+async def export_cases(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """تصدير القضايا بشكل متدفق دون تحميل النتيجة كاملة في الذاكرة"""
+    if format == "parquet" and not transfer.PARQUET_AVAILABLE:
+        raise HTTPException(status_code=400, detail="صيغة Parquet تتطلب تثبيت pyarrow")
+    
+    query = select(*[getattr(models.Case, field) for field in transfer.EXPORT_FIELDS])
+    if status:
+        query = query.where(models.Case.status == status)
     if category:
-        query = query.filter(models.Case.category == category)
+        query = query.where(models.Case.category == category)
+    if created_from:
+        query = query.where(models.Case.created_at >= created_from)
+    if created_to:
+        query = query.where(models.Case.created_at <= created_to)
+    query = query.order_by(models.Case.id).execution_options(yield_per=TRANSFER_BATCH_SIZE)
     
-    cases = query.order_by(models.Case.created_at.desc()).all()
+    async def batches():
+        # جلسة خاصة بالتدفق تبقى مفتوحة حتى آخر صف (مؤشر من جهة الخادم)
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(query)
+            async for partition in result.partitions():
+                yield [transfer.to_record(row._mapping) for row in partition]
     
-    return {"cases": cases}
+    return StreamingResponse(
+        transfer.encode_records(batches(), format),
+        media_type=transfer.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="cases.{format}"'}
+    )
 
 @router.get("/{case_id}")
-def get_case(
+async def get_case(
     case_id: str,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """الحصول على قضية محددة"""
     
-    case = db.query(models.Case).filter(models.Case.case_id == case_id).first()
+    case = await db.scalar(select(models.Case).where(models.Case.case_id == case_id))
     
     if not case:
         raise HTTPException(status_code=404, detail="القضية غير موجودة")
@@ -117,3 +512,77 @@ def get_case(
         raise HTTPException(status_code=403, detail="غير مصرح لك بالوصول لهذه القضية")
     
     return {"case": case}
+
+@router.get("/{case_id}/bundle")
+async def export_case_bundle(
+    case_id: str,
+    format: str = Query("zip", pattern="^(zip|tar)$"),
+    compress: bool = False,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """تنزيل كل أدلة القضية في أرشيف واحد مع بيان بصمات موقّع
+    
+    يُبنى الأرشيف أثناء الإرسال بذاكرة ثابتة ودون ملف مؤقت. compress=true
+    يضغط ملفات ZIP (غير مفيد غالبًا للصور والفيديو).
+    """
+    case = await db.scalar(select(models.Case).where(models.Case.case_id == case_id))
+    if not case:
+        raise HTTPException(status_code=404, detail="القضية غير موجودة")
+    
+    if (current_user.role in [models.UserRole.VIEWER, models.UserRole.REPORTER] and
+        case.reporter_id != current_user.id):
+        raise HTTPException(status_code=403, detail="غير مصرح لك بالوصول لهذه القضية")
+    
+    rows = (await db.execute(
+        select(
+            models.Evidence.evidence_id, models.Evidence.type, models.Evidence.file_hash,
+            models.Evidence.source_url, models.Evidence.collected_at,
+            models.Evidence.metadata_.label("evidence_metadata")
+        )
+        .where(models.Evidence.case_id == case.id)
+        .order_by(models.Evidence.id)
+    )).all()
+    
+    def resolve_items():
+        index = get_evidence_engine().index
+        items = []
+        for row in rows:
+            entry = index.get(row.evidence_id)
+            items.append({
+                "evidence_id": row.evidence_id,
+                "type": row.type,
+                "hash": row.file_hash,
+                "source_url": row.source_url,
+                "collected_at": row.collected_at.isoformat() if row.collected_at else None,
+                "file_path": entry["file_path"] if entry else None,
+                "file_size": (row.evidence_metadata or {}).get("file_size"),
+                "meta_path": entry["meta_path"] if entry else None
+            })
+        return items
+    
+    items = await run_in_threadpool(resolve_items)
+    signer = bundle.get_signer()
+    
+    # تسجيل التسليم في سجل العهدة لكل دليل
+    custody_log = custody.get_custody_log()
+    for item in items:
+        custody_log.append(custody.EXPORT, evidence_id=item["evidence_id"], case_id=case.case_id,
+                           user_id=current_user.id, details={"format": format})
+    
+    media_type, extension = bundle.FORMATS[format]
+    return StreamingResponse(
+        bundle.stream_bundle(
+            format,
+            {"case_id": case.case_id, "title": case.title, "status": case.status.value, "category": case.category},
+            items,
+            signer,
+            generated_by=current_user.username,
+            compress=compress
+        ),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{case.case_id}{extension}"',
+            "X-Bundle-Key-Id": await run_in_threadpool(signer.key_id)
+        }
+    )
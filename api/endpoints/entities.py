@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.session import get_db
+from app.database import models
+from app.api.deps import AuthenticatedUser, get_current_user
+from app.rules_engine.entities import normalize_query
+
+router = APIRouter()
+
+@router.get("/{value:path}/cases")
+async def get_entity_cases(
+    value: str,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """القضايا التي تذكر كيانًا (هاتف، بريد، حساب، رابط، نطاق، محفظة) بأي صيغة كُتب بها
+    
+    القيمة تُوحَّد كما عند الفهرسة، فـ 00966501234567 يطابق +966 50 123 4567.
+    الروابط تُرسل مرمّزة (? ← %3F)، والبحث بنطاق يعيد كل روابطه وعناوين بريده.
+    """
+    values = normalize_query(value)
+    if not values:
+        raise HTTPException(status_code=400, detail="القيمة المطلوبة فارغة")
+    
+    entity = models.CaseEntity
+    matched = select(entity.case_id).where(entity.value.in_(values)).distinct().subquery()
+    query = select(
+        models.Case.id, models.Case.case_id, models.Case.title, models.Case.status,
+        models.Case.priority, models.Case.category, models.Case.created_at
+    ).join(matched, matched.c.case_id == models.Case.id)
+    if current_user.role in [models.UserRole.VIEWER, models.UserRole.REPORTER]:
+        query = query.where(models.Case.reporter_id == current_user.id)
+    cases = (await db.execute(
+        query.order_by(models.Case.created_at.desc(), models.Case.id.desc()).limit(limit)
+    )).all()
+    
+    # مواضع الذكر في كل قضية (الوصف أو رابط دليل معين)
+    matches = {}
+    if cases:
+        rows = (await db.execute(
+            select(entity.case_id, entity.value, entity.kind, entity.source)
+            .where(entity.value.in_(values), entity.case_id.in_([case.id for case in cases]))
+        )).all()
+        for row in rows:
+            matches.setdefault(row.case_id, []).append(
+                {"value": row.value, "kind": row.kind, "source": row.source}
+            )
+    
+    return {
+        "value": value,
+        "normalized": values,
+        "cases": [
+            {
+                "case_id": case.case_id,
+                "title": case.title,
+                "status": case.status,
+                "priority": case.priority,
+                "category": case.category,
+                "created_at": case.created_at,
+                "matches": matches.get(case.id, [])
+            }
+            for case in cases
+        ]
+    }
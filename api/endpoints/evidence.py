@@ -1,95 +1,421 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
-import aiofiles
+from fastapi import APIRouter, Depends, HTTPException, Form, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Optional
+from datetime import datetime, timezone
+import asyncio
+import time
+from pathlib import Path
 
-from app.database.session import get_db
+from app.database.session import get_db, SessionLocal
 from app.database import models
-from app.core.auth import verify_token, oauth2_scheme
-from app.evidence.engine import EvidenceEngine
+from app.database import entities  # noqa: F401 - فهرسة كيانات روابط الأدلة عند إضافتها
+from app.api.deps import AuthenticatedUser, get_current_user, require_admin
+from app.api.multipart import StreamingForm, check_content_length
+from app.api.endpoints.jobs import job_queue
+from app.evidence.engine import EvidenceTooLargeError, get_evidence_engine
+from app.evidence.uploads import UploadSessionError, UploadIntegrityError, get_upload_sessions
+from app.evidence import custody
+from app.evidence.audit import IntegrityAuditor
+from app.evidence.download import build_file_response
+from app.pipeline.stages import EVIDENCE_STAGES
 from app.core.config import settings
 
 router = APIRouter()
-evidence_engine = EvidenceEngine(settings.EVIDENCE_STORAGE_PATH)
+auditor = IntegrityAuditor(
+    SessionLocal,
+    settings.AUDIT_STATE_PATH,
+    workers=settings.AUDIT_WORKERS,
+    bytes_per_second=settings.AUDIT_MAX_BYTES_PER_SEC,
+    batch_size=settings.AUDIT_BATCH_SIZE
+)
+custody_log = custody.get_custody_log()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """الحصول على المستخدم الحالي"""
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="توكن غير صالح")
+async def get_writable_case(case_id: str, current_user: AuthenticatedUser, db: AsyncSession) -> models.Case:
+    """التحقق من وجود القضية ومن صلاحية إضافة أدلة إليها"""
+    case = await db.scalar(select(models.Case).where(models.Case.case_id == case_id))
+    if not case:
+        raise HTTPException(status_code=404, detail="القضية غير موجودة")
+    
+    if current_user.role in [models.UserRole.VIEWER, models.UserRole.REPORTER]:
+        if case.reporter_id != current_user.id:
+            raise HTTPException(status_code=403, detail="غير مصرح لك بإضافة أدلة لهذه القضية")
+    
+    return case
+
+async def enqueue_evidence_stages(metadata: dict, current_user: AuthenticatedUser) -> dict:
+    """جدولة مراحل معالجة الدليل (الختم، الصورة المصغرة، بصمة التشابه)"""
+    if not settings.PIPELINE_ENABLED:
+        return {}
+    
+    payload = {"evidence_id": metadata["evidence_id"], "case_id": metadata["case_id"]}
     
-    username = payload.get("sub")
-    user = db.query(models.User).filter(models.User.username == username).first()
+    def enqueue_all():
+        return {
+            stage: job_queue.enqueue(
+                stage, payload, user_id=current_user.id, max_attempts=settings.PIPELINE_MAX_ATTEMPTS
+            )
+            for stage in EVIDENCE_STAGES
+        }
     
-    if not user:
-        raise HTTPException(status_code=401, detail="المستخدم غير موجود")
+    return await run_in_threadpool(enqueue_all)
+
+async def record_custody(action: str, evidence_id: str, case_id: str, current_user: AuthenticatedUser,
+                         details: Optional[dict] = None, wait: bool = True) -> Optional[dict]:
+    """تسجيل إجراء في سجل العهدة؛ الانتظار يعني مشاركة fsync الدفعة التالية"""
+    future = custody_log.append(action, evidence_id=evidence_id, case_id=case_id,
+                                user_id=current_user.id, details=details)
+    if not wait:
+        return None
+    return await asyncio.wrap_future(future)
+
+def get_upload_session(upload_id: str, current_user: AuthenticatedUser) -> dict:
+    """الحصول على جلسة رفع تخص المستخدم الحالي"""
+    try:
+        session = get_upload_sessions().get_session(upload_id)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     
-    return user
+    if session["user_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="غير مصرح لك بالوصول لجلسة الرفع هذه")
+    
+    return session
+
+def required_field(fields: dict, name: str) -> str:
+    value = fields.get(name)
+    if not value:
+        raise HTTPException(status_code=422, detail=f"الحقل {name} مطلوب")
+    return value
+
+def multipart_schema(properties: dict, required: list) -> dict:
+    """وصف جسم multipart لنقاط النهاية التي تقرأ الطلب مباشرة دون Form/File"""
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "properties": properties, "required": required
+    }}}}}
 
-@router.post("/upload")
+# ترتيب الخصائص هو ترتيب الإرسال المطلوب (case_id قبل file)
+UPLOAD_FORM_SCHEMA = multipart_schema({
+    "case_id": {"type": "string"},
+    "evidence_type": {"type": "string"},
+    "source_url": {"type": "string"},
+    "file": {"type": "string", "format": "binary"}
+}, ["case_id", "evidence_type", "file"])
+PART_FORM_SCHEMA = multipart_schema({
+    "sha256": {"type": "string"},
+    "file": {"type": "string", "format": "binary"}
+}, ["file"])
+
+@router.post("/upload", openapi_extra=UPLOAD_FORM_SCHEMA)
 async def upload_evidence(
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """رفع أدلة جديدة (الحقول: case_id وevidence_type وsource_url والملف file)
+    
+    يُقرأ الجسم أثناء وصوله ويُكتب الملف إلى المخزن مباشرة، فيُرفض فور تجاوز
+    الحد المسموح بدل انتظار استلامه كاملاً في ملف مؤقت. يجب أن يسبق case_id
+    الملف في النموذج: تُفحص القضية والصلاحية قبل كتابة أي بايت منه.
+    """
+    
+    check_content_length(request, settings.MAX_FILE_SIZE)
+    engine = get_evidence_engine()
+    started = time.perf_counter()
+    fields = {}
+    case = None
+    received = None
+    try:
+        async for part in StreamingForm(request):
+            if part.name == "file" and received is None:
+                if "case_id" not in fields:
+                    raise HTTPException(status_code=422, detail="يجب إرسال الحقل case_id قبل الملف")
+                # التحقق من وجود القضية والصلاحيات قبل استلام الملف
+                case = await get_writable_case(fields["case_id"], current_user, db)
+                received = await engine.receive_stream(part, settings.MAX_FILE_SIZE)
+            elif part.name != "file":
+                fields[part.name] = await part.text()
+        
+        if received is None:
+            raise HTTPException(status_code=422, detail="الحقل file مطلوب")
+        # القضية التي فُحصت، لا case_id آخر أُرسل بعد الملف
+        case_id = case.case_id
+        evidence_type = required_field(fields, "evidence_type")
+        source_url = fields.get("source_url") or None
+    except EvidenceTooLargeError:
+        raise HTTPException(status_code=400, detail="حجم الملف يتجاوز الحد المسموح")
+    except BaseException:
+        if received is not None:
+            received[0].unlink(missing_ok=True)
+        raise
+    
+    metadata = await engine.store_received(
+        received, case_id, evidence_type, source_url,
+        index_similarity=not settings.PIPELINE_ENABLED,
+        started=started
+    )
+    
+    # حفظ في قاعدة البيانات
+    evidence = models.Evidence(
+        evidence_id=metadata["evidence_id"],
+        case_id=case.id,
+        type=evidence_type,
+        file_hash=metadata["hash"],
+        file_path=metadata["file_path"],
+        source_url=source_url,
+        metadata_=metadata
+    )
+    
+    db.add(evidence)
+    await db.commit()
+    
+    entry = await record_custody(custody.UPLOAD, metadata["evidence_id"], metadata["case_id"], current_user, {
+        "hash": metadata["hash"], "file_size": metadata["file_size"]
+    })
+    
+    return {
+        "message": "تم رفع الدليل بنجاح",
+        "evidence_id": metadata["evidence_id"],
+        "hash": metadata["hash"],
+        "custody": entry,
+        "jobs": await enqueue_evidence_stages(metadata, current_user)
+    }
+
+@router.post("/uploads")
+async def initiate_upload(
     case_id: str = Form(...),
     evidence_type: str = Form(...),
     source_url: Optional[str] = Form(None),
-    file: UploadFile = File(...),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    sha256: Optional[str] = Form(None),
+    total_size: Optional[int] = Form(None),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """رفع أدلة جديدة"""
+    """بدء جلسة رفع مجزأ قابلة للاستئناف"""
     
-    # التحقق من وجود القضية
-    case = db.query(models.Case).filter(models.Case.case_id == case_id).first()
-    if not case:
-        raise HTTPException(status_code=404, detail="القضية غير موجودة")
-    
-    # التحقق من الصلاحيات
-    if current_user.role in [models.UserRole.VIEWER, models.UserRole.REPORTER]:
-        if case.reporter_id != current_user.id:
-            raise HTTPException(status_code=403, detail="غير مصرح لك بإضافة أدلة لهذه القضية")
-    
-    # قراءة الملف
-    content = await file.read()
+    await get_writable_case(case_id, current_user, db)
     
-    # التحقق من حجم الملف
-    if len(content) > settings.MAX_FILE_SIZE:
+    if total_size is not None and total_size > settings.MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="حجم الملف يتجاوز الحد المسموح")
     
-    # تخزين الدليل
-    metadata = evidence_engine.store_evidence(
-        file_content=content,
+    session = get_upload_sessions().initiate(
         case_id=case_id,
         evidence_type=evidence_type,
-        source_url=source_url
+        user_id=current_user.id,
+        source_url=source_url,
+        expected_hash=sha256,
+        total_size=total_size
     )
     
-    # حفظ في قاعدة البيانات
+    return {"upload_id": session["upload_id"]}
+
+@router.put("/uploads/{upload_id}/parts/{part_number}", openapi_extra=PART_FORM_SCHEMA)
+async def upload_part(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """رفع جزء مرقّم (يمكن رفع الأجزاء بالتوازي وإعادة رفع أي جزء)"""
+    
+    get_upload_session(upload_id, current_user)
+    check_content_length(request, settings.MAX_FILE_SIZE)
+    
+    sessions = get_upload_sessions()
+    fields = {}
+    received = None
+    try:
+        async for form_part in StreamingForm(request):
+            if form_part.name == "file" and received is None:
+                received = await sessions.receive_part(
+                    upload_id, part_number, form_part, max_size=settings.MAX_FILE_SIZE
+                )
+            elif form_part.name != "file":
+                fields[form_part.name] = await form_part.text()
+        if received is None:
+            raise HTTPException(status_code=422, detail="الحقل file مطلوب")
+        
+        # sha256 قد يصل قبل الملف أو بعده، فتُطابق البصمة بعد قراءة النموذج كله
+        part = await run_in_threadpool(
+            sessions.commit_part, upload_id, part_number, received,
+            expected_hash=fields.get("sha256"), max_size=settings.MAX_FILE_SIZE
+        )
+    except EvidenceTooLargeError:
+        raise HTTPException(status_code=400, detail="حجم الملف يتجاوز الحد المسموح")
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadIntegrityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    finally:
+        if received is not None:
+            received[0].unlink(missing_ok=True)
+    
+    return part
+
+@router.get("/uploads/{upload_id}/parts")
+def list_upload_parts(
+    upload_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """الأجزاء المستلمة في جلسة الرفع"""
+    
+    get_upload_session(upload_id, current_user)
+    return {"upload_id": upload_id, "parts": get_upload_sessions().list_parts(upload_id)}
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    sha256: Optional[str] = Form(None),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """إكمال الرفع: دمج الأجزاء والتحقق من البصمة ثم تسجيل الدليل"""
+    
+    session = get_upload_session(upload_id, current_user)
+    case = await get_writable_case(session["case_id"], current_user, db)
+    
+    try:
+        # دمج الأجزاء عملية قراءة وكتابة طويلة، لذا تُنفذ خارج حلقة الأحداث
+        metadata = await run_in_threadpool(
+            get_upload_sessions().complete,
+            upload_id,
+            expected_hash=sha256,
+            max_size=settings.MAX_FILE_SIZE,
+            index_similarity=not settings.PIPELINE_ENABLED
+        )
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadIntegrityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
     evidence = models.Evidence(
         evidence_id=metadata["evidence_id"],
         case_id=case.id,
-        type=evidence_type,
+        type=metadata["type"],
         file_hash=metadata["hash"],
         file_path=metadata["file_path"],
-        source_url=source_url,
-        metadata=metadata
+        source_url=metadata["source_url"],
+        metadata_=metadata
     )
     
     db.add(evidence)
-    db.commit()
+    await db.commit()
+    
+    entry = await record_custody(custody.UPLOAD, metadata["evidence_id"], metadata["case_id"], current_user, {
+        "hash": metadata["hash"], "file_size": metadata["file_size"]
+    })
     
     return {
         "message": "تم رفع الدليل بنجاح",
         "evidence_id": metadata["evidence_id"],
-        "hash": metadata["hash"]
+        "hash": metadata["hash"],
+        "custody": entry,
+        "jobs": await enqueue_evidence_stages(metadata, current_user)
     }
 
+@router.delete("/uploads/{upload_id}")
+def abort_upload(
+    upload_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """إلغاء جلسة الرفع وحذف أجزائها"""
+    
+    get_upload_session(upload_id, current_user)
+    get_upload_sessions().abort(upload_id)
+    return {"message": "تم إلغاء جلسة الرفع"}
+
+@router.post("/audit")
+async def start_audit(
+    case_id: Optional[str] = Form(None),
+    date_from: Optional[datetime] = Form(None),
+    date_to: Optional[datetime] = Form(None),
+    current_user: AuthenticatedUser = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """بدء فحص سلامة في الخلفية لجميع الأدلة أو لقضية أو لفترة زمنية"""
+    
+    case_pk = None
+    if case_id:
+        case = await db.scalar(select(models.Case).where(models.Case.case_id == case_id))
+        if not case:
+            raise HTTPException(status_code=404, detail="القضية غير موجودة")
+        case_pk = case.id
+    
+    job = auditor.start_job(case_id=case_pk, date_from=date_from, date_to=date_to)
+    return {"message": "تم بدء فحص السلامة", "job": job}
+
+@router.get("/audit")
+def list_audits(current_user: AuthenticatedUser = Depends(require_admin)):
+    """قائمة مهام فحص السلامة"""
+    return {"jobs": auditor.list_jobs()}
+
+@router.get("/audit/{job_id}")
+def get_audit(job_id: str, current_user: AuthenticatedUser = Depends(require_admin)):
+    """حالة مهمة فحص السلامة وتقدمها"""
+    job = auditor.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="المهمة غير موجودة")
+    return {"job": job}
+
+@router.delete("/audit/{job_id}")
+def cancel_audit(job_id: str, current_user: AuthenticatedUser = Depends(require_admin)):
+    """إيقاف مهمة فحص جارية نهائيًا (المهمة الجديدة تبدأ الفحص من أوله)"""
+    if not auditor.cancel_job(job_id):
+        raise HTTPException(status_code=404, detail="لا توجد مهمة جارية بهذا المعرف")
+    return {"message": "تم طلب إيقاف المهمة"}
+
+@router.get("/custody/head")
+def custody_head(current_user: AuthenticatedUser = Depends(require_admin)):
+    """آخر إدخال في سجل العهدة (تُحفظ بصمته خارج النظام للتحقق لاحقًا)"""
+    return custody_log.head()
+
+@router.get("/custody/verify")
+async def verify_custody(
+    head: Optional[str] = Query(None, pattern="^[0-9a-f]{64}$"),
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """التحقق من سلسلة سجل العهدة كاملة (تمريرة متدفقة خارج حلقة الأحداث)"""
+    return await run_in_threadpool(custody_log.verify, head)
+
+@router.get("/{evidence_id}/similar")
+async def find_similar_evidence(
+    evidence_id: str,
+    max_distance: Optional[int] = Query(None, ge=0, le=32),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """الأدلة شبه المتطابقة (صور معاد ضغطها أو تحجيمها، نسخ معدلة) والقضايا التي تشاركها"""
+    
+    # ربط القضايا يكشف أدلة قضايا أخرى، فهو متاح لفريق التحليل فقط
+    if current_user.role in [models.UserRole.VIEWER, models.UserRole.REPORTER]:
+        raise HTTPException(status_code=403, detail="غير مصرح لك بالبحث عن الأدلة المتشابهة")
+    
+    exists = await db.scalar(
+        select(models.Evidence.id).where(models.Evidence.evidence_id == evidence_id)
+    )
+    if not exists:
+        raise HTTPException(status_code=404, detail="الدليل غير موجود")
+    
+    result = await run_in_threadpool(get_evidence_engine().find_similar, evidence_id, max_distance)
+    if result is None:
+        raise HTTPException(status_code=404, detail="ملف الدليل غير موجود في المخزن")
+    
+    return result
+
 @router.get("/{evidence_id}/verify")
-def verify_evidence(
+async def verify_evidence(
     evidence_id: str,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """التحقق من سلامة الدليل"""
     
-    evidence = db.query(models.Evidence).filter(models.Evidence.evidence_id == evidence_id).first()
+    evidence = await db.scalar(
+        select(models.Evidence)
+        .options(selectinload(models.Evidence.case))
+        .where(models.Evidence.evidence_id == evidence_id)
+    )
     if not evidence:
         raise HTTPException(status_code=404, detail="الدليل غير موجود")
     
@@ -99,15 +425,68 @@ def verify_evidence(
         if case.reporter_id != current_user.id:
             raise HTTPException(status_code=403, detail="غير مصرح لك بالوصول لهذا الدليل")
     
-    # التحقق من السلامة
-    is_valid = evidence_engine.verify_integrity(evidence_id)
+    # التحقق من السلامة (قراءة الملف كاملاً خارج حلقة الأحداث)
+    is_valid = await run_in_threadpool(get_evidence_engine().verify_integrity, evidence_id)
     
     # تحديث حالة التحقق في قاعدة البيانات
     evidence.integrity_verified = is_valid
-    db.commit()
+    evidence.last_verified_at = datetime.now(timezone.utc)
+    await db.commit()
+    
+    await record_custody(custody.VERIFY, evidence_id, case.case_id, current_user, {"valid": is_valid})
     
     return {
         "evidence_id": evidence_id,
         "integrity_verified": is_valid,
         "hash": evidence.file_hash
     }
+
+@router.get("/{evidence_id}/content")
+async def download_evidence(
+    evidence_id: str,
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """تنزيل ملف الدليل مع دعم Range (تقديم وتأخير الفيديو دون تحميله كاملاً)
+    
+    ETag هو بصمة SHA-256 المخزنة، فيمكن للعميل التحقق مما نزّله ومتابعة التنزيل.
+    """
+    
+    evidence = await db.scalar(
+        select(models.Evidence)
+        .options(selectinload(models.Evidence.case))
+        .where(models.Evidence.evidence_id == evidence_id)
+    )
+    if not evidence:
+        raise HTTPException(status_code=404, detail="الدليل غير موجود")
+    
+    # نفس صلاحيات التحقق من السلامة
+    case = evidence.case
+    if current_user.role in [models.UserRole.VIEWER, models.UserRole.REPORTER]:
+        if case.reporter_id != current_user.id:
+            raise HTTPException(status_code=403, detail="غير مصرح لك بالوصول لهذا الدليل")
+    
+    entry = await run_in_threadpool(get_evidence_engine().index.get, evidence_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="ملف الدليل غير موجود في المخزن")
+    
+    # طلبات Range المتتالية أثناء تقديم الفيديو تُحسب مشاهدة واحدة (عند بدايتها)
+    range_header = request.headers.get("range")
+    if not range_header or range_header.replace(" ", "").startswith("bytes=0-"):
+        await record_custody(custody.VIEW, evidence_id, case.case_id, current_user,
+                             {"range": range_header}, wait=False)
+    
+    try:
+        return await run_in_threadpool(
+            build_file_response,
+            Path(entry["file_path"]),
+            evidence.file_hash,
+            request.headers,
+            evidence_id,
+            settings.EVIDENCE_ACCEL_REDIRECT_PREFIX,
+            get_evidence_engine().storage_path,
+            (evidence.metadata_ or {}).get("file_size")
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="ملف الدليل غير موجود في المخزن")
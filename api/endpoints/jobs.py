@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+
+from app.database import models
+from app.api.deps import AuthenticatedUser, get_current_user, require_admin
+from app.pipeline.worker import build_queue
+
+router = APIRouter()
+job_queue = build_queue()
+
+def _public(job: dict) -> dict:
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+@router.get("/")
+def list_jobs(
+    status: Optional[str] = Query(None, pattern="^(queued|running|done|failed)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """قائمة المهام وإحصائيات الطابور (للمسؤولين)"""
+    return {
+        "stats": job_queue.stats(),
+        "jobs": [_public(job) for job in job_queue.list_jobs(status=status, limit=limit)]
+    }
+
+@router.get("/{job_id}")
+def get_job(
+    job_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """حالة مهمة معالجة"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="المهمة غير موجودة")
+    
+    if current_user.role != models.UserRole.ADMIN and job["user_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="غير مصرح لك بالوصول لهذه المهمة")
+    
+    return _public(job)
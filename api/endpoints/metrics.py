@@ -0,0 +1,44 @@
+import hmac
+import io
+import pstats
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import AuthenticatedUser, require_admin
+from app.core import metrics
+from app.core.config import settings
+
+router = APIRouter()
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{12}$")
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics(request: Request):
+    """المقاييس بصيغة Prometheus النصية (تتطلب METRICS_TOKEN ما لم يُضبط METRICS_PUBLIC)"""
+    if not settings.METRICS_PUBLIC:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        received = request.headers.get("authorization", "")
+        if not settings.METRICS_TOKEN or not hmac.compare_digest(received.encode(), expected.encode()):
+            raise HTTPException(status_code=401, detail="رمز المقاييس غير صالح")
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@router.get("/metrics/profiles/{profile_id}", response_class=PlainTextResponse)
+def read_profile(
+    profile_id: str,
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """ملخص تحليل طلب أُرسل بالترويسة X-Profile: 1 (المعرف في X-Profile-Id)"""
+    if not _PROFILE_ID.match(profile_id):
+        raise HTTPException(status_code=404, detail="التحليل غير موجود")
+    path = settings.PROFILE_PATH / f"{profile_id}.prof"
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="التحليل غير موجود")
+    
+    output = io.StringIO()
+    stats = pstats.Stats(str(path), stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict
+
+from app.api.deps import AuthenticatedUser, require_admin
+from app.rules_engine.registry import get_registry
+
+router = APIRouter()
+rule_registry = get_registry()
+
+@router.get("/")
+def list_rule_versions(current_user: AuthenticatedUser = Depends(require_admin)):
+    """نسخ قواعد التصنيف والنسخة الفعالة"""
+    return {
+        "active_version": rule_registry.active_version(),
+        "versions": rule_registry.list_versions()
+    }
+
+@router.post("/")
+async def publish_rules(
+    rules: Dict = Body(..., embed=True),
+    activate: bool = Body(True, embed=True),
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """نشر نسخة جديدة من القواعد (تُفعّل في كل العمليات دون إعادة تشغيل)"""
+    try:
+        version = await run_in_threadpool(rule_registry.publish, rules, activate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"message": "تم نشر القواعد", "version": version, "active": activate}
+
+@router.get("/{version}")
+def get_rule_version(version: str, current_user: AuthenticatedUser = Depends(require_admin)):
+    """محتوى نسخة من القواعد"""
+    try:
+        return {"version": version, "rules": rule_registry.load(version)}
+    except (KeyError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="النسخة غير موجودة")
+
+@router.post("/{version}/activate")
+def activate_rule_version(version: str, current_user: AuthenticatedUser = Depends(require_admin)):
+    """تفعيل نسخة سابقة (للرجوع عن تغيير)"""
+    try:
+        rule_registry.activate(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="النسخة غير موجودة")
+    
+    return {"message": "تم تفعيل النسخة", "version": version}
@@ -0,0 +1,137 @@
+"""وسيط قياس زمن الطلبات وتحليل أداء طلب واحد عند الطلب"""
+import cProfile
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.deps import get_current_user
+from app.core import metrics
+from app.core.config import settings
+from app.database import models
+from app.database.session import AsyncSessionLocal
+
+PROFILE_HEADER = b"x-profile"
+
+class MetricsMiddleware:
+    """زمن كل طلب حسب قالب المسار (/cases/{case_id} لا المعرف نفسه) والطلبات الجارية
+    
+    وسيط ASGI مباشر بدل BaseHTTPMiddleware حتى لا يُضاف خيط أو نسخ للجسم
+    في كل طلب، ولا يؤخر الاستجابات المتدفقة.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Optional[Dict] = None
+        # cProfile يعمل على مستوى الخيط، فلا يُحلَّل أكثر من طلب في نفس الوقت
+        self._profile_lock = threading.Lock()
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        status = 500
+        profiler = await self._start_profiler(scope)
+        profile_id = uuid.uuid4().hex[:12] if profiler is not None else None
+        
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile_id is not None:
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+        
+        metrics.HTTP_IN_FLIGHT.inc(method=method)
+        started = time.perf_counter()
+        try:
+            if profiler is None:
+                await self.app(scope, receive, send_wrapper)
+            else:
+                await _ProfiledCall(self.app(scope, receive, send_wrapper), profiler)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.HTTP_IN_FLIGHT.dec(method=method)
+            route = self._route_template(scope)
+            metrics.HTTP_REQUESTS.inc(method=method, route=route, status=status)
+            metrics.HTTP_DURATION.observe(elapsed, method=method, route=route)
+            if profiler is not None:
+                self._save_profile(profiler, profile_id)
+    
+    def _route_template(self, scope: Scope) -> str:
+        # الموجه يضيف endpoint إلى scope عند المطابقة
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            routes = {}
+            for route in getattr(scope.get("app"), "routes", []):
+                routes[getattr(route, "endpoint", None) or getattr(route, "app", None)] = route.path
+            self._routes = routes
+        return self._routes.get(endpoint, "unmatched")
+    
+    async def _start_profiler(self, scope: Scope) -> Optional[cProfile.Profile]:
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER) not in (b"1", b"true"):
+            return None
+        
+        # للمسؤولين فقط، بنفس تحقق نقاط النهاية (حساب فعال ودوره الحالي في قاعدة البيانات)
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            async with AsyncSessionLocal() as db:
+                user = await get_current_user(token, db)
+        except HTTPException:
+            return None
+        if user.role != models.UserRole.ADMIN:
+            return None
+        
+        if not self._profile_lock.acquire(blocking=False):
+            return None
+        return cProfile.Profile()
+    
+    def _save_profile(self, profiler: cProfile.Profile, profile_id: str):
+        try:
+            settings.PROFILE_PATH.mkdir(parents=True, exist_ok=True)
+            # ملف pstats قياسي (يُفتح بـ snakeviz أو pstats) ويُعرض ملخصه عبر /metrics/profiles
+            profiler.dump_stats(settings.PROFILE_PATH / f"{profile_id}.prof")
+        finally:
+            self._profile_lock.release()
+
+class _ProfiledCall:
+    """تشغيل coroutine مع تفعيل المحلل في خطواته فقط
+    
+    حلقة الأحداث تنفذ الطلبات الأخرى بين خطوات الطلب المحلَّل، فلو بقي المحلل
+    مفعّلاً طوال الطلب لاختلط عملها بنتيجته. هنا يُفعَّل عند استئناف الطلب ويُوقف
+    عند انتظاره. لا يشمل التحليل ما يُنفذ في مهام أو خيوط أخرى (run_in_threadpool
+    ومهام الخلفية)، بل زمن الانتظار عليها فقط.
+    """
+    
+    def __init__(self, coro, profiler: cProfile.Profile):
+        self.coro = coro
+        self.profiler = profiler
+    
+    def __await__(self):
+        value, error = None, None
+        while True:
+            self.profiler.enable()
+            try:
+                if error is None:
+                    awaiting = self.coro.send(value)
+                else:
+                    awaiting = self.coro.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.profiler.disable()
+            try:
+                value, error = (yield awaiting), None
+            except BaseException as exc:
+                value, error = None, exc
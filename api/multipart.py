@@ -0,0 +1,161 @@
+"""قراءة multipart/form-data من جسم الطلب أثناء وصوله دون تخزينه مؤقتًا
+
+UploadFile في FastAPI يُكتب كاملاً إلى ملف مؤقت قبل تشغيل نقطة النهاية، فلا
+يُرفض الملف الكبير إلا بعد استلامه كله ويُكتب كل رفع على القرص مرتين. هنا
+تُقرأ الأجزاء بترتيبها، ويقرأ المستدعي محتوى الملف بـ read() فيكتبه إلى وجهته
+مباشرة ويتوقف الاستلام فور تجاوز الحد.
+"""
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+import multipart
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import parse_options_header
+
+# ترويسات الأجزاء والحقول النصية المسموح بها فوق حجم الملف
+FORM_OVERHEAD = 64 * 1024
+MAX_FIELD_SIZE = 16 * 1024
+
+_BEGIN = "begin"
+_DATA = "data"
+_END = "end"
+
+def check_content_length(request: Request, max_file_size: int):
+    """رفض الطلب قبل قراءة جسمه إن أعلن حجمًا يتجاوز الحد"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_file_size + FORM_OVERHEAD:
+        raise HTTPException(status_code=413, detail="حجم الملف يتجاوز الحد المسموح")
+
+class FormPart:
+    """جزء من النموذج يُقرأ محتواه تدريجيًا (متوافق مع read() في UploadFile)"""
+    
+    def __init__(self, form: "StreamingForm", name: str, filename: Optional[str]):
+        self.name = name
+        self.filename = filename
+        self._form = form
+        self._buffer = bytearray()
+        self._done = False
+    
+    async def read(self, size: int = -1) -> bytes:
+        """حتى size بايت مما وصل (دون انتظار اكتمالها)، أو كل الباقي عند size < 0"""
+        while not self._done and (size < 0 or not self._buffer):
+            kind, data = await self._form._next_event()
+            if kind == _END:
+                self._done = True
+            else:
+                self._buffer += data
+        if size < 0 or size > len(self._buffer):
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+    
+    async def text(self) -> str:
+        value = bytearray()
+        while True:
+            chunk = await self.read(MAX_FIELD_SIZE)
+            if not chunk:
+                return value.decode("utf-8", errors="replace")
+            value += chunk
+            if len(value) > MAX_FIELD_SIZE:
+                raise HTTPException(status_code=400, detail=f"الحقل {self.name} أطول من المسموح")
+    
+    async def discard(self):
+        while await self.read(MAX_FIELD_SIZE):
+            pass
+
+class StreamingForm:
+    """أجزاء النموذج بترتيب وصولها:
+    
+        async for part in StreamingForm(request):
+            if part.filename is None:
+                fields[part.name] = await part.text()
+            else:
+                await stream_to_temp(part, path, max_size)
+    
+    الجزء الذي لم يُقرأ كاملاً يُتجاوز عند طلب الجزء التالي.
+    """
+    
+    def __init__(self, request: Request):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="يُتوقع جسم بصيغة multipart/form-data")
+        self._stream = request.stream().__aiter__()
+        self._events: Deque[Tuple[str, object]] = deque()
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._finished = False
+        self._parser = multipart.MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+    
+    async def __aiter__(self) -> AsyncIterator[FormPart]:
+        part = None
+        while True:
+            if part is not None:
+                await part.discard()
+            event = await self._next_event(required=False)
+            if event is None:
+                return
+            kind, headers = event
+            if kind != _BEGIN:
+                continue
+            _, options = parse_options_header(headers.get(b"content-disposition", b""))
+            filename = options.get(b"filename")
+            part = FormPart(
+                self,
+                options.get(b"name", b"").decode("utf-8", errors="replace"),
+                filename.decode("utf-8", errors="replace") if filename is not None else None
+            )
+            yield part
+    
+    async def _next_event(self, required: bool = True):
+        while not self._events:
+            if self._finished:
+                if required:
+                    raise HTTPException(status_code=400, detail="جسم الطلب غير مكتمل")
+                return None
+            try:
+                chunk = await self._stream.__anext__()
+            except StopAsyncIteration:
+                self._finished = True
+                chunk = None
+            try:
+                if chunk:
+                    self._parser.write(chunk)
+                elif chunk is None:
+                    self._parser.finalize()
+            except MultipartParseError:
+                raise HTTPException(status_code=400, detail="جسم multipart غير صالح")
+        return self._events.popleft()
+    
+    def _on_part_begin(self):
+        self._headers = {}
+    
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+    
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+    
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+    
+    def _on_headers_finished(self):
+        self._events.append((_BEGIN, self._headers))
+    
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self._events.append((_DATA, data[start:end]))
+    
+    def _on_part_end(self):
+        self._events.append((_END, None))
@@ -0,0 +1,66 @@
+"""عدد الطلبات في الثانية على GET /cases/ مع ذاكرة المصادقة وبدونها
+
+التشغيل من المجلد الأب للمشروع:
+    python -m app.benchmarks.bench_auth_cache [عدد الطلبات]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# قاعدة بيانات مؤقتة قبل استيراد الإعدادات
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.api.endpoints import cases
+from app.core.auth import create_access_token
+from app.core.config import settings
+from app.database import models
+from app.database.session import engine, Base, SessionLocal
+
+def setup() -> str:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(models.User(
+        username="bench",
+        email="bench@cybershield.legal",
+        hashed_password="-",
+        role=models.UserRole.ANALYST
+    ))
+    db.commit()
+    db.close()
+    return create_access_token({"sub": "bench"})
+
+def run(client: TestClient, token: str, requests: int) -> float:
+    headers = {"Authorization": f"Bearer {token}"}
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get("/api/v1/cases/", headers=headers)
+        assert response.status_code == 200
+    return requests / (time.perf_counter() - start)
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    token = setup()
+    
+    app = FastAPI()
+    app.include_router(cases.router, prefix=f"{settings.API_V1_STR}/cases")
+    client = TestClient(app)
+    
+    settings.AUTH_CACHE_ENABLED = False
+    run(client, token, 50)  # إحماء
+    without_cache = run(client, token, requests)
+    
+    settings.AUTH_CACHE_ENABLED = True
+    with_cache = run(client, token, requests)
+    
+    print(f"بدون ذاكرة مؤقتة: {without_cache:.0f} طلب/ث")
+    print(f"مع ذاكرة مؤقتة: {with_cache:.0f} طلب/ث ({with_cache / without_cache:.2f}x)")
+    print(f"الإحصائيات: {deps.auth_cache_stats()}")
+
+if __name__ == "__main__":
+    main()
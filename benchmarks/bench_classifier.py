@@ -0,0 +1,69 @@
+"""مقارنة أداء المصنف المترجم بالمسار المرجعي
+
+التشغيل من المجلد الأب للمشروع:
+    python -m app.benchmarks.bench_classifier
+"""
+import random
+import time
+
+from app.rules_engine.classifier import RuleBasedClassifier, ClassificationResult, DEFAULT_RULES
+
+WORDS = [
+    "تم", "نشر", "صور", "خاصة", "للضحية", "على", "مواقع", "التواصل", "مع", "تهديد",
+    "بدفع", "مبلغ", "مالي", "وإلا", "سيتم", "فضيحة", "الحساب", "المزيف", "رسائل", "متكررة",
+]
+
+
+def legacy_classify(classifier: RuleBasedClassifier, text: str):
+    """المسار القديم: تقييم كل فئة منفردة"""
+    results = []
+    for category, patterns in classifier.rules.items():
+        confidence, flags = classifier._evaluate_patterns(text, patterns)
+        if confidence > 0:
+            results.append(ClassificationResult(category=category, confidence=confidence, flags=flags))
+    results.sort(key=lambda x: x.confidence, reverse=True)
+    return results
+
+
+def build_rules(size: int) -> dict:
+    """توليد قواعد اصطناعية بحجم محدد اعتمادًا على القواعد الافتراضية"""
+    base = list(DEFAULT_RULES.values())
+    rules = {}
+    for i in range(size):
+        patterns = base[i % len(base)]
+        rules[f"category_{i}"] = {
+            "keywords": patterns["keywords"] + [f"كلمة{i}", f"عبارة {i}"],
+            "regex_patterns": patterns["regex_patterns"] + [f"رمز{i}[0-9]+"],
+        }
+    return rules
+
+
+def build_text(length: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def timeit(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    rng = random.Random(42)
+    texts = [build_text(length, rng) for length in (200, 2000, 20000)]
+
+    print(f"{'categories':>10} {'words':>7} {'legacy ms':>10} {'compiled ms':>12} {'speedup':>8}")
+    for size in (5, 50, 500):
+        classifier = RuleBasedClassifier(build_rules(size))
+        for text in texts:
+            assert legacy_classify(classifier, text) == classifier.classify_text(text)
+            repeat = max(1, 20000 // (size * len(text) // 100 + 1))
+            legacy = timeit(lambda: legacy_classify(classifier, text), repeat)
+            compiled = timeit(lambda: classifier.classify_text(text), repeat)
+            words = len(text.split())
+            print(f"{size:>10} {words:>7} {legacy:>10.3f} {compiled:>12.3f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
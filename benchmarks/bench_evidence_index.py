@@ -0,0 +1,69 @@
+"""مقارنة تحديد موقع الدليل بمسح المجلد مقابل الفهرس
+
+التشغيل من المجلد الأب للمشروع:
+    python -m app.benchmarks.bench_evidence_index [عدد الأدلة]
+"""
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.evidence.engine import EvidenceEngine
+
+def create_synthetic_store(storage_path: Path, count: int) -> list:
+    """إنشاء ملفات أدلة وبيانات وصفية اصطناعية مباشرة على القرص"""
+    evidence_ids = []
+    for i in range(count):
+        evidence_id = f"EVID-{i:08X}"
+        stem = f"{evidence_id}_20240101_000000"
+        file_path = storage_path / f"{stem}.dat"
+        file_path.write_bytes(b"x")
+        metadata = {
+            "evidence_id": evidence_id,
+            "hash": "2d711642b726b04401627ca9fbac32f5c8530fb1903cc4db02258717921a4881",
+            "file_path": str(file_path)
+        }
+        with open(storage_path / f"{stem}.meta.json", 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+        evidence_ids.append(evidence_id)
+    return evidence_ids
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_path = Path(tmp)
+        start = time.perf_counter()
+        evidence_ids = create_synthetic_store(storage_path, count)
+        print(f"إنشاء {count} دليل: {time.perf_counter() - start:.1f}s")
+        
+        engine = EvidenceEngine(storage_path)
+        start = time.perf_counter()
+        engine.rebuild_index()
+        print(f"إعادة بناء الفهرس: {time.perf_counter() - start:.2f}s")
+        
+        sample = random.Random(0).sample(evidence_ids, 20)
+        
+        start = time.perf_counter()
+        for evidence_id in sample:
+            next(storage_path.glob(f"*{evidence_id}*.dat"))
+        glob_ms = (time.perf_counter() - start) / len(sample) * 1000
+        
+        start = time.perf_counter()
+        for evidence_id in sample:
+            assert engine._find_meta(evidence_id) is not None
+        index_ms = (time.perf_counter() - start) / len(sample) * 1000
+        
+        start = time.perf_counter()
+        for evidence_id in sample:
+            assert engine.verify_integrity(evidence_id)
+        verify_ms = (time.perf_counter() - start) / len(sample) * 1000
+        
+        print(f"مسح المجلد: {glob_ms:.2f} ms/بحث")
+        print(f"الفهرس: {index_ms:.3f} ms/بحث")
+        print(f"verify_integrity: {verify_ms:.3f} ms/تحقق")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""أثر موجة تسجيلات الدخول على زمن استجابة نقاط النهاية الأخرى
+
+يرسل تسجيلات دخول متزامنة بينما يقيس زمن GET /cases/ في نفس حلقة الأحداث،
+ويطبع معدل تسجيل الدخول و p50/p99 لطلبات القضايا.
+
+التشغيل من المجلد الأب للمشروع:
+    python -m app.benchmarks.bench_login_load [عدد تسجيلات الدخول] [التزامن]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.endpoints import auth, cases
+from app.core.auth import create_access_token, get_password_hash, password_hasher
+from app.core.config import settings
+from app.database import models
+from app.database.session import engine, Base, SessionLocal
+
+def setup(users: int) -> str:
+    Base.metadata.create_all(bind=engine)
+    hashed = get_password_hash("secret")
+    db = SessionLocal()
+    for i in range(users):
+        db.add(models.User(
+            username=f"user{i}",
+            email=f"user{i}@cybershield.legal",
+            hashed_password=hashed,
+            role=models.UserRole.ANALYST
+        ))
+    db.commit()
+    db.close()
+    return create_access_token({"sub": "user0"})
+
+async def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    token = setup(concurrency)
+    
+    app = FastAPI()
+    app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth")
+    app.include_router(cases.router, prefix=f"{settings.API_V1_STR}/cases")
+    transport = httpx.ASGITransport(app=app)
+    
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        done = asyncio.Event()
+        latencies = []
+        
+        async def probe():
+            headers = {"Authorization": f"Bearer {token}"}
+            while not done.is_set():
+                start = time.perf_counter()
+                response = await client.get("/api/v1/cases/", headers=headers)
+                assert response.status_code == 200
+                latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.005)
+        
+        async def login_worker(worker: int, count: int):
+            for _ in range(count):
+                response = await client.post(
+                    "/api/v1/auth/login",
+                    data={"username": f"user{worker}", "password": "secret"}
+                )
+                assert response.status_code == 200
+        
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            login_worker(i, logins // concurrency) for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+    
+    password_hasher.close()
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"تسجيلات الدخول: {logins // concurrency * concurrency} خلال {elapsed:.2f}s "
+          f"({logins / elapsed:.1f}/ث)")
+    print(f"GET /cases/ أثناء الحمل: p50={statistics.median(latencies):.1f}ms p99={p99:.1f}ms "
+          f"({len(latencies)} طلب)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""زمن بدء العامل: استيراد التطبيق ثم تشغيل lifespan حتى أول استجابة
+
+كل قياس في عملية جديدة (استيراد بارد) على قاعدة بيانات مؤقتة مهيأة مسبقًا
+بـ app.database.init، ويُطبع الوسيط لكل مرحلة. يُقارن بالقياس المرجعي المحفوظ
+في المستودع (startup_baseline.json) ويفشل (رمز خروج 1) عند تجاوزه بأكثر من
+--tolerance؛ ويشغله tests/test_startup.py مع بقية الاختبارات.
+
+الأزمنة تُقارن منسوبة إلى reference_ms (استيراد بارد لـ SQLAlchemy في نفس
+البيئة) حتى لا يفشل القياس على جهاز أبطأ من الذي سُجل عليه المرجع. بعد تغيير
+مقصود في البدء يُحدَّث المرجع بـ --update-baseline.
+
+التشغيل من المجلد الأب للمشروع:
+    python -m app.benchmarks.bench_startup [--runs 5] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+
+# يُنفذ في العملية الجديدة؛ TestClient يُستورد قبل بدء القياس لأنه ليس من بدء الخادم
+_CHILD = """
+import json, time
+from fastapi.testclient import TestClient
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+with TestClient(app) as client:
+    response = client.get("/health")
+    assert response.status_code == 200, response.text
+    responded = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (responded - started) * 1000
+}))
+"""
+
+# مرجع لسرعة الجهاز: مكتبات يحتاجها التطبيق في كل الأحوال
+_REFERENCE = """
+import json, time
+from fastapi.testclient import TestClient
+started = time.perf_counter()
+import sqlalchemy.orm, sqlalchemy.ext.asyncio
+print(json.dumps({"reference_ms": (time.perf_counter() - started) * 1000}))
+"""
+
+BASELINE_PATH = Path(__file__).with_name("startup_baseline.json")
+KEYS = ("import_ms", "first_request_ms", "reference_ms")
+
+def run_child(code: str, env: dict) -> str:
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    return result.stdout
+
+def measure(runs: int) -> dict:
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", DB_INIT_ON_STARTUP="false")
+    # التهيئة مرة واحدة خارج القياس كما في النشر
+    run_child("from app.database.init import init_database; init_database()", env)
+    
+    samples = []
+    for _ in range(runs):
+        sample = json.loads(run_child(_CHILD, env).strip().splitlines()[-1])
+        sample.update(json.loads(run_child(_REFERENCE, env).strip().splitlines()[-1]))
+        samples.append(sample)
+    return {key: round(statistics.median(sample[key] for sample in samples), 1) for key in KEYS}
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """المراحل التي تجاوزت المرجع بأكثر من tolerance (منسوبة إلى reference_ms)"""
+    regressions = []
+    for key in KEYS:
+        if key == "reference_ms" or key not in baseline:
+            continue
+        relative = result[key] / result["reference_ms"]
+        expected = baseline[key] / baseline["reference_ms"]
+        if relative > expected * (1 + tolerance):
+            regressions.append(
+                f"{key}: {relative:.1f}x من المرجع مقابل {expected:.1f}x ({result[key]:.0f} ms)"
+            )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن بدء التطبيق")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="ملف JSON للقياس المرجعي")
+    parser.add_argument("--update-baseline", action="store_true", help="حفظ القياس الحالي مرجعًا")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="نسبة الزيادة المسموحة عن المرجع")
+    args = parser.parse_args()
+    
+    result = measure(args.runs)
+    print(f"الاستيراد: {result['import_ms']:.0f} ms")
+    print(f"حتى أول استجابة: {result['first_request_ms']:.0f} ms")
+    print(f"المرجع (SQLAlchemy): {result['reference_ms']:.0f} ms")
+    
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+        print(f"تم حفظ القياس المرجعي في {args.baseline}")
+        return
+    
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print("❌ تراجع في زمن البدء:\n" + "\n".join(regressions))
+        raise SystemExit(1)
+    print("✅ ضمن حدود القياس المرجعي")
+
+if __name__ == "__main__":
+    main()
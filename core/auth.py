@@ -1,10 +1,21 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.passwords import PasswordHasher, make_context
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# للاستخدام المتزامن في السكربتات وعند بدء التشغيل
+pwd_context = make_context(settings.BCRYPT_ROUNDS)
+
+# للاستخدام في نقاط النهاية: bcrypt في مجمع عمليات خارج حلقة الأحداث
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY,
+    per_user_limit=settings.PASSWORD_HASH_PER_USER_LIMIT
+)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -16,14 +16,92 @@ class Settings:
         f"sqlite:///{BASE_DIR}/storage/databases/cyber_shield.db"
     )
     
+    # مجمع الاتصالات (PostgreSQL وغيره من الخوادم)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # ثانية
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))
+    
+    # إعدادات أداء SQLite
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64000))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    
+    # تهيئة القاعدة عند بدء الخادم (للتطوير فقط؛ في النشر يُشغَّل python -m app.database.init مرة واحدة)
+    DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "true" if os.getenv("REPL_ID") else "false").lower() == "true"
+    ADMIN_INITIAL_PASSWORD = os.getenv("ADMIN_INITIAL_PASSWORD", "admin123")
+    
     # JWT Settings
     SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
     
+    # تشفير كلمات المرور (bcrypt)
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", 4))
+    PASSWORD_HASH_PER_USER_LIMIT = int(os.getenv("PASSWORD_HASH_PER_USER_LIMIT", 1))
+    
+    # ذاكرة مؤقتة للتوكنات والمستخدمين في كل طلب
+    AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+    # أقصى مدة تبقى فيها بيانات مستخدم قديمة إن عُدّل جدول users دون ORM ودون invalidate_user
+    AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 15))
+    # ملف يُحدَّث عند تعديل أي مستخدم فتُفرغ كل العمليات ذاكرتها (مشترك بين العمليات على نفس القرص)
+    AUTH_CACHE_STAMP_PATH = BASE_DIR / "storage" / "auth" / "users.stamp"
+    AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", 10000))
+    
     # Evidence Storage
     EVIDENCE_STORAGE_PATH = BASE_DIR / "storage" / "evidence"
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    # تخزين حسب المحتوى: كل محتوى يُخزن مرة واحدة باسم بصمته
+    EVIDENCE_CONTENT_ADDRESSED = os.getenv("EVIDENCE_CONTENT_ADDRESSED", "false").lower() == "true"
+    MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 10 * 1024 * 1024))  # 10MB
+    # جلسات الرفع المجزأ المتروكة تُحذف بعد هذه المدة دون رفع أي جزء
+    UPLOAD_SESSION_MAX_AGE_HOURS = float(os.getenv("UPLOAD_SESSION_MAX_AGE_HOURS", 24))
+    # خلف nginx: مسار internal يشير إلى مجلد الأدلة لتفويض التنزيل (فارغ = يرسل التطبيق الملف)
+    EVIDENCE_ACCEL_REDIRECT_PREFIX = os.getenv("EVIDENCE_ACCEL_REDIRECT_PREFIX", "")
+    # ضغط الأدلة القابلة للضغط عند الرفع: auto (zstd إن توفر وإلا gzip) أو zstd أو gzip أو xz أو off
+    EVIDENCE_COMPRESSION = os.getenv("EVIDENCE_COMPRESSION", "auto")
+    # أرشيف أدلة القضايا المغلقة (يمكن أن يكون على قرص أبطأ وأرخص)
+    EVIDENCE_ARCHIVE_PATH = Path(os.getenv("EVIDENCE_ARCHIVE_PATH", str(BASE_DIR / "storage" / "archive")))
+    EVIDENCE_ARCHIVE_AFTER_DAYS = int(os.getenv("EVIDENCE_ARCHIVE_AFTER_DAYS", 30))  # بعد إغلاق القضية
+    
+    # فحص سلامة الأدلة في الخلفية
+    AUDIT_STATE_PATH = BASE_DIR / "storage" / "audit"
+    AUDIT_WORKERS = int(os.getenv("AUDIT_WORKERS", 4))
+    AUDIT_MAX_BYTES_PER_SEC = int(os.getenv("AUDIT_MAX_BYTES_PER_SEC", 50 * 1024 * 1024))  # 0 = بلا حد
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 100))
+    
+    # سجل سلسلة العهدة (إجراءات الأدلة مترابطة بالبصمات)
+    CUSTODY_LOG_PATH = BASE_DIR / "storage" / "custody" / "custody.log"
+    CUSTODY_LOG_MAX_BATCH = int(os.getenv("CUSTODY_LOG_MAX_BATCH", 512))
+    CUSTODY_LOG_MAX_DELAY_MS = float(os.getenv("CUSTODY_LOG_MAX_DELAY_MS", 5))  # مهلة تجميع الدفعة قبل fsync
+    
+    # مفتاح توقيع بيان حزم الأدلة (Ed25519، يُولَّد عند أول تصدير)
+    BUNDLE_SIGNING_KEY_PATH = BASE_DIR / "storage" / "keys" / "bundle_ed25519.pem"
+    
+    # نسخ قواعد التصنيف (تُعاد قراءتها دون إعادة تشغيل)
+    RULES_PATH = BASE_DIR / "storage" / "rules"
+    RULES_CHECK_INTERVAL = float(os.getenv("RULES_CHECK_INTERVAL", 2.0))  # ثانية
+    
+    # طابور المعالجة الخلفية (تصنيف القضايا ومراحل الأدلة)
+    PIPELINE_ENABLED = os.getenv("PIPELINE_ENABLED", "true").lower() == "true"
+    PIPELINE_QUEUE_PATH = BASE_DIR / "storage" / "jobs" / "queue.sqlite3"
+    PIPELINE_EMBEDDED_WORKERS = int(os.getenv("PIPELINE_EMBEDDED_WORKERS", 1))  # 0 = عمال منفصلون فقط
+    PIPELINE_POLL_INTERVAL = float(os.getenv("PIPELINE_POLL_INTERVAL", 1.0))
+    PIPELINE_LEASE_SECONDS = int(os.getenv("PIPELINE_LEASE_SECONDS", 300))
+    PIPELINE_RETRY_DELAY = float(os.getenv("PIPELINE_RETRY_DELAY", 5))
+    PIPELINE_MAX_ATTEMPTS = int(os.getenv("PIPELINE_MAX_ATTEMPTS", 5))
+    # القضايا الأقدم من هذا بلا تصنيف ولا مهمة تُضاف مهمتها عند بدء العمال
+    PIPELINE_RECOVERY_GRACE_SECONDS = int(os.getenv("PIPELINE_RECOVERY_GRACE_SECONDS", 60))
+    
+    # مقاييس الأداء (/metrics)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # فارغ = /metrics مغلق إلا مع METRICS_PUBLIC
+    # /metrics بلا مصادقة (فقط إن كان المنفذ غير مكشوف خارج الشبكة الداخلية)
+    METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() == "true"
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 200))
+    PROFILE_PATH = BASE_DIR / "storage" / "profiles"
     
     # Replit Compatibility
     IS_REPLIT = os.getenv("REPL_ID") is not None
@@ -0,0 +1,194 @@
+"""مقاييس الأداء داخل العملية وعرضها بصيغة Prometheus النصية
+
+عدادات ومقاييس لحظية ومدرجات تكرارية بسيطة آمنة بين الخيوط دون اعتماد
+خارجي. كل عملية تحتفظ بمقاييسها، فعند التشغيل بعدة عمليات يجمعها Prometheus
+من كل عملية (أو يُستخدم عامل واحد لكل منفذ).
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# حدود المدرج الافتراضية بالثواني
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+    
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+    
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+    
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # لكل مجموعة تسميات: [عدد كل حد (غير تراكمي) + اللانهاية، المجموع، العدد]
+        self._values: Dict[Tuple[str, ...], list] = {}
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+    
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # إعادة استيراد الوحدة تعيد نفس المقياس بدل تكراره
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def counter(name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labels))
+
+def gauge(name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labels))
+
+def histogram(name: str, documentation: str, labels: Sequence[str] = (),
+              buckets: Optional[Sequence[float]] = None) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labels, buckets or DEFAULT_BUCKETS))
+
+# مقاييس طلبات HTTP
+HTTP_REQUESTS = counter("http_requests_total", "عدد الطلبات حسب المسار والحالة", ["method", "route", "status"])
+HTTP_DURATION = histogram("http_request_duration_seconds", "زمن الطلبات حسب المسار", ["method", "route"])
+HTTP_IN_FLIGHT = gauge("http_requests_in_flight", "الطلبات الجارية حاليًا", ["method"])
+
+# مقاييس قاعدة البيانات
+DB_QUERIES = counter("db_queries_total", "عدد الاستعلامات حسب النوع", ["operation"])
+DB_DURATION = histogram(
+    "db_query_duration_seconds", "زمن الاستعلامات حسب النوع", ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+DB_SLOW_QUERIES = counter("db_slow_queries_total", "الاستعلامات التي تجاوزت حد البطء", ["operation"])
+
+# مقاييس التصنيف
+CLASSIFIER_TEXTS = counter("classifier_texts_total", "النصوص المصنفة", ["mode"])
+CLASSIFIER_DURATION = histogram(
+    "classifier_duration_seconds", "زمن التصنيف (نص واحد أو دفعة)", ["mode"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+
+# مقاييس مخزن الأدلة
+EVIDENCE_BYTES = counter("evidence_bytes_total", "البايتات المخزنة أو المتحقق منها", ["operation"])
+EVIDENCE_DURATION = histogram(
+    "evidence_operation_duration_seconds", "زمن تخزين الأدلة والتحقق منها", ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+EVIDENCE_HASH_THROUGHPUT = gauge(
+    "evidence_hash_throughput_bytes_per_second", "معدل حساب البصمة في آخر عملية تحقق"
+)
+
+def observe_evidence(operation: str, size: int, seconds: float):
+    """تسجيل عملية على ملف دليل (الحجم والزمن ومعدل البصمة للتحقق)"""
+    EVIDENCE_BYTES.inc(size, operation=operation)
+    EVIDENCE_DURATION.observe(seconds, operation=operation)
+    if operation == "verify" and seconds > 0:
+        EVIDENCE_HASH_THROUGHPUT.set(size / seconds)
@@ -0,0 +1,89 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+# سياق التشفير داخل كل عملية عاملة حسب تكلفة bcrypt
+_contexts: Dict[int, CryptContext] = {}
+
+def make_context(rounds: int) -> CryptContext:
+    # تحديد الحدين الأدنى والأعلى يجعل التشفيرات بتكلفة مختلفة تحتاج إلى تحديث
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds
+    )
+
+def _context(rounds: int) -> CryptContext:
+    context = _contexts.get(rounds)
+    if context is None:
+        context = _contexts[rounds] = make_context(rounds)
+    return context
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed_password)
+
+class PasswordHasher:
+    """تشفير كلمات المرور في مجمع عمليات محدود بدل حلقة الأحداث
+    
+    يحد من التزامن الكلي ومن عدد العمليات المتزامنة لكل مستخدم حتى لا
+    تستهلك موجة تسجيل دخول كل الموارد، ويعيد التشفير تلقائيًا عند تغيير التكلفة.
+    """
+    
+    def __init__(self, rounds: int, max_workers: int, max_concurrency: int, per_user_limit: int = 1):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.per_user_limit = per_user_limit
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._per_user: Dict[str, list] = {}  # اسم المستخدم -> [Semaphore, عدد المستخدمين]
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+    
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+    
+    async def _run(self, username: Optional[str], func, *args):
+        entry = None
+        if username is not None:
+            entry = self._per_user.setdefault(username, [asyncio.Semaphore(self.per_user_limit), 0])
+            entry[1] += 1
+        try:
+            if entry is not None:
+                await entry[0].acquire()
+            try:
+                async with self._global:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(self._get_pool(), func, *args)
+            finally:
+                if entry is not None:
+                    entry[0].release()
+        finally:
+            if entry is not None:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._per_user[username]
+    
+    async def hash(self, password: str, username: Optional[str] = None) -> str:
+        """تشفير كلمة مرور بالتكلفة الحالية"""
+        return await self._run(username, _hash, password, self.rounds)
+    
+    async def verify_and_update(self, password: str, hashed_password: str,
+                                username: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """التحقق من كلمة المرور وإرجاع تشفير جديد إذا تغيرت التكلفة أو الخوارزمية"""
+        return await self._run(username, _verify_and_update, password, hashed_password, self.rounds)
+    
+    async def verify(self, password: str, hashed_password: str, username: Optional[str] = None) -> bool:
+        valid, _ = await self.verify_and_update(password, hashed_password, username)
+        return valid
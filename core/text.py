@@ -0,0 +1,20 @@
+import re
+
+# التشكيل وعلامات القرآن والتطويل
+_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+
+# توحيد أشكال الحروف المتقاربة
+_LETTERS = str.maketrans({
+    "\u0623": "\u0627",  # أ -> ا
+    "\u0625": "\u0627",  # إ -> ا
+    "\u0622": "\u0627",  # آ -> ا
+    "\u0671": "\u0627",  # ٱ -> ا
+    "\u0649": "\u064a",  # ى -> ي
+    "\u0629": "\u0647",  # ة -> ه
+})
+
+def normalize_arabic(text: str) -> str:
+    """توحيد النص العربي للبحث: إزالة التشكيل وتوحيد الألف والياء والتاء المربوطة"""
+    if not text:
+        return ""
+    return _DIACRITICS.sub("", text).translate(_LETTERS).lower()
@@ -0,0 +1,128 @@
+"""الفهرس المعكوس للكيانات المذكورة في القضايا (case_entities)
+
+تُستخرج الكيانات (rules_engine.entities) من عنوان القضية ووصفها ومن رابط مصدر
+كل دليل، وتُحدَّث تلقائيًا عند إنشاء القضية أو تعديلها أو إضافة دليل. البحث
+بقيمة يمر على المفتاح الأساسي (value, ...) فلا يمسح القضايا.
+
+إعادة البناء الكامل (وفهرسة القضايا السابقة لهذه الميزة):
+    python -m app.database.entities
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, inspect, insert, select
+
+from app.database import models
+from app.rules_engine.entities import DOMAIN, extract_entities
+
+CASE_SOURCE = "case"
+
+_INDEXED_FIELDS: List[str] = ["title", "description"]
+
+def _entities(*texts: Optional[str]) -> Dict[str, str]:
+    """القيمة ← النوع؛ عند تطابق قيمتين يُفضل النوع الأدق (رابط بلا مسار = نطاقه)"""
+    values: Dict[str, str] = {}
+    for text in texts:
+        for kind, value in extract_entities(text or ""):
+            if values.get(value, DOMAIN) == DOMAIN:
+                values[value] = kind
+    return values
+
+def _case_rows(case_pk: int, title: Optional[str], description: Optional[str]) -> List[dict]:
+    return [
+        {"value": value, "kind": kind, "case_id": case_pk, "source": CASE_SOURCE}
+        for value, kind in _entities(title, description).items()
+    ]
+
+def _evidence_rows(case_pk: int, evidence_id: str, source_url: Optional[str]) -> List[dict]:
+    return [
+        {"value": value, "kind": kind, "case_id": case_pk, "source": evidence_id}
+        for value, kind in _entities(source_url).items()
+    ]
+
+def _insert(connection, rows: List[dict]):
+    if rows:
+        connection.execute(insert(models.CaseEntity.__table__), rows)
+
+def _delete(connection, case_pk: int, source: Optional[str] = None):
+    table = models.CaseEntity.__table__
+    query = delete(table).where(table.c.case_id == case_pk)
+    if source is not None:
+        query = query.where(table.c.source == source)
+    connection.execute(query)
+
+@event.listens_for(models.Case, "after_insert")
+def _index_new_case(mapper, connection, target):
+    _insert(connection, _case_rows(target.id, target.title, target.description))
+
+@event.listens_for(models.Case, "after_update")
+def _reindex_case(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _INDEXED_FIELDS):
+        _delete(connection, target.id, CASE_SOURCE)
+        _insert(connection, _case_rows(target.id, target.title, target.description))
+
+@event.listens_for(models.Case, "after_delete")
+def _unindex_case(mapper, connection, target):
+    # لا يُعتمد على ON DELETE CASCADE (معطل افتراضيًا في SQLite)
+    _delete(connection, target.id)
+
+@event.listens_for(models.Evidence, "after_insert")
+def _index_new_evidence(mapper, connection, target):
+    _insert(connection, _evidence_rows(target.case_id, target.evidence_id, target.source_url))
+
+@event.listens_for(models.Evidence, "after_delete")
+def _unindex_evidence(mapper, connection, target):
+    _delete(connection, target.case_id, target.evidence_id)
+
+def index_rows(connection, rows: List[dict]):
+    """فهرسة قضايا مُدرجة جماعيًا (الإدراج عبر Core لا يمر بأحداث ORM)"""
+    entity_rows = []
+    for row in rows:
+        entity_rows.extend(_case_rows(row["id"], row.get("title"), row.get("description")))
+    _insert(connection, entity_rows)
+
+def _batches(connection, query, batch_size: int) -> Iterable[list]:
+    last_id = 0
+    while True:
+        rows = connection.execute(query.where(query.selected_columns[0] > last_id).limit(batch_size)).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+def rebuild_entity_index(connection, batch_size: int = 5000) -> Tuple[int, int]:
+    """إعادة بناء الفهرس بالكامل من القضايا والأدلة وإرجاع (عدد القضايا، عدد الكيانات)"""
+    connection.execute(delete(models.CaseEntity.__table__))
+    cases = models.Case.__table__
+    evidence = models.Evidence.__table__
+    
+    case_count = 0
+    entity_count = 0
+    query = select(cases.c.id, cases.c.title, cases.c.description).order_by(cases.c.id)
+    for rows in _batches(connection, query, batch_size):
+        entity_rows = [r for row in rows for r in _case_rows(row.id, row.title, row.description)]
+        _insert(connection, entity_rows)
+        case_count += len(rows)
+        entity_count += len(entity_rows)
+    
+    query = (
+        select(evidence.c.id, evidence.c.case_id, evidence.c.evidence_id, evidence.c.source_url)
+        .where(evidence.c.source_url.is_not(None))
+        .order_by(evidence.c.id)
+    )
+    for rows in _batches(connection, query, batch_size):
+        entity_rows = [r for row in rows for r in _evidence_rows(row.case_id, row.evidence_id, row.source_url)]
+        _insert(connection, entity_rows)
+        entity_count += len(entity_rows)
+    
+    return case_count, entity_count
+
+def main():
+    from app.database.session import engine
+    
+    with engine.begin() as connection:
+        cases, entities = rebuild_entity_index(connection)
+    print(f"✅ تمت فهرسة {entities} كيان من {cases} قضية")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""تهيئة قاعدة البيانات والمخزن مرة واحدة عند النشر أو الترقية
+
+يُشغَّل قبل تشغيل الخادم (وليس من كل عامل عند بدئه):
+    python -m app.database.init [--admin-password ...]
+
+ينشئ المجلدات، ويرقي المخطط إلى آخر ترحيل، وينشئ المستخدم المسؤول الافتراضي
+إن لم يوجد. تكرار التشغيل آمن ولا يعيد إلا ما ينقص.
+"""
+import argparse
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import inspect
+
+from app.core.config import settings
+from app.database import models
+from app.database.entities import rebuild_entity_index
+from app.database.search import ensure_search_index, rebuild_search_index
+from app.database.session import engine, Base, SessionLocal
+from app.database.stats import rebuild_case_stats
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+REQUIRED_DIRS = [
+    "storage",
+    "storage/evidence",
+    "storage/databases",
+    "logs"
+]
+
+def create_required_dirs():
+    for dir_path in REQUIRED_DIRS:
+        Path(dir_path).mkdir(parents=True, exist_ok=True)
+    settings.EVIDENCE_STORAGE_PATH.mkdir(parents=True, exist_ok=True)
+
+def migrate_schema() -> str:
+    """ترقية المخطط إلى آخر ترحيل وإرجاع ما تم (upgraded أو stamped)"""
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(str(ALEMBIC_INI))
+    tables = inspect(engine).get_table_names()
+    if "alembic_version" not in tables and "cases" in tables:
+        # قاعدة أنشأها الخادم سابقًا بـ create_all دون ترحيلات: تُكمل الجداول
+        # الناقصة ويُعاد بناء الفهرس والإحصائيات ثم تُعلَّم بآخر ترحيل
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            ensure_search_index(connection)
+            rebuild_search_index(connection)
+            rebuild_case_stats(connection)
+            rebuild_entity_index(connection)
+        command.stamp(config, "head")
+        return "stamped"
+    
+    command.upgrade(config, "head")
+    return "upgraded"
+
+def ensure_admin(password: str) -> bool:
+    """إنشاء المستخدم المسؤول الافتراضي إن لم يكن موجودًا (التشفير يتم مرة واحدة فقط)"""
+    from app.core.auth import get_password_hash
+    
+    db = SessionLocal()
+    try:
+        if db.query(models.User.id).filter(models.User.username == "admin").first():
+            return False
+        db.add(models.User(
+            username="admin",
+            email="admin@cybershield.legal",
+            full_name="System Administrator",
+            hashed_password=get_password_hash(password),
+            role=models.UserRole.ADMIN
+        ))
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+def init_database(admin_password: Optional[str] = None) -> str:
+    create_required_dirs()
+    action = migrate_schema()
+    if ensure_admin(admin_password or settings.ADMIN_INITIAL_PASSWORD):
+        print("✅ تم إنشاء المستخدم المسؤول الافتراضي")
+    return action
+
+def main():
+    parser = argparse.ArgumentParser(description="تهيئة قاعدة البيانات والمخزن")
+    parser.add_argument("--admin-password", help="كلمة مرور المسؤول الافتراضي عند إنشائه")
+    args = parser.parse_args()
+    
+    action = init_database(args.admin_password)
+    if action == "stamped":
+        print("✅ اكتملت الجداول وعُلمت القاعدة بآخر ترحيل")
+    else:
+        print("✅ المخطط محدث إلى آخر ترحيل")
+
+if __name__ == "__main__":
+    main()
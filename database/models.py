@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, Enum
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Boolean, JSON, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.session import Base
@@ -48,9 +48,20 @@ class Case(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     closed_at = Column(DateTime(timezone=True), nullable=True)
     tags = Column(JSON, default=[])
+    # نسخة قواعد التصنيف التي صنفت القضية
+    rule_version = Column(String(20), nullable=True)
     
     reporter = relationship("User", foreign_keys=[reporter_id])
     assigned_user = relationship("User", foreign_keys=[assigned_to])
+    
+    # فهارس مركبة تطابق فلاتر القائمة وترتيب الصفحات (created_at, id)
+    __table_args__ = (
+        Index("ix_cases_created_at_id", "created_at", "id"),
+        Index("ix_cases_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_cases_priority_created_at_id", "priority", "created_at", "id"),
+        Index("ix_cases_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_cases_reporter_id_created_at_id", "reporter_id", "created_at", "id"),
+    )
 
 class Evidence(Base):
     __tablename__ = "evidence"
@@ -62,8 +73,42 @@ class Evidence(Base):
     file_hash = Column(String(64), nullable=False)  # SHA256
     file_path = Column(Text, nullable=False)
     source_url = Column(Text)
-    metadata = Column(JSON, default={})
+    # الاسم metadata محجوز في SQLAlchemy، لذا يُربط العمود باسم مختلف
+    metadata_ = Column("metadata", JSON, default={})
     collected_at = Column(DateTime(timezone=True), server_default=func.now())
     integrity_verified = Column(Boolean, default=False)
+    last_verified_at = Column(DateTime(timezone=True), nullable=True)
     
     case = relationship("Case", backref="evidences")
+
+class CaseStat(Base):
+    """عدد القضايا الحالي لكل قيمة من أبعاد لوحة المتابعة (يُحدَّث تدريجيًا)"""
+    __tablename__ = "case_stats"
+    
+    dimension = Column(String(20), primary_key=True)  # status, priority, category, assignee
+    value = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class CaseDailyStat(Base):
+    """عدد القضايا التي دخلت كل قيمة في كل يوم (إنشاءً أو تغييرًا)"""
+    __tablename__ = "case_daily_stats"
+    
+    day = Column(Date, primary_key=True)
+    dimension = Column(String(20), primary_key=True)
+    value = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class CaseEntity(Base):
+    """فهرس معكوس للكيانات (هواتف، حسابات، روابط، محافظ...) المذكورة في القضايا"""
+    __tablename__ = "case_entities"
+    
+    value = Column(String(512), primary_key=True)  # القيمة الموحدة (rules_engine.entities)
+    case_id = Column(Integer, ForeignKey("cases.id", ondelete="CASCADE"), primary_key=True)
+    # "case" لعنوان القضية ووصفها، أو معرف الدليل لرابط مصدره
+    source = Column(String(20), primary_key=True)
+    kind = Column(String(20), nullable=False)
+    
+    # البحث بالقيمة يستخدم المفتاح الأساسي، وهذا الفهرس لإعادة فهرسة قضية أو دليل
+    __table_args__ = (
+        Index("ix_case_entities_case_id_source", "case_id", "source"),
+    )
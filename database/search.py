@@ -0,0 +1,149 @@
+"""فهرس البحث النصي في القضايا (SQLite FTS5)
+
+يُخزن في جدول cases_fts نص موحّد (normalize_arabic) للعنوان والوصف والوسوم
+بنفس rowid القضية، ويُحدَّث تلقائيًا عند إنشاء القضية أو تعديلها.
+
+إعادة البناء الكامل من جدول cases:
+    python -m app.database.search
+"""
+import json
+import re
+from typing import List, Optional
+
+from sqlalchemy import Float, String, column, event, inspect, text
+from sqlalchemy.sql.selectable import TextualSelect
+
+from app.core.text import normalize_arabic
+from app.database import models
+
+CREATE_FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5(
+    title, description, tags,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+# أوزان bm25 للأعمدة: العنوان أهم من الوسوم ثم الوصف
+RANK_EXPRESSION = "bm25(cases_fts, 10.0, 1.0, 4.0)"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def _is_sqlite(connection) -> bool:
+    return connection.dialect.name == "sqlite"
+
+def ensure_search_index(connection):
+    """إنشاء جدول الفهرس إن لم يكن موجودًا"""
+    if _is_sqlite(connection):
+        connection.execute(text(CREATE_FTS_TABLE))
+
+def _document(case) -> dict:
+    return _document_values(case.id, case.title, case.description, case.tags)
+
+def _document_values(rowid: int, title, description, tags) -> dict:
+    tags = tags or []
+    if isinstance(tags, str):  # صفوف الاستعلامات النصية تعيد JSON كنص
+        tags = json.loads(tags) or []
+    return {
+        "rowid": rowid,
+        "title": normalize_arabic(title or ""),
+        "description": normalize_arabic(description or ""),
+        "tags": normalize_arabic(" ".join(str(t) for t in tags))
+    }
+
+def index_case(connection, case):
+    """إضافة قضية إلى الفهرس أو تحديثها"""
+    connection.execute(text("DELETE FROM cases_fts WHERE rowid = :rowid"), {"rowid": case.id})
+    connection.execute(
+        text("INSERT INTO cases_fts(rowid, title, description, tags) VALUES (:rowid, :title, :description, :tags)"),
+        _document(case)
+    )
+
+def index_rows(connection, rows: List[dict]):
+    """فهرسة قضايا مُدرجة جماعيًا (الإدراج عبر Core لا يمر بأحداث ORM)"""
+    if not _is_sqlite(connection) or not rows:
+        return
+    connection.execute(
+        text("INSERT INTO cases_fts(rowid, title, description, tags) VALUES (:rowid, :title, :description, :tags)"),
+        [_document_values(row["id"], row["title"], row["description"], row["tags"]) for row in rows]
+    )
+
+def rebuild_search_index(connection, batch_size: int = 5000) -> int:
+    """إعادة بناء الفهرس بالكامل من جدول cases"""
+    ensure_search_index(connection)
+    connection.execute(text("DELETE FROM cases_fts"))
+    
+    count = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            text("SELECT id, title, description, tags FROM cases WHERE id > :last ORDER BY id LIMIT :limit"),
+            {"last": last_id, "limit": batch_size}
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            text("INSERT INTO cases_fts(rowid, title, description, tags) VALUES (:rowid, :title, :description, :tags)"),
+            [_document(row) for row in rows]
+        )
+        count += len(rows)
+        last_id = rows[-1].id
+    
+    return count
+
+def build_match_query(query: str, prefix: bool = True) -> Optional[str]:
+    """تحويل نص المستخدم إلى تعبير MATCH آمن (كل الكلمات مطلوبة)"""
+    tokens = _TOKEN.findall(normalize_arabic(query))
+    if not tokens:
+        return None
+    suffix = "*" if prefix else ""
+    return " ".join(f'"{token}"{suffix}' for token in tokens)
+
+def search_sql(restrict_reporter: bool) -> str:
+    where = "cases_fts MATCH :match"
+    if restrict_reporter:
+        where += " AND c.reporter_id = :reporter_id"
+    return f"""
+        SELECT c.case_id, c.title, c.status, c.priority, c.category, c.created_at,
+               {RANK_EXPRESSION} AS rank,
+               snippet(cases_fts, 1, '[', ']', '…', 16) AS snippet
+        FROM cases_fts
+        JOIN cases c ON c.id = cases_fts.rowid
+        WHERE {where}
+        ORDER BY rank
+        LIMIT :limit
+    """
+
+def search_query(restrict_reporter: bool) -> TextualSelect:
+    """search_sql بأنواع أعمدة النموذج: الحالة قيمة CaseStatus والتاريخ datetime لا نص SQLite الخام"""
+    table = models.Case.__table__
+    return text(search_sql(restrict_reporter)).columns(
+        table.c.case_id, table.c.title, table.c.status, table.c.priority,
+        table.c.category, table.c.created_at,
+        column("rank", Float), column("snippet", String)
+    )
+
+_INDEXED_FIELDS: List[str] = ["title", "description", "tags"]
+
+@event.listens_for(models.Case, "after_insert")
+def _index_new_case(mapper, connection, target):
+    if _is_sqlite(connection):
+        index_case(connection, target)
+
+@event.listens_for(models.Case, "after_update")
+def _reindex_case(mapper, connection, target):
+    if not _is_sqlite(connection):
+        return
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _INDEXED_FIELDS):
+        index_case(connection, target)
+
+def main():
+    from app.database.session import engine
+    
+    with engine.begin() as connection:
+        count = rebuild_search_index(connection)
+    print(f"✅ تمت فهرسة {count} قضية")
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,118 @@
-from sqlalchemy import create_engine
+import logging
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core import metrics
+
+IS_SQLITE = settings.SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+def _async_url(url: str) -> str:
+    # المشغلات غير المتزامنة: aiosqlite لـ SQLite و asyncpg لـ PostgreSQL
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith(("postgresql:", "postgres:")):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+def _sync_url(url: str) -> str:
+    # SQLAlchemy لا يقبل البادئة القديمة postgres://
+    if url.startswith("postgres:"):
+        return "postgresql:" + url[len("postgres:"):]
+    return url
+
+def _engine_options(is_async: bool) -> dict:
+    """إعدادات الاتصال حسب نوع قاعدة البيانات"""
+    if IS_SQLITE:
+        return {"connect_args": {"check_same_thread": False}}  # ضروري لـ SQLite
+    
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if is_async:
+        # ذاكرة العبارات المجهزة في asyncpg لكل اتصال
+        options["connect_args"] = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    else:
+        options["query_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """وضع WAL وإعدادات الأداء لكل اتصال جديد"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+slow_query_logger = logging.getLogger("app.db.slow")
+
+# أنواع العبارات المعروفة (غيرها يُجمع تحت OTHER حتى لا تتضخم التسميات)
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "CREATE"}
 
-# إنشاء محرك SQLite
-engine = create_engine(
-    settings.SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # ضروري لـ SQLite
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip()[:8].split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    if operation not in _OPERATIONS:
+        operation = "OTHER"
+    metrics.DB_QUERIES.inc(operation=operation)
+    metrics.DB_DURATION.observe(elapsed, operation=operation)
+    if elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+        metrics.DB_SLOW_QUERIES.inc(operation=operation)
+        slow_query_logger.warning("استعلام بطيء (%.0f ms): %s", elapsed * 1000, statement[:1000])
+
+def instrument_engine(sync_engine):
+    """تسجيل عدد الاستعلامات وزمنها والاستعلامات البطيئة لكل محرك"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+# المحرك المتزامن (للسكربتات والمهام الخلفية والترحيلات)
+engine = create_engine(_sync_url(settings.SQLALCHEMY_DATABASE_URL), **_engine_options(is_async=False))
+
+# المحرك غير المتزامن (لنقاط النهاية)
+async_engine = create_async_engine(
+    _async_url(settings.SQLALCHEMY_DATABASE_URL),
+    **_engine_options(is_async=True)
 )
 
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
 # إنشاء جلسة محلية
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# إنشاء جلسة غير متزامنة
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False  # تجنب التحميل الكسول بعد commit في الوضع غير المتزامن
+)
+
 # القاعدة للنماذج
 Base = declarative_base()
 
 # Dependency للحصول على جلسة DB
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
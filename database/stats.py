@@ -0,0 +1,196 @@
+"""إحصائيات القضايا التراكمية للوحات المتابعة
+
+case_stats: عدد القضايا الحالي لكل (بُعد، قيمة)
+case_daily_stats: عدد القضايا التي دخلت كل قيمة في كل يوم
+
+يُحدَّث الجدولان تدريجيًا عند إنشاء القضية أو تغيير حالتها أو أولويتها أو
+فئتها أو المكلف بها أو حذفها. التحديثات الجماعية عبر Core (update()) لا
+تمر بهذه الأحداث، لذا يمكن إعادة البناء الكامل في أي وقت:
+    python -m app.database.stats
+"""
+import enum
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, event, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.database import models
+
+# اسم البعد -> عمود القضية
+DIMENSIONS = {
+    "status": "status",
+    "priority": "priority",
+    "category": "category",
+    "assignee": "assigned_to",
+}
+NONE_VALUE = "none"
+
+_DIALECT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+def _value(value) -> str:
+    if value is None:
+        return NONE_VALUE
+    if isinstance(value, enum.Enum):
+        return value.value
+    return str(value)
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+def _increment(connection, table, keys: dict, delta: int):
+    """إضافة delta إلى عداد بعملية ذرية واحدة (upsert)"""
+    dialect_insert = _DIALECT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(table).values(**keys, count=delta)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={"count": table.c.count + statement.excluded.count}
+        )
+        connection.execute(statement)
+        return
+    
+    # قواعد أخرى: تحديث ثم إدراج إن لم يوجد الصف
+    condition = [table.c[key] == value for key, value in keys.items()]
+    result = connection.execute(update(table).where(*condition).values(count=table.c.count + delta))
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**keys, count=delta))
+
+def _apply(connection, changes: List[Tuple[str, str, int]], entered: List[Tuple[str, str]]):
+    totals = models.CaseStat.__table__
+    daily = models.CaseDailyStat.__table__
+    for dimension, value, delta in changes:
+        _increment(connection, totals, {"dimension": dimension, "value": value}, delta)
+    day = _today()
+    for dimension, value in entered:
+        _increment(connection, daily, {"day": day, "dimension": dimension, "value": value}, 1)
+
+@event.listens_for(models.Case, "after_insert")
+def _count_new_case(mapper, connection, target):
+    values = [(dimension, _value(getattr(target, attr))) for dimension, attr in DIMENSIONS.items()]
+    _apply(connection, [(d, v, 1) for d, v in values], values)
+
+@event.listens_for(models.Case, "after_update")
+def _count_case_change(mapper, connection, target):
+    state = inspect(target)
+    changes = []
+    entered = []
+    for dimension, attr in DIMENSIONS.items():
+        history = state.attrs[attr].history
+        if not history.has_changes():
+            continue
+        old = _value(history.deleted[0]) if history.deleted else None
+        new = _value(getattr(target, attr))
+        if old == new:
+            continue
+        if old is not None:
+            changes.append((dimension, old, -1))
+        changes.append((dimension, new, 1))
+        entered.append((dimension, new))
+    if changes:
+        _apply(connection, changes, entered)
+
+@event.listens_for(models.Case, "after_delete")
+def _count_deleted_case(mapper, connection, target):
+    state = inspect(target)
+    changes = []
+    for dimension, attr in DIMENSIONS.items():
+        # القيمة الأصلية إن كانت القضية عُدلت في نفس الجلسة قبل حذفها
+        history = state.attrs[attr].history
+        value = history.deleted[0] if history.deleted else getattr(target, attr)
+        changes.append((dimension, _value(value), -1))
+    _apply(connection, changes, [])
+
+def count_new_cases(connection, rows: List[dict]):
+    """إضافة قضايا مُدرجة جماعيًا إلى الإحصائيات بعملية واحدة لكل قيمة"""
+    totals = Counter()
+    daily = Counter()
+    for row in rows:
+        day = _as_date(row["created_at"]) if row.get("created_at") else _today()
+        for dimension, attr in DIMENSIONS.items():
+            value = _value(row.get(attr))
+            totals[(dimension, value)] += 1
+            daily[(day, dimension, value)] += 1
+    
+    for (dimension, value), count in totals.items():
+        _increment(connection, models.CaseStat.__table__, {"dimension": dimension, "value": value}, count)
+    for (day, dimension, value), count in daily.items():
+        _increment(connection, models.CaseDailyStat.__table__,
+                   {"day": day, "dimension": dimension, "value": value}, count)
+
+def rebuild_case_stats(connection) -> int:
+    """إعادة بناء الإحصائيات من جدول cases وإرجاع عدد القضايا
+    
+    لا يُعرف تاريخ التغييرات السابقة، لذا تُحسب السلسلة اليومية من تاريخ
+    إنشاء كل قضية وقيمها الحالية.
+    """
+    cases = models.Case.__table__
+    totals = models.CaseStat.__table__
+    daily = models.CaseDailyStat.__table__
+    connection.execute(delete(totals))
+    connection.execute(delete(daily))
+    
+    count = connection.scalar(select(func.count()).select_from(cases)) or 0
+    for dimension, attr in DIMENSIONS.items():
+        column = cases.c[attr]
+        rows = connection.execute(select(column, func.count()).group_by(column)).all()
+        if rows:
+            connection.execute(totals.insert(), [
+                {"dimension": dimension, "value": _value(value), "count": n}
+                for value, n in rows
+            ])
+        
+        day = func.date(cases.c.created_at)
+        rows = connection.execute(
+            select(day, column, func.count())
+            .where(cases.c.created_at.is_not(None))
+            .group_by(day, column)
+        ).all()
+        if rows:
+            connection.execute(daily.insert(), [
+                {"day": _as_date(d), "dimension": dimension, "value": _value(value), "count": n}
+                for d, value, n in rows
+            ])
+    
+    return count
+
+def _as_date(value) -> date:
+    if isinstance(value, str):  # SQLite تعيد date() كنص
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+async def read_case_stats(db, days: int) -> Tuple[Dict[str, Dict[str, int]], List[tuple]]:
+    """قراءة الإجماليات والسلسلة اليومية لآخر days يوم
+    
+    حجم النتيجة يعتمد على عدد القيم والأيام فقط لا على عدد القضايا.
+    """
+    totals: Dict[str, Dict[str, int]] = {dimension: {} for dimension in DIMENSIONS}
+    for dimension, value, count in (await db.execute(
+        select(models.CaseStat.dimension, models.CaseStat.value, models.CaseStat.count)
+        .where(models.CaseStat.count > 0)
+    )).all():
+        totals.setdefault(dimension, {})[value] = count
+    
+    since = _today() - timedelta(days=days - 1)
+    rows = (await db.execute(
+        select(models.CaseDailyStat.day, models.CaseDailyStat.dimension,
+               models.CaseDailyStat.value, models.CaseDailyStat.count)
+        .where(models.CaseDailyStat.day >= since)
+        .order_by(models.CaseDailyStat.day)
+    )).all()
+    
+    return totals, rows
+
+def main():
+    from app.database.session import engine
+    
+    with engine.begin() as connection:
+        count = rebuild_case_stats(connection)
+    print(f"✅ تمت إعادة بناء إحصائيات {count} قضية")
+
+if __name__ == "__main__":
+    main()
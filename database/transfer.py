@@ -0,0 +1,278 @@
+"""تحويل القضايا من وإلى صيغ النقل بالجملة: NDJSON و CSV و Parquet (مع pyarrow)
+
+القراءة والكتابة متدفقتان سجلًا بسجل، فلا يُحمَّل الملف كاملاً في الذاكرة.
+Parquet لا يُقرأ إلا من ملف كامل (الفهرس في آخره)، لذا يُخزن مؤقتًا على القرص.
+"""
+import asyncio
+import csv
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.database import models
+
+# Parquet اختياري، و pyarrow يُستورد عند أول استخدام لا عند بدء الخادم (استيراده بطيء)
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+def _pyarrow():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+FORMATS = ("ndjson", "csv", "parquet")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_FIELDS = [
+    "case_id", "title", "description", "category", "priority", "status", "tags",
+    "reporter_id", "assigned_to", "created_at", "updated_at", "closed_at", "rule_version"
+]
+_INT_FIELDS = {"reporter_id", "assigned_to"}
+
+# (رقم السطر، السجل، رسالة الخطأ)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+def _text(value, field: str, required: bool = False, max_length: Optional[int] = None) -> Optional[str]:
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"الحقل {field} مطلوب")
+        return None
+    if not isinstance(value, str):
+        value = str(value)
+    if max_length and len(value) > max_length:
+        raise ValueError(f"الحقل {field} أطول من {max_length} حرفًا")
+    return value
+
+def _datetime(value, field: str) -> Optional[datetime]:
+    """تاريخ بتوقيت UTC دون منطقة زمنية كبقية التواريخ المخزنة (الأعمدة لا تحفظ الإزاحة)"""
+    if value is None or value == "":
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"تاريخ غير صالح في الحقل {field}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _tags(value) -> List[str]:
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        # CSV: قائمة JSON أو قيم مفصولة بفواصل
+        if value.lstrip().startswith("["):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise ValueError("الحقل tags غير صالح")
+        else:
+            return [tag.strip() for tag in value.split(",") if tag.strip()]
+    if not isinstance(value, list):
+        raise ValueError("الحقل tags يجب أن يكون قائمة")
+    return [str(tag) for tag in value]
+
+def parse_record(record: Dict[str, Any], reporter_id: int) -> Dict[str, Any]:
+    """تحويل سجل مستورد إلى قيم أعمدة جدول cases (كل الأعمدة مملوءة للإدراج الجماعي)"""
+    status = record.get("status") or models.CaseStatus.NEW.value
+    try:
+        status = models.CaseStatus(status)
+    except ValueError:
+        raise ValueError(f"حالة غير معروفة: {status}")
+    
+    assigned_to = record.get("assigned_to")
+    if assigned_to in ("", None):
+        assigned_to = None
+    else:
+        try:
+            assigned_to = int(assigned_to)
+        except (TypeError, ValueError):
+            raise ValueError("الحقل assigned_to يجب أن يكون رقمًا")
+    
+    # المعرف الأصلي يُحفظ عند الترحيل، وإلا يُولد معرف جديد
+    case_id = _text(record.get("case_id"), "case_id", max_length=20) or f"CASE-{uuid.uuid4().hex[:8].upper()}"
+    
+    return {
+        "case_id": case_id,
+        "title": _text(record.get("title"), "title", required=True, max_length=200),
+        "description": _text(record.get("description"), "description"),
+        "reporter_id": reporter_id,
+        "status": status,
+        "priority": _text(record.get("priority"), "priority", max_length=10) or "medium",
+        "category": _text(record.get("category"), "category", max_length=50),
+        "assigned_to": assigned_to,
+        "created_at": _datetime(record.get("created_at"), "created_at") or datetime.now(timezone.utc),
+        "closed_at": _datetime(record.get("closed_at"), "closed_at"),
+        "tags": _tags(record.get("tags")),
+        "rule_version": None
+    }
+
+def to_record(row) -> Dict[str, Any]:
+    """صف من جدول cases إلى سجل قابل للتحويل إلى JSON"""
+    record = {}
+    for field in EXPORT_FIELDS:
+        value = row[field]
+        if isinstance(value, models.CaseStatus):
+            value = value.value
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        record[field] = value
+    return record
+
+async def _lines(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for data in stream:
+        buffer += data
+        *complete, buffer = buffer.split(b"\n")
+        for line in complete:
+            yield line
+    if buffer:
+        yield buffer
+
+async def _ndjson_records(stream: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    line_number = 0
+    async for line in _lines(stream):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError
+        except ValueError:
+            yield line_number, None, "سطر JSON غير صالح"
+            continue
+        yield line_number, record, None
+
+async def _csv_records(stream: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    header = None
+    pending = ""
+    line_number = 0
+    start_line = 0
+    async for line in _lines(stream):
+        line_number += 1
+        if not pending:
+            start_line = line_number
+        pending += line.decode("utf-8-sig" if line_number == 1 else "utf-8", errors="replace") + "\n"
+        # السجل يكتمل عندما تُغلق كل علامات الاقتباس (قد تمتد الحقول على عدة أسطر)
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, ""
+        if not text.strip():
+            continue
+        
+        values = next(csv.reader(io.StringIO(text)), [])
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start_line, None, "عدد الأعمدة لا يطابق العناوين"
+            continue
+        yield start_line, dict(zip(header, values)), None
+    
+    if pending.strip():
+        yield start_line, None, "علامة اقتباس غير مغلقة"
+
+async def _parquet_records(stream: AsyncIterator[bytes], batch_size: int) -> AsyncIterator[Record]:
+    fd, temp_path = tempfile.mkstemp(suffix=".parquet")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for data in stream:
+                f.write(data)
+        
+        pa, pq = _pyarrow()
+        row_number = 0
+        try:
+            batches = pq.ParquetFile(temp_path).iter_batches(batch_size=batch_size)
+        except pa.ArrowException:
+            yield 0, None, "ملف Parquet غير صالح"
+            return
+        while True:
+            # فك ضغط المجموعات خارج حلقة الأحداث
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            for record in batch.to_pylist():
+                row_number += 1
+                yield row_number, record, None
+    finally:
+        os.unlink(temp_path)
+
+def read_records(stream: AsyncIterator[bytes], fmt: str, batch_size: int = 1000) -> AsyncIterator[Record]:
+    """قراءة سجلات متدفقة من جسم الطلب حسب الصيغة"""
+    if fmt == "csv":
+        return _csv_records(stream)
+    if fmt == "parquet":
+        return _parquet_records(stream, batch_size)
+    return _ndjson_records(stream)
+
+def _csv_line(values: List[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+def _csv_value(field: str, value):
+    if value is None:
+        return ""
+    if field == "tags":
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def _parquet_schema(pa):
+    return pa.schema([
+        (field, pa.int64() if field in _INT_FIELDS else pa.string())
+        for field in EXPORT_FIELDS
+    ])
+
+async def encode_records(batches: AsyncIterator[List[Dict[str, Any]]], fmt: str) -> AsyncIterator[bytes]:
+    """ترميز دفعات السجلات إلى الصيغة المطلوبة دفعة بدفعة"""
+    if fmt == "parquet":
+        async for data in _encode_parquet(batches):
+            yield data
+        return
+    
+    if fmt == "csv":
+        yield ("\ufeff" + _csv_line(EXPORT_FIELDS)).encode("utf-8")  # BOM ليتعرف Excel على UTF-8
+    async for batch in batches:
+        if fmt == "csv":
+            text = "".join(
+                _csv_line([_csv_value(field, record[field]) for field in EXPORT_FIELDS])
+                for record in batch
+            )
+        else:
+            text = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch)
+        yield text.encode("utf-8")
+
+async def _encode_parquet(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    # Parquet يكتب فهرسه في النهاية، لذا يُبنى في ملف مؤقت مجموعةً بمجموعة ثم يُرسل
+    pa, pq = _pyarrow()
+    schema = _parquet_schema(pa)
+    fd, temp_path = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        writer = pq.ParquetWriter(temp_path, schema, compression="zstd")
+        try:
+            async for batch in batches:
+                for record in batch:
+                    record["tags"] = json.dumps(record["tags"], ensure_ascii=False) if record["tags"] is not None else None
+                table = pa.Table.from_pylist(batch, schema=schema)
+                await asyncio.to_thread(writer.write_table, table)
+        finally:
+            writer.close()
+        
+        with open(temp_path, "rb") as f:
+            while True:
+                data = await asyncio.to_thread(f.read, 1024 * 1024)
+                if not data:
+                    break
+                yield data
+    finally:
+        os.unlink(temp_path)
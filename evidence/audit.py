@@ -0,0 +1,250 @@
+"""فحص دوري لسلامة الأدلة في الخلفية
+
+تُعاد حسابات البصمات بمجمع خيوط محدود وقراءات متتابعة كبيرة مع تحديد
+عرض النطاق، ويُحفظ التقدم بعد كل دفعة حتى يُستأنف العمل بعد إعادة التشغيل.
+كل عمليات الخادم تستأنف المهام عند بدئها، وقفل ملف لكل مهمة يضمن أن تنفذها
+عملية واحدة (يتحرر تلقائيًا إن توقفت فتستأنفها غيرها).
+"""
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import update
+
+from app.database import models
+from app.evidence import compression, custody
+
+# حجم القراءة المتتابعة عند إعادة حساب البصمة
+READ_SIZE = 8 * 1024 * 1024  # 8MB
+
+class RateLimiter:
+    """تحديد عرض نطاق القراءة (بايت/ثانية) بين جميع الخيوط"""
+    
+    def __init__(self, bytes_per_second: int):
+        self.bytes_per_second = bytes_per_second
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+    
+    def consume(self, size: int):
+        if self.bytes_per_second <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + size / self.bytes_per_second
+        if start > now:
+            time.sleep(start - now)
+
+def hash_file_throttled(path: Path, limiter: RateLimiter) -> str:
+    """حساب البصمة بقراءات كبيرة متتابعة مع احترام حد عرض النطاق"""
+    hasher = hashlib.sha256()
+    buffer = bytearray(READ_SIZE)
+    view = memoryview(buffer)
+    # الملفات المضغوطة تُقرأ بعد فك ضغطها (البصمة للمحتوى الأصلي)
+    with (compression.open_blob(path) if compression.codec_for_path(path) else open(path, 'rb', buffering=0)) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            limiter.consume(size)
+            hasher.update(view[:size])
+    return hasher.hexdigest()
+
+class IntegrityAuditor:
+    def __init__(self, session_factory, state_path: Path, workers: int = 4,
+                 bytes_per_second: int = 0, batch_size: int = 100):
+        self.session_factory = session_factory
+        self.state_path = state_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(bytes_per_second)
+        self._lock = threading.Lock()
+        self._threads: Dict[str, threading.Thread] = {}
+        state_path.mkdir(parents=True, exist_ok=True)
+    
+    def start_job(self, case_id: Optional[int] = None, date_from: Optional[datetime] = None,
+                  date_to: Optional[datetime] = None) -> Dict[str, Any]:
+        """بدء مهمة فحص لجميع الأدلة أو لقضية أو لفترة زمنية"""
+        job = {
+            "job_id": uuid.uuid4().hex[:12],
+            "status": "pending",
+            "scope": {
+                "case_id": case_id,
+                "date_from": date_from.isoformat() if date_from else None,
+                "date_to": date_to.isoformat() if date_to else None
+            },
+            "total": None,
+            "processed": 0,
+            "verified": 0,
+            "failed": 0,
+            "missing": 0,
+            "bytes": 0,
+            "checkpoint_id": 0,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat(),
+            "error": None
+        }
+        self._save(job)
+        self._spawn(job)
+        return job
+    
+    def resume_pending(self) -> List[str]:
+        """استئناف المهام غير المكتملة بعد إعادة التشغيل (ما لم تنفذها عملية أخرى)"""
+        resumed = []
+        for job in self.list_jobs():
+            if job["status"] in ("pending", "running"):
+                self._spawn(job)
+                resumed.append(job["job_id"])
+        return resumed
+    
+    def cancel_job(self, job_id: str) -> bool:
+        job = self.get_job(job_id)
+        if job is None or job["status"] not in ("pending", "running"):
+            return False
+        # علامة في مجلد الحالة تراها العملية المنفذة أيًا كانت
+        self._cancel_marker(job_id).touch()
+        return True
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job_file = self.state_path / f"{job_id}.json"
+        if not job_file.exists():
+            return None
+        with open(job_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        jobs = []
+        for job_file in self.state_path.glob("*.json"):
+            with open(job_file, 'r', encoding='utf-8') as f:
+                jobs.append(json.load(f))
+        jobs.sort(key=lambda j: j["created_at"], reverse=True)
+        return jobs
+    
+    def _save(self, job: Dict[str, Any]):
+        # الكتابة إلى ملف مؤقت ثم إعادة التسمية حتى لا تتلف نقطة الاستئناف
+        job["updated_at"] = datetime.now().isoformat()
+        job_file = self.state_path / f"{job['job_id']}.json"
+        temp_file = job_file.with_suffix('.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, job_file)
+    
+    def _cancel_marker(self, job_id: str) -> Path:
+        return self.state_path / f"{job_id}.cancel"
+    
+    def _spawn(self, job: Dict[str, Any]):
+        with self._lock:
+            thread = self._threads.get(job["job_id"])
+            if thread is not None and thread.is_alive():
+                return
+            thread = threading.Thread(target=self._run, args=(job,), daemon=True)
+            self._threads[job["job_id"]] = thread
+            thread.start()
+    
+    def _query(self, db, job: Dict[str, Any]):
+        scope = job["scope"]
+        query = db.query(models.Evidence)
+        if scope["case_id"] is not None:
+            query = query.filter(models.Evidence.case_id == scope["case_id"])
+        if scope["date_from"]:
+            query = query.filter(models.Evidence.collected_at >= datetime.fromisoformat(scope["date_from"]))
+        if scope["date_to"]:
+            query = query.filter(models.Evidence.collected_at <= datetime.fromisoformat(scope["date_to"]))
+        return query
+    
+    def _check(self, row) -> Dict[str, Any]:
+        path = Path(row.file_path)
+        if not path.exists():
+            return {"id": row.id, "evidence_id": row.evidence_id, "valid": False, "missing": True, "bytes": 0}
+        current_hash = hash_file_throttled(path, self.limiter)
+        return {
+            "id": row.id,
+            "evidence_id": row.evidence_id,
+            "valid": current_hash == row.file_hash,
+            "missing": False,
+            "bytes": path.stat().st_size
+        }
+    
+    def _run(self, job: Dict[str, Any]):
+        lock_file = open(self.state_path / f"{job['job_id']}.lock", 'a')
+        try:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # تنفذها عملية أخرى
+            # الحالة المحفوظة بعد الحجز: قد تكون عملية أخرى أكملتها أو تقدمت فيها
+            current = self.get_job(job["job_id"])
+            if current is not None and current["status"] in ("pending", "running"):
+                self._execute(current)
+        finally:
+            lock_file.close()
+    
+    def _execute(self, job: Dict[str, Any]):
+        cancel_marker = self._cancel_marker(job["job_id"])
+        job["status"] = "running"
+        self._save(job)
+        db = self.session_factory()
+        custody_log = custody.get_custody_log()
+        try:
+            if job["total"] is None:
+                job["total"] = self._query(db, job).count()
+            
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                while not cancel_marker.exists():
+                    # الدفعة التالية بعد نقطة الاستئناف حسب المعرف
+                    batch = (
+                        self._query(db, job)
+                        .filter(models.Evidence.id > job["checkpoint_id"])
+                        .order_by(models.Evidence.id)
+                        .with_entities(
+                            models.Evidence.id, models.Evidence.evidence_id,
+                            models.Evidence.file_path, models.Evidence.file_hash
+                        )
+                        .limit(self.batch_size)
+                        .all()
+                    )
+                    if not batch:
+                        break
+                    
+                    results = list(pool.map(self._check, batch))
+                    
+                    # تسجيل النتائج دفعة واحدة
+                    verified_at = datetime.now(timezone.utc)
+                    db.execute(
+                        update(models.Evidence),
+                        [
+                            {"id": r["id"], "integrity_verified": r["valid"], "last_verified_at": verified_at}
+                            for r in results
+                        ]
+                    )
+                    db.commit()
+                    for r in results:
+                        custody_log.append(custody.VERIFY, evidence_id=r["evidence_id"], details={
+                            "valid": r["valid"], "missing": r["missing"], "audit_job": job["job_id"]
+                        })
+                    
+                    job["processed"] += len(results)
+                    job["verified"] += sum(1 for r in results if r["valid"])
+                    job["failed"] += sum(1 for r in results if not r["valid"] and not r["missing"])
+                    job["missing"] += sum(1 for r in results if r["missing"])
+                    job["bytes"] += sum(r["bytes"] for r in results)
+                    job["checkpoint_id"] = batch[-1].id
+                    self._save(job)
+            
+            job["status"] = "cancelled" if cancel_marker.exists() else "completed"
+        except Exception as e:
+            db.rollback()
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            db.close()
+            self._save(job)
+            cancel_marker.unlink(missing_ok=True)
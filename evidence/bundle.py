@@ -0,0 +1,349 @@
+"""حزمة أدلة القضية: أرشيف ZIP أو tar يُبنى أثناء الإرسال مع بيان موقّع
+
+تُقرأ الملفات جزءًا بجزء وتُرسل فورًا، فالذاكرة ثابتة ولا يُكتب أرشيف مؤقت.
+تُحسب بصمة كل ملف أثناء إرساله، ويأتي في آخر الأرشيف manifest.json ببصمات
+الملفات كما أُرسلت فعلًا، و manifest.sig بتوقيع Ed25519 يمكن للمستلم التحقق
+منه بالمفتاح العام دون أي سر مشترك. المفتاح المرفق بالحزمة لا يُوثق به وحده
+(من يعدل الأرشيف يمكنه توقيعه بمفتاحه)، فيلزم المفتاح العام المستلم مسبقًا أو
+معرفه (X-Bundle-Key-Id عند التنزيل):
+    python -m app.evidence.bundle public-key > bundle.pub
+    python -m app.evidence.bundle verify case.zip --public-key bundle.pub
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import tarfile
+import time
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+from app.evidence import compression
+from app.evidence.download import guess_content_type
+
+READ_SIZE = 1024 * 1024  # 1MB
+
+FORMATS = {
+    "zip": ("application/zip", ".zip"),
+    "tar": ("application/x-tar", ".tar"),
+}
+
+MANIFEST_NAME = "manifest.json"
+SIGNATURE_NAME = "manifest.sig"
+
+class BundleSigner:
+    """مفتاح توقيع البيانات (يُولَّد عند أول استخدام ويُحفظ بصلاحية 600)"""
+    
+    def __init__(self, key_path: Path):
+        self.key_path = key_path
+        self._key: Optional[Ed25519PrivateKey] = None
+    
+    def _private_key(self) -> Ed25519PrivateKey:
+        if self._key is None:
+            try:
+                with open(self.key_path, 'rb') as f:
+                    self._key = serialization.load_pem_private_key(f.read(), password=None)
+            except FileNotFoundError:
+                self._key = self._generate()
+        return self._key
+    
+    def _generate(self) -> Ed25519PrivateKey:
+        key = Ed25519PrivateKey.generate()
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        )
+        self.key_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # O_EXCL: إن سبقتنا عملية أخرى نستخدم مفتاحها
+            fd = os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            with open(self.key_path, 'rb') as f:
+                return serialization.load_pem_private_key(f.read(), password=None)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pem)
+        return key
+    
+    def public_key_pem(self) -> str:
+        return self._private_key().public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode("ascii")
+    
+    def key_id(self) -> str:
+        return key_id(self._private_key().public_key())
+    
+    def sign(self, data: bytes) -> Dict[str, str]:
+        return {
+            "algorithm": "ed25519",
+            "signed_file": MANIFEST_NAME,
+            "key_id": self.key_id(),
+            "public_key": self.public_key_pem(),
+            "signature": base64.b64encode(self._private_key().sign(data)).decode("ascii")
+        }
+
+def key_id(public_key: Ed25519PublicKey) -> str:
+    raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+def trusted_key(signature: Dict[str, str], public_key_pem: Optional[str] = None,
+                trusted_key_id: Optional[str] = None) -> Optional[Ed25519PublicKey]:
+    """المفتاح الموثوق للتحقق: المفتاح العام المعطى، أو المرفق إن طابق معرفُه المحسوب المعرفَ المعطى"""
+    try:
+        if public_key_pem:
+            key = serialization.load_pem_public_key(public_key_pem.encode("ascii"))
+        elif trusted_key_id:
+            key = serialization.load_pem_public_key(signature["public_key"].encode("ascii"))
+        else:
+            return None
+    except (KeyError, ValueError):
+        return None
+    if not isinstance(key, Ed25519PublicKey):
+        return None
+    if not public_key_pem and key_id(key) != trusted_key_id.strip().lower():
+        return None
+    return key
+
+def verify_signature(manifest: bytes, signature: Dict[str, str], key: Ed25519PublicKey) -> bool:
+    """التحقق من توقيع البيان بمفتاح موثوق (trusted_key)"""
+    try:
+        key.verify(base64.b64decode(signature["signature"]), manifest)
+    except InvalidSignature:
+        return False
+    return True
+
+class _Sink(io.RawIOBase):
+    """مخرج غير قابل للتنقل يجمع ما يكتبه zipfile حتى يُرسل"""
+    
+    def __init__(self):
+        self._buffer = bytearray()
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+    
+    def pop(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+class _ZipWriter:
+    def __init__(self, compress: bool):
+        self.sink = _Sink()
+        # مع مخرج غير قابل للتنقل يكتب zipfile الحجم والبصمة بعد البيانات (data descriptor)
+        self.zip = zipfile.ZipFile(
+            self.sink, 'w', compression=zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        )
+    
+    def add(self, name: str, chunks: Iterator[bytes], size: int, mtime: float) -> Iterator[bytes]:
+        # ZIP لا يقبل تواريخ قبل 1980
+        info = zipfile.ZipInfo(name, date_time=time.localtime(max(mtime, 315619200))[:6])
+        info.compress_type = self.zip.compression
+        # الحجم المعروف مسبقًا يحدد الحاجة إلى ZIP64 (ملفات أكبر من 4GB)
+        info.file_size = size
+        with self.zip.open(info, 'w') as dest:
+            for chunk in chunks:
+                dest.write(chunk)
+                data = self.sink.pop()
+                if data:
+                    yield data
+        yield self.sink.pop()
+    
+    def close(self) -> Iterator[bytes]:
+        self.zip.close()
+        yield self.sink.pop()
+
+class _TarWriter:
+    # الترويسة تُبنى يدويًا حتى تُرسل البيانات جزءًا بجزء (tarfile.addfile ينسخ الملف كاملاً دفعة واحدة)
+    def add(self, name: str, chunks: Iterator[bytes], size: int, mtime: float) -> Iterator[bytes]:
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(mtime)
+        info.mode = 0o444
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+        written = 0
+        for chunk in chunks:
+            written += len(chunk)
+            yield chunk
+        if written != size:
+            raise OSError(f"تغير حجم {name} أثناء الإرسال")
+        if size % tarfile.BLOCKSIZE:
+            yield tarfile.NUL * (tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE)
+    
+    def close(self) -> Iterator[bytes]:
+        yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+def _read(path: Path, size: int, hasher) -> Iterator[bytes]:
+    remaining = size
+    with compression.open_blob(path) as f:
+        while remaining > 0:
+            chunk = f.read(min(READ_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            hasher.update(chunk)
+            yield chunk
+
+def _json_bytes(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True, default=str).encode("utf-8")
+
+def stream_bundle(fmt: str, case: Dict[str, Any], items: List[Dict[str, Any]], signer: BundleSigner,
+                  generated_by: str, compress: bool = False) -> Iterator[bytes]:
+    """توليد الأرشيف جزءًا بجزء (مولد متزامن يُستهلك خارج حلقة الأحداث)
+    
+    items: evidence_id و type و hash (المخزنة) و file_path و file_size و
+    meta_path و collected_at و source_url لكل دليل.
+    """
+    writer = _ZipWriter(compress) if fmt == "zip" else _TarWriter()
+    entries = []
+    
+    for item in items:
+        entry = {
+            "evidence_id": item["evidence_id"],
+            "type": item["type"],
+            "collected_at": item.get("collected_at"),
+            "source_url": item.get("source_url"),
+            "stored_sha256": item["hash"]
+        }
+        entries.append(entry)
+        
+        path = Path(item["file_path"]) if item.get("file_path") else None
+        try:
+            stat = path.stat() if path else None
+        except FileNotFoundError:
+            stat = None
+        if stat is None:
+            entry["missing"] = True
+            continue
+        
+        _, extension = guess_content_type(path)
+        name = f"evidence/{item['evidence_id']}{extension}"
+        hasher = hashlib.sha256()
+        size = stat.st_size
+        if compression.codec_for_path(path) is not None:
+            # الملف يُضاف بعد فك ضغطه، وحجمه الأصلي لازم قبل المحتوى (رأس tar)
+            size = item.get("file_size") or compression.decompressed_size(path)
+        yield from writer.add(name, _read(path, size, hasher), size, stat.st_mtime)
+        entry.update({
+            "path": name,
+            "size": size,
+            "sha256": hasher.hexdigest(),
+            "matches_stored": hasher.hexdigest() == item["hash"]
+        })
+        
+        meta_path = item.get("meta_path")
+        if meta_path and Path(meta_path).exists():
+            meta = Path(meta_path).read_bytes()
+            meta_name = f"evidence/{item['evidence_id']}.meta.json"
+            yield from writer.add(meta_name, iter([meta]), len(meta), time.time())
+            entry["metadata_path"] = meta_name
+            entry["metadata_sha256"] = hashlib.sha256(meta).hexdigest()
+    
+    manifest = _json_bytes({
+        "case": case,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "generated_by": generated_by,
+        "hash_algorithm": "sha256",
+        "evidence": entries
+    })
+    signature = _json_bytes(signer.sign(manifest))
+    now = time.time()
+    yield from writer.add(MANIFEST_NAME, iter([manifest]), len(manifest), now)
+    yield from writer.add(SIGNATURE_NAME, iter([signature]), len(signature), now)
+    yield from writer.close()
+
+def verify_bundle(archive_path: Path, public_key_pem: Optional[str] = None,
+                  trusted_key_id: Optional[str] = None) -> Dict[str, Any]:
+    """التحقق من توقيع البيان ومن بصمة كل ملف في الأرشيف (قراءة متدفقة)
+    
+    يلزم المفتاح العام الموثوق أو معرفه، وبدونهما لا تُعد الحزمة سليمة.
+    """
+    if not public_key_pem and not trusted_key_id:
+        return {"valid": False, "problems": ["يلزم المفتاح العام الموثوق أو معرفه للتحقق"]}
+    problems = []
+    if zipfile.is_zipfile(archive_path):
+        archive = zipfile.ZipFile(archive_path)
+        names = set(archive.namelist())
+        open_member = archive.open
+    else:
+        archive = tarfile.open(archive_path)
+        names = set(archive.getnames())
+        open_member = archive.extractfile
+    
+    with archive:
+        if MANIFEST_NAME not in names or SIGNATURE_NAME not in names:
+            return {"valid": False, "problems": ["البيان أو التوقيع غير موجود"]}
+        manifest = open_member(MANIFEST_NAME).read()
+        signature = json.loads(open_member(SIGNATURE_NAME).read())
+        key = trusted_key(signature, public_key_pem, trusted_key_id)
+        if key is None:
+            return {"valid": False, "problems": ["الحزمة غير موقعة بالمفتاح الموثوق"]}
+        if not verify_signature(manifest, signature, key):
+            return {"valid": False, "problems": ["التوقيع غير صالح"]}
+        
+        data = json.loads(manifest)
+        for entry in data["evidence"]:
+            for path_key, hash_key in (("path", "sha256"), ("metadata_path", "metadata_sha256")):
+                if path_key not in entry:
+                    continue
+                if entry[path_key] not in names:
+                    problems.append(f"{entry[path_key]}: غير موجود في الأرشيف")
+                    continue
+                hasher = hashlib.sha256()
+                with open_member(entry[path_key]) as f:
+                    for chunk in iter(lambda: f.read(READ_SIZE), b""):
+                        hasher.update(chunk)
+                if hasher.hexdigest() != entry[hash_key]:
+                    problems.append(f"{entry[path_key]}: البصمة لا تطابق البيان")
+    
+    return {"valid": not problems, "case_id": data["case"].get("case_id"), "key_id": key_id(key),
+            "evidence": len(data["evidence"]), "problems": problems}
+
+_signer: Optional[BundleSigner] = None
+
+def get_signer() -> BundleSigner:
+    global _signer
+    if _signer is None:
+        from app.core.config import settings
+        _signer = BundleSigner(settings.BUNDLE_SIGNING_KEY_PATH)
+    return _signer
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="حزم أدلة القضايا")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("public-key", help="طباعة المفتاح العام لتسليمه للمستلمين")
+    verify = subparsers.add_parser("verify", help="التحقق من حزمة")
+    verify.add_argument("archive", type=Path)
+    trust = verify.add_mutually_exclusive_group(required=True)
+    trust.add_argument("--public-key", type=Path, help="ملف المفتاح العام الموثوق")
+    trust.add_argument("--key-id", help="معرف المفتاح الموثوق (X-Bundle-Key-Id)")
+    args = parser.parse_args()
+    
+    if args.command == "public-key":
+        print(get_signer().public_key_pem(), end="")
+        return
+    
+    public_key = args.public_key.read_text() if args.public_key else None
+    result = verify_bundle(args.archive, public_key, args.key_id)
+    if result["valid"]:
+        print(f"✅ الحزمة سليمة: القضية {result['case_id']}، {result['evidence']} دليل، المفتاح {result['key_id']}")
+    else:
+        for problem in result["problems"]:
+            print(f"❌ {problem}")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""ضغط ملفات الأدلة المخزنة مع قراءة شفافة
+
+الضغط يُعرف من لاحقة الملف المخزن (.zst أو .gz أو .xz)، والبصمة في البيانات
+الوصفية تبقى بصمة المحتوى الأصلي. open_blob يعيد ملفًا للقراءة المتدفقة يفك
+الضغط تلقائيًا، فلا يحتاج القارئ إلى معرفة طريقة التخزين.
+zstd يتطلب الحزمة zstandard، وبدونها يُستخدم gzip و xz من المكتبة القياسية.
+"""
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+try:
+    import zstandard as zstd
+except ImportError:  # zstd اختياري
+    zstd = None
+
+ZSTD = "zstd"
+GZIP = "gzip"
+XZ = "xz"
+
+SUFFIXES = {ZSTD: ".zst", GZIP: ".gz", XZ: ".xz"}
+_CODECS_BY_SUFFIX = {suffix: codec for codec, suffix in SUFFIXES.items()}
+
+# مستويات الضغط: سريعة عند الرفع، وأعلى كثافة عند النقل إلى الأرشيف
+HOT_LEVELS = {ZSTD: 3, GZIP: 6, XZ: 1}
+ARCHIVE_LEVELS = {ZSTD: 19, GZIP: 9, XZ: 6}
+
+# أنواع محتوى مضغوطة أصلًا (لا فائدة من ضغطها مرة أخرى)
+INCOMPRESSIBLE_PREFIXES = ("image/", "video/", "audio/", "application/zip")
+# أنواع أدلة وسائط لا تُضغط وإن لم يُعرف توقيع ملفها (BMP و TIFF و RAW وغيرها)
+MEDIA_EVIDENCE_TYPES = {"screenshot", "image", "photo", "video", "audio"}
+
+# عينة من بداية الملف لتقدير نسبة الضغط قبل ضغطه كاملاً
+SAMPLE_SIZE = 64 * 1024
+MIN_SAVING = 0.1
+
+READ_SIZE = 1024 * 1024  # 1MB
+SPOOL_MAX_MEMORY = 32 * 1024 * 1024
+
+def available(codec: str) -> bool:
+    return codec != ZSTD or zstd is not None
+
+def hot_codec(setting: str) -> Optional[str]:
+    """طريقة الضغط عند الرفع حسب الإعداد (auto: zstd إن توفر وإلا gzip)"""
+    if setting == "off":
+        return None
+    if setting == "auto":
+        return ZSTD if zstd is not None else GZIP
+    if setting not in SUFFIXES or not available(setting):
+        raise ValueError(f"طريقة ضغط غير مدعومة: {setting}")
+    return setting
+
+def archive_codec() -> str:
+    """أعلى كثافة متاحة للأرشيف (xz من المكتبة القياسية عند غياب zstd)"""
+    return ZSTD if zstd is not None else XZ
+
+def codec_for_path(path: Path) -> Optional[str]:
+    return _CODECS_BY_SUFFIX.get(Path(path).suffix)
+
+def worth_compressing(content_type: str, sample: bytes, evidence_type: Optional[str] = None) -> bool:
+    """الضغط حسب نوع الدليل ونوع المحتوى ثم حسب نسبة ضغط عينة (نصوص HTML والسجلات تُضغط جيدًا)"""
+    if (evidence_type or "").lower() in MEDIA_EVIDENCE_TYPES:
+        return False
+    if content_type.startswith(INCOMPRESSIBLE_PREFIXES) or not sample:
+        return False
+    return len(zlib.compress(sample, 1)) <= len(sample) * (1 - MIN_SAVING)
+
+def open_blob(path: Path) -> BinaryIO:
+    """فتح ملف مخزن للقراءة مع فك الضغط تلقائيًا"""
+    codec = codec_for_path(path)
+    if codec == ZSTD:
+        if zstd is None:
+            raise RuntimeError("الملف مضغوط بـ zstd ويتطلب تثبيت zstandard")
+        return zstd.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    if codec == GZIP:
+        return gzip.open(path, 'rb')
+    if codec == XZ:
+        return lzma.open(path, 'rb')
+    return open(path, 'rb')
+
+def open_seekable(path: Path) -> BinaryIO:
+    """مثل open_blob لكن يدعم الرجوع للخلف (Pillow يحتاجه لقراءة الصور)
+    
+    gzip و xz يدعمانه بإعادة فك الضغط، وقارئ zstd المتدفق لا يدعمه فيُفك إلى
+    ملف مؤقت (في الذاكرة للملفات الصغيرة).
+    """
+    if codec_for_path(path) != ZSTD:
+        return open_blob(path)
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    with open_blob(path) as src:
+        shutil.copyfileobj(src, spooled, READ_SIZE)
+    spooled.seek(0)
+    return spooled
+
+def decompressed_size(path: Path) -> int:
+    """حجم المحتوى الأصلي (للملفات القديمة دون file_size في بياناتها الوصفية)"""
+    size = 0
+    with open_blob(path) as f:
+        while True:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                return size
+            size += len(chunk)
+
+def _open_writer(f: BinaryIO, codec: str, level: int) -> BinaryIO:
+    if codec == ZSTD:
+        return zstd.ZstdCompressor(level=level).stream_writer(f, closefd=False)
+    if codec == GZIP:
+        return gzip.GzipFile(fileobj=f, mode='wb', compresslevel=level, mtime=0)
+    return lzma.LZMAFile(f, 'wb', preset=level)
+
+def copy_blob(source: Path, destination: Path, codec: Optional[str], level: Optional[int] = None,
+              hasher=None) -> int:
+    """نسخ ملف مخزن (مضغوط أو لا) إلى ملف جديد بالطريقة المطلوبة وإرجاع حجمه المخزن
+    
+    يُفك ضغط المصدر ويُعاد ضغطه بشكل متدفق، ويُحدَّث hasher بالمحتوى الأصلي.
+    """
+    with open_blob(source) as src, open(destination, 'wb') as raw:
+        out = _open_writer(raw, codec, level or HOT_LEVELS[codec]) if codec else raw
+        try:
+            while True:
+                chunk = src.read(READ_SIZE)
+                if not chunk:
+                    break
+                if hasher is not None:
+                    hasher.update(chunk)
+                out.write(chunk)
+        finally:
+            if out is not raw:
+                out.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+        return raw.tell()
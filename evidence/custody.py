@@ -0,0 +1,255 @@
+"""سجل سلسلة العهدة: سجل إضافة فقط للإجراءات على الأدلة مترابط بالبصمات
+
+كل سطر بالصيغة "<hash> <json>" حيث hash = sha256(بصمة السطر السابق + json)،
+فأي تعديل أو حذف أو إعادة ترتيب يكسر السلسلة من ذلك السطر فصاعدًا.
+الكتابة عبر خيط واحد يجمع الإدخالات ويكتبها دفعة واحدة بعملية fsync واحدة
+(group commit)، والقفل على الملف يسمح لعدة عمليات بالكتابة على نفس السجل.
+
+التحقق من السلسلة (تمريرة متدفقة، لا يُحمَّل السجل في الذاكرة):
+    python -m app.evidence.custody verify
+"""
+import fcntl
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+GENESIS_HASH = "0" * 64
+
+# الإجراءات المسجلة
+UPLOAD = "upload"
+VERIFY = "verify"
+VIEW = "view"
+EXPORT = "export"
+ARCHIVE = "archive"
+DELETE = "delete"
+
+def _chain_hash(previous: str, body: bytes) -> str:
+    return hashlib.sha256(previous.encode("ascii") + body).hexdigest()
+
+class CustodyLogError(Exception):
+    """السجل غير قابل للإضافة (مثل سطر أخير تالف)"""
+
+class CustodyLog:
+    def __init__(self, log_path: Path, max_batch: int = 512, max_delay: float = 0.005):
+        self.log_path = log_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # آخر ما كتبته هذه العملية (لتجنب قراءة الذيل إن لم تكتب عملية أخرى)
+        self._end_offset = -1
+        self._last_hash = GENESIS_HASH
+        self._last_seq = 0
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    def append(self, action: str, evidence_id: Optional[str] = None, case_id: Optional[str] = None,
+               user_id: Optional[int] = None, details: Optional[Dict[str, Any]] = None) -> Future:
+        """إضافة إدخال وإرجاع Future تكتمل برقمه وبصمته بعد حفظه على القرص
+        
+        لا تنتظر الطلبات fsync خاصًا بها: من يحتاج الضمان ينتظر الـ Future
+        فيشارك عملية fsync واحدة مع بقية إدخالات الدفعة.
+        """
+        self._ensure_writer()
+        future: Future = Future()
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "action": action,
+            "evidence_id": evidence_id,
+            "case_id": case_id,
+            "user_id": user_id,
+            "details": details or {}
+        }
+        self._queue.put((entry, future))
+        return future
+    
+    def close(self):
+        """كتابة ما تبقى في الطابور وإيقاف خيط الكتابة"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+    
+    def _ensure_writer(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="custody-log", daemon=True)
+                    self._thread.start()
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # جمع ما يصل خلال max_delay لمشاركة عملية fsync واحدة
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            try:
+                results = self._write_batch([entry for entry, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+    
+    def _write_batch(self, entries: list) -> list:
+        with open(self.log_path, 'ab') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                end = f.seek(0, os.SEEK_END)
+                if end != self._end_offset:
+                    # عملية أخرى كتبت بعدنا (أو أول كتابة): قراءة آخر إدخال
+                    self._last_seq, self._last_hash = self._read_tail(end)
+                
+                lines = []
+                results = []
+                seq, previous = self._last_seq, self._last_hash
+                for entry in entries:
+                    seq += 1
+                    body = json.dumps(
+                        {"seq": seq, **entry}, ensure_ascii=False, separators=(",", ":")
+                    ).encode("utf-8")
+                    previous = _chain_hash(previous, body)
+                    lines.append(previous.encode("ascii") + b" " + body + b"\n")
+                    results.append({"seq": seq, "hash": previous})
+                
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+                self._end_offset = f.tell()
+                self._last_seq, self._last_hash = seq, previous
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return results
+    
+    def _read_tail(self, end: int) -> tuple:
+        if end == 0:
+            return 0, GENESIS_HASH
+        with open(self.log_path, 'rb') as f:
+            # قراءة كتل من النهاية حتى الوصول إلى بداية السطر الأخير
+            position = end
+            tail = b""
+            while position > 0 and tail.count(b"\n") < 2:
+                step = min(64 * 1024, position)
+                position -= step
+                f.seek(position)
+                tail = f.read(step) + tail
+        if not tail.endswith(b"\n"):
+            raise CustodyLogError("السطر الأخير في سجل العهدة غير مكتمل، يلزم فحصه قبل الإضافة")
+        line = tail[:-1].rsplit(b"\n", 1)[-1]
+        entry_hash, _, body = line.partition(b" ")
+        return json.loads(body)["seq"], entry_hash.decode("ascii")
+    
+    def head(self) -> Dict[str, Any]:
+        """آخر رقم وبصمة في السجل (لحفظها خارج النظام كمرساة ضد حذف الذيل)"""
+        try:
+            end = self.log_path.stat().st_size
+        except FileNotFoundError:
+            end = 0
+        seq, entry_hash = self._read_tail(end)
+        return {"seq": seq, "hash": entry_hash}
+    
+    def verify(self, expected_head: Optional[str] = None) -> Dict[str, Any]:
+        """التحقق من السلسلة كاملة بتمريرة واحدة متدفقة
+        
+        يكفي إعادة حساب البصمات على البايتات كما هي دون تحليل JSON،
+        وexpected_head (بصمة محفوظة سابقًا) يكشف حذف إدخالات من النهاية.
+        """
+        previous = GENESIS_HASH
+        count = 0
+        error = None
+        head_found = not expected_head or expected_head == GENESIS_HASH
+        try:
+            f = open(self.log_path, 'rb', buffering=1024 * 1024)
+        except FileNotFoundError:
+            f = None
+        if f is not None:
+            with f:
+                for line in f:
+                    count += 1
+                    entry_hash, separator, body = line.rstrip(b"\n").partition(b" ")
+                    if not line.endswith(b"\n") or not separator:
+                        error = {"seq": count, "reason": "سطر غير مكتمل أو تالف"}
+                        break
+                    if _chain_hash(previous, body) != entry_hash.decode("ascii", "replace"):
+                        error = {"seq": count, "reason": "البصمة لا تطابق المحتوى أو الإدخال السابق"}
+                        break
+                    previous = entry_hash.decode("ascii")
+                    if not head_found and previous == expected_head:
+                        head_found = True
+        
+        if error is None and not head_found:
+            error = {"seq": count + 1, "reason": "البصمة المرجعية غير موجودة في السجل (حُذفت إدخالات)"}
+        
+        return {
+            "valid": error is None,
+            "entries": count if error is None else error["seq"] - 1,
+            "head": previous if error is None else None,
+            "error": error
+        }
+
+_log: Optional[CustodyLog] = None
+_log_lock = threading.Lock()
+
+def get_custody_log() -> CustodyLog:
+    """سجل العهدة المشترك داخل العملية"""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                from app.core.config import settings
+                _log = CustodyLog(
+                    settings.CUSTODY_LOG_PATH,
+                    max_batch=settings.CUSTODY_LOG_MAX_BATCH,
+                    max_delay=settings.CUSTODY_LOG_MAX_DELAY_MS / 1000
+                )
+    return _log
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="سجل سلسلة العهدة")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    verify = subparsers.add_parser("verify", help="التحقق من السلسلة")
+    verify.add_argument("--head", help="بصمة محفوظة سابقًا يجب أن تكون في السجل")
+    subparsers.add_parser("head", help="عرض آخر إدخال")
+    args = parser.parse_args()
+    
+    log = get_custody_log()
+    if args.command == "head":
+        head = log.head()
+        print(f"{head['seq']} {head['hash']}")
+        return
+    
+    started = time.perf_counter()
+    result = log.verify(expected_head=args.head)
+    elapsed = time.perf_counter() - started
+    if result["valid"]:
+        print(f"✅ السلسلة سليمة: {result['entries']} إدخال في {elapsed:.1f} ث، الرأس {result['head']}")
+    else:
+        print(f"❌ السلسلة مكسورة عند الإدخال {result['error']['seq']}: {result['error']['reason']}")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
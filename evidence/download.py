@@ -0,0 +1,210 @@
+"""تنزيل ملفات الأدلة مع دعم نطاقات البايت (Range) والإرسال دون نسخ
+
+يُرسل الملف من القرص جزءًا بجزء فلا يُحمَّل في ذاكرة العامل، ويُستخدم امتداد
+ASGI "http.response.zerocopysend" (sendfile) إن كان الخادم يدعمه. خلف nginx
+يمكن تفويض الإرسال كاملاً عبر X-Accel-Redirect (EVIDENCE_ACCEL_REDIRECT_PREFIX).
+الملفات المخزنة مضغوطة يُفك ضغطها أثناء الإرسال، فلا يُستخدم معها sendfile ولا nginx.
+"""
+import os
+from pathlib import Path
+from typing import Mapping, Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.evidence import compression
+
+CHUNK_SIZE = 256 * 1024
+
+# نوع المحتوى من أول بايتات الملف (الأدلة تُخزن بامتداد .dat)
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"GIF8", "image/gif", ".gif"),
+    (b"II*\x00", "image/tiff", ".tif"),
+    (b"MM\x00*", "image/tiff", ".tif"),
+    (b"%PDF-", "application/pdf", ".pdf"),
+    (b"\x1a\x45\xdf\xa3", "video/webm", ".webm"),
+    (b"ID3", "audio/mpeg", ".mp3"),
+    (b"OggS", "audio/ogg", ".ogg"),
+    (b"PK\x03\x04", "application/zip", ".zip"),
+]
+DEFAULT_CONTENT_TYPE = ("application/octet-stream", ".bin")
+
+class RangeNotSatisfiable(Exception):
+    """النطاق المطلوب خارج حجم الملف"""
+
+def guess_content_type(path: Path) -> Tuple[str, str]:
+    """نوع المحتوى والامتداد المناسب حسب توقيع الملف (بعد فك الضغط)"""
+    with compression.open_blob(path) as f:
+        head = f.read(16)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", ".webp"
+    if head[:2] == b"BM" and head[6:10] == b"\x00\x00\x00\x00":
+        return "image/bmp", ".bmp"
+    if head[4:8] == b"ftyp":
+        return ("video/quicktime", ".mov") if head[8:10] == b"qt" else ("video/mp4", ".mp4")
+    for signature, content_type, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type, extension
+    return DEFAULT_CONTENT_TYPE
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """تحويل ترويسة Range إلى (البداية، النهاية شاملة)
+    
+    None يعني إرسال الملف كاملاً: لا ترويسة، أو صيغة غير مفهومة، أو عدة نطاقات
+    (يسمح المعيار بتجاهلها). النطاق خارج الملف يرفع RangeNotSatisfiable.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, separator, last = spec.strip().partition("-")
+    if not separator or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+    
+    if not first:
+        # bytes=-500: آخر 500 بايت
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - suffix, 0), size - 1
+    
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # المقارنة الضعيفة: W/"..." يطابق "..."
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+class FileRangeResponse(Response):
+    """إرسال جزء من ملف دون قراءته كاملاً في الذاكرة"""
+    
+    def __init__(self, path: Path, start: int, end: int, status_code: int,
+                 headers: Mapping[str, str], media_type: str):
+        self.path = path
+        self.compressed = compression.codec_for_path(path) is not None
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        count = self.end - self.start + 1
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        
+        if self.compressed:
+            await self._send_decompressed(send, count)
+            return
+        
+        f = await anyio.to_thread.run_sync(open, self.path, 'rb')
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                # الخادم يرسل من واصف الملف مباشرة (sendfile) دون المرور بذاكرة التطبيق
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False
+                })
+                return
+            
+            offset, remaining = self.start, count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, f.fileno(), min(CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # الملف أقصر من المتوقع (تغير أثناء الإرسال)
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            f.close()
+    
+    async def _send_decompressed(self, send: Send, count: int):
+        # لا يمكن القفز داخل الملف المضغوط: يُقرأ ما قبل بداية النطاق ويُهمل
+        f = await anyio.to_thread.run_sync(compression.open_blob, self.path)
+        try:
+            skip = self.start
+            while skip > 0:
+                chunk = await anyio.to_thread.run_sync(f.read, min(CHUNK_SIZE, skip))
+                if not chunk:
+                    break
+                skip -= len(chunk)
+            
+            remaining = count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            f.close()
+
+def build_file_response(path: Path, file_hash: str, request_headers: Mapping[str, str],
+                        filename_stem: str, accel_prefix: str = "",
+                        storage_root: Optional[Path] = None, size: Optional[int] = None) -> Response:
+    """بناء استجابة التنزيل (200 أو 206 أو 304 أو 416) حسب ترويسات الطلب
+    
+    دالة متزامنة (stat وقراءة التوقيع)، تُستدعى خارج حلقة الأحداث.
+    size هو حجم المحتوى الأصلي (من البيانات الوصفية) ويلزم للملفات المضغوطة.
+    """
+    compressed = compression.codec_for_path(path) is not None
+    if size is None:
+        size = path.stat().st_size if not compressed else compression.decompressed_size(path)
+    content_type, extension = guess_content_type(path)
+    etag = f'"{file_hash}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'inline; filename="{filename_stem}{extension}"'
+    }
+    
+    if _etag_matches(request_headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    if accel_prefix and storage_root is not None and not compressed and path.is_relative_to(storage_root):
+        # nginx يتولى النطاقات والإرسال بـ sendfile بعد تحقق التطبيق من الصلاحيات
+        headers["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + path.relative_to(storage_root).as_posix()
+        return Response(headers=headers, media_type=content_type)
+    
+    # If-Range: النطاق صالح فقط إن لم يتغير الملف منذ الجزء السابق
+    if_range = request_headers.get("if-range")
+    range_header = request_headers.get("range") if if_range is None or if_range.strip() == etag else None
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+    
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return FileRangeResponse(path, start, end, status_code, headers, content_type)
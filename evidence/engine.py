@@ -1,32 +1,173 @@
+import asyncio
+import fcntl
 import hashlib
 import json
+import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, Optional, Tuple
 import uuid
 
+import aiofiles
+
+from app.core import metrics
+from app.evidence import compression
+from app.evidence.download import guess_content_type
+from app.evidence.index import EvidenceIndex
+from app.evidence.similarity import DEFAULT_MAX_DISTANCE, SimilarityIndex, compute_similarity_hash
+
+# حجم الجزء المقروء في كل مرة عند الرفع المتدفق
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# طبقة الأدلة المنقولة إلى مجلد الأرشيف (البيانات الوصفية لغيرها بلا tier)
+ARCHIVE_TIER = "archive"
+
+class EvidenceTooLargeError(Exception):
+    """حجم الدليل يتجاوز الحد المسموح"""
+
+class EvidenceIntegrityError(Exception):
+    """محتوى الدليل لا يطابق بصمته المسجلة"""
+
+async def stream_to_temp(file, temp_path: Path, max_size: Optional[int] = None) -> Tuple[str, int]:
+    """نسخ مصدر متدفق إلى ملف مؤقت مع حساب البصمة تدريجيًا
+    
+    يُرفض المصدر فور تجاوز الحد ويُحذف الملف المؤقت. تُعاد البصمة والحجم.
+    """
+    hasher = hashlib.sha256()
+    file_size = 0
+    try:
+        async with aiofiles.open(temp_path, 'wb') as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if max_size is not None and file_size > max_size:
+                    raise EvidenceTooLargeError(str(temp_path))
+                hasher.update(chunk)
+                await out.write(chunk)
+            await out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    
+    return hasher.hexdigest(), file_size
+
+async def stream_to_file(file, destination: Path, max_size: Optional[int] = None) -> Tuple[str, int]:
+    """نسخ مصدر متدفق إلى ملف ثم نقله إلى الوجهة بإعادة تسمية ذرية"""
+    temp_path = destination.with_suffix('.part')
+    file_hash, file_size = await stream_to_temp(file, temp_path, max_size)
+    os.replace(temp_path, destination)
+    return file_hash, file_size
+
+def hash_file(path: Path) -> str:
+    """حساب بصمة المحتوى الأصلي لملف مخزن (مع فك الضغط) دون تحميله في الذاكرة"""
+    hasher = hashlib.sha256()
+    with compression.open_blob(path) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
 class EvidenceEngine:
-    def __init__(self, storage_path: Path):
+    def __init__(self, storage_path: Path, content_addressed: bool = False, compression_setting: str = "off"):
         self.storage_path = storage_path
+        # في وضع التخزين حسب المحتوى يُخزن كل محتوى مرة واحدة باسم بصمته
+        self.content_addressed = content_addressed
+        # طريقة ضغط الملفات القابلة للضغط عند الرفع (None = دون ضغط)
+        self.compression = compression.hot_codec(compression_setting)
+        self.blobs_path = storage_path / "blobs"
+        self.temp_path = storage_path / "tmp"
         storage_path.mkdir(parents=True, exist_ok=True)
+        self.temp_path.mkdir(exist_ok=True)
+        if content_addressed:
+            self.blobs_path.mkdir(exist_ok=True)
+        # فهرس المعرفات لتحديد موقع الدليل دون مسح المجلد
+        self.index = EvidenceIndex(storage_path / "index.sqlite3")
+        # بصمات التشابه لكشف النسخ شبه المتطابقة (في نفس ملف الفهرس)
+        self.similarity = SimilarityIndex(storage_path / "index.sqlite3")
     
-    def store_evidence(self, file_content: bytes, case_id: str, evidence_type: str, 
+    def store_evidence(self, file_content: bytes, case_id: str, evidence_type: str,
                        source_url: Optional[str] = None) -> Dict[str, Any]:
         """تخزين الأدلة مع توليد البصمة والطابع الزمني"""
-        
-        # توليد معرف فريد للأدلة
-        evidence_id = f"EVID-{uuid.uuid4().hex[:8].upper()}"
+        started = time.perf_counter()
         
         # حساب البصمة
         file_hash = hashlib.sha256(file_content).hexdigest()
         
-        # إنشاء اسم ملف فريد
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{evidence_id}_{timestamp}.dat"
-        file_path = self.storage_path / filename
-        
         # حفظ الملف
-        file_path.write_bytes(file_content)
+        temp_path = self._new_temp_path()
+        temp_path.write_bytes(file_content)
+        
+        metadata = self.store_evidence_file(
+            temp_path, file_hash, len(file_content), case_id, evidence_type, source_url
+        )
+        metrics.observe_evidence("store", len(file_content), time.perf_counter() - started)
+        return metadata
+    
+    async def store_evidence_stream(self, file, case_id: str, evidence_type: str,
+                                    source_url: Optional[str] = None,
+                                    max_size: Optional[int] = None,
+                                    index_similarity: bool = True) -> Dict[str, Any]:
+        """تخزين دليل متدفق جزءًا بجزء بذاكرة ثابتة
+        
+        تُحسب البصمة تدريجيًا ويُكتب الملف إلى ملف مؤقت ثم يُنقل إلى مكانه
+        النهائي بعملية إعادة تسمية ذرية. يُرفض الملف فور تجاوز الحد.
+        """
+        started = time.perf_counter()
+        received = await self.receive_stream(file, max_size)
+        return await self.store_received(received, case_id, evidence_type, source_url, index_similarity, started)
+    
+    async def receive_stream(self, file, max_size: Optional[int] = None) -> Tuple[Path, str, int]:
+        """استلام مصدر متدفق إلى ملف مؤقت في المخزن وإرجاع (المسار، البصمة، الحجم)"""
+        temp_path = self._new_temp_path()
+        file_hash, file_size = await stream_to_temp(file, temp_path, max_size)
+        return temp_path, file_hash, file_size
+    
+    async def store_received(self, received: Tuple[Path, str, int], case_id: str, evidence_type: str,
+                             source_url: Optional[str] = None, index_similarity: bool = True,
+                             started: Optional[float] = None) -> Dict[str, Any]:
+        """نقل ملف استلمه receive_stream إلى المخزن (يُحذف الملف المؤقت عند الفشل)"""
+        started = started if started is not None else time.perf_counter()
+        temp_path, file_hash, file_size = received
+        
+        # النقل وحساب بصمة التشابه خارج حلقة الأحداث
+        try:
+            metadata = await asyncio.to_thread(
+                self.store_evidence_file,
+                temp_path, file_hash, file_size, case_id, evidence_type, source_url, index_similarity
+            )
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        metrics.observe_evidence("store", file_size, time.perf_counter() - started)
+        return metadata
+    
+    def store_evidence_file(self, source_path: Path, file_hash: str, file_size: int, case_id: str,
+                            evidence_type: str, source_url: Optional[str] = None,
+                            index_similarity: bool = True) -> Dict[str, Any]:
+        """نقل ملف مكتمل وموثق البصمة إلى مخزن الأدلة
+        
+        index_similarity=False يؤجل حساب بصمة التشابه (لطابور المعالجة).
+        """
+        
+        # توليد معرف فريد للأدلة
+        evidence_id = f"EVID-{uuid.uuid4().hex[:8].upper()}"
+        stem = f"{evidence_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        
+        # الضغط قبل النقل (البصمة محسوبة مسبقًا على المحتوى الأصلي)
+        staged_path, suffix = self._stage(source_path, evidence_type)
+        if self.content_addressed:
+            file_path = self._store_blob(staged_path, suffix, file_hash, evidence_id)
+        else:
+            file_path = self.storage_path / f"{stem}.dat{suffix}"
+            os.replace(staged_path, file_path)
         
         # إنشاء البيانات الوصفية
         metadata = {
@@ -36,38 +177,324 @@ class EvidenceEngine:
             "hash": file_hash,
             "hash_algorithm": "sha256",
             "timestamp": datetime.now().isoformat(),
-            "file_size": len(file_content),
+            "file_size": file_size,
             "file_path": str(file_path),
+            "compression": compression.codec_for_path(file_path),
+            "stored_size": file_path.stat().st_size,
             "source_url": source_url,
             "integrity_verified": False
         }
+        if self.content_addressed:
+            metadata["blob"] = file_hash
+        similarity = compute_similarity_hash(file_path) if index_similarity else None
+        if similarity is not None:
+            metadata["similarity"] = {"kind": similarity[0], "hash": f"{similarity[1]:016x}"}
         
         # حفظ البيانات الوصفية
-        meta_path = file_path.with_suffix('.meta.json')
+        meta_path = self.storage_path / f"{stem}.meta.json"
         with open(meta_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, ensure_ascii=False, indent=2)
+        self.index.add(evidence_id, meta_path, metadata["file_path"], file_hash)
+        if similarity is not None:
+            self.similarity.add(evidence_id, case_id, *similarity)
+        
+        return metadata
+    
+    def find_blob(self, file_hash: str) -> Optional[Path]:
+        """البحث عن محتوى مخزن حسب بصمته مباشرة (مضغوطًا أو لا)"""
+        blob = self.blob_path(file_hash)
+        for suffix in ("",) + tuple(compression.SUFFIXES.values()):
+            candidate = blob.with_name(blob.name + suffix)
+            if candidate.exists():
+                return candidate
+        return None
+    
+    def open_evidence(self, evidence_id: str) -> Optional[BinaryIO]:
+        """فتح محتوى الدليل الأصلي للقراءة المتدفقة أينما خُزن (مضغوطًا أو في الأرشيف)"""
+        entry = self.index.get(evidence_id)
+        if entry is None or not Path(entry["file_path"]).exists():
+            return None
+        return compression.open_blob(Path(entry["file_path"]))
+    
+    def archive_evidence(self, evidence_id: str, archive_path: Path) -> Optional[Dict[str, Any]]:
+        """نسخ ملف دليل إلى مجلد الأرشيف بأعلى ضغط متاح وإرجاع بياناته الوصفية الجديدة
         
+        البيانات الوصفية والفهرس يبقيان في المخزن ويشيران إلى الموقع الجديد، فيبقى
+        البحث بالمعرف والقراءة عبر open_evidence كما هما. البصمة تُحسب أثناء النسخ.
+        الأصل لا يُحذف هنا: يحذفه المستدعي بـ remove_archived_source بعد تحديث مساره
+        في قاعدة البيانات، وإن توقف قبل ذلك تُعاد البيانات نفسها في الاستدعاء التالي
+        ليكمل. المحتوى المشترك (التخزين حسب المحتوى) لا يُنقل لأنه قد يخص أدلة
+        أخرى، فتُرجع None كما للدليل المؤرشف الذي حُذف أصله.
+        """
+        meta_file = self._find_meta(evidence_id)
+        if meta_file is None:
+            return None
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        
+        if metadata.get("tier") == ARCHIVE_TIER:
+            pending = metadata.get("archived_from")
+            return metadata if pending and Path(pending).exists() else None
+        source = Path(metadata["file_path"])
+        if metadata.get("blob") or not source.exists():
+            return None
+        
+        codec = compression.archive_codec()
+        destination = archive_path / metadata["case_id"] / (
+            meta_file.name.removesuffix(".meta.json") + ".dat" + compression.SUFFIXES[codec]
+        )
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = destination.with_name(destination.name + ".part")
+        hasher = hashlib.sha256()
+        try:
+            stored_size = compression.copy_blob(source, temp_path, codec, compression.ARCHIVE_LEVELS[codec], hasher)
+            if hasher.hexdigest() != metadata["hash"]:
+                raise EvidenceIntegrityError(f"بصمة الدليل {evidence_id} لا تطابق المسجلة")
+            os.replace(temp_path, destination)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        
+        metadata.update({
+            "file_path": str(destination),
+            "compression": codec,
+            "stored_size": stored_size,
+            "tier": ARCHIVE_TIER,
+            "archived_at": datetime.now().isoformat(),
+            "archived_from": str(source)
+        })
+        with open(meta_file, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        self.index.add(evidence_id, meta_file, metadata["file_path"], metadata["hash"])
         return metadata
     
+    def remove_archived_source(self, metadata: Dict[str, Any]):
+        """حذف الأصل في المخزن بعد نقل الدليل إلى الأرشيف وتحديث مساره في قاعدة البيانات"""
+        source = metadata.get("archived_from")
+        if metadata.get("tier") == ARCHIVE_TIER and source and source != metadata["file_path"]:
+            Path(source).unlink(missing_ok=True)
+    
+    def blob_path(self, file_hash: str) -> Path:
+        # تقسيم المجلدات بأول أربعة أحرف من البصمة لتجنب المجلدات الضخمة
+        return self.blobs_path / file_hash[:2] / file_hash[2:4] / file_hash
+    
+    def delete_evidence(self, evidence_id: str) -> bool:
+        """حذف سجل الدليل وتحرير المحتوى المرتبط به"""
+        meta_file = self._find_meta(evidence_id)
+        if meta_file is None:
+            return False
+        
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        
+        if metadata.get("blob"):
+            with self._blob_lock():
+                self._update_references(metadata["blob"], remove=evidence_id)
+        else:
+            Path(metadata["file_path"]).unlink(missing_ok=True)
+        meta_file.unlink()
+        self.index.remove(evidence_id)
+        self.similarity.remove(evidence_id)
+        return True
+    
+    def collect_garbage(self, rebuild_references: bool = False) -> int:
+        """حذف المحتويات غير المرتبطة بأي دليل وإرجاع عددها
+        
+        عند rebuild_references تُعاد كتابة ملفات المراجع من ملفات .meta.json.
+        """
+        removed = 0
+        with self._blob_lock():
+            if rebuild_references:
+                references: Dict[str, set] = {}
+                for meta_file in self.storage_path.glob("*.meta.json"):
+                    with open(meta_file, 'r', encoding='utf-8') as f:
+                        metadata = json.load(f)
+                    if metadata.get("blob"):
+                        references.setdefault(metadata["blob"], set()).add(metadata["evidence_id"])
+                for refs_file in self.blobs_path.glob("*/*/*.refs"):
+                    refs_file.unlink()
+                for file_hash, evidence_ids in references.items():
+                    self._write_references(file_hash, evidence_ids)
+            
+            for blob in self.blobs_path.glob("*/*/*"):
+                if blob.suffix and blob.suffix not in compression.SUFFIXES.values():
+                    continue
+                if not self._read_references(blob.name.split(".", 1)[0]):
+                    blob.unlink()
+                    blob.with_suffix('.refs').unlink(missing_ok=True)
+                    removed += 1
+        
+        return removed
+    
+    def _stage(self, source_path: Path, evidence_type: str) -> Tuple[Path, str]:
+        """ضغط الملف المؤقت إن كان نوعه قابلًا للضغط، وإرجاع الملف الجاهز ولاحقته"""
+        if self.compression is None:
+            return source_path, ""
+        with open(source_path, 'rb') as f:
+            sample = f.read(compression.SAMPLE_SIZE)
+        content_type, _ = guess_content_type(source_path)
+        if not compression.worth_compressing(content_type, sample, evidence_type):
+            return source_path, ""
+        
+        staged_path = self._new_temp_path()
+        try:
+            compression.copy_blob(source_path, staged_path, self.compression)
+        except BaseException:
+            staged_path.unlink(missing_ok=True)
+            raise
+        source_path.unlink()
+        return staged_path, compression.SUFFIXES[self.compression]
+    
+    def _store_blob(self, source_path: Path, suffix: str, file_hash: str, evidence_id: str) -> Path:
+        with self._blob_lock():
+            self._update_references(file_hash, add=evidence_id)
+            existing = self.find_blob(file_hash)
+            if existing is not None:
+                # المحتوى مخزن مسبقًا: لا حاجة لكتابة نسخة جديدة
+                source_path.unlink()
+                return existing
+            blob = self.blob_path(file_hash)
+            blob = blob.with_name(blob.name + suffix)
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source_path, blob)
+        return blob
+    
+    @contextmanager
+    def _blob_lock(self):
+        # قفل على مستوى الملفات ليشمل جميع العمليات العاملة على نفس المخزن
+        self.blobs_path.mkdir(exist_ok=True)
+        with open(self.blobs_path / ".lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _read_references(self, file_hash: str) -> set:
+        refs_file = self.blob_path(file_hash).with_suffix('.refs')
+        if not refs_file.exists():
+            return set()
+        with open(refs_file, 'r', encoding='utf-8') as f:
+            return set(json.load(f))
+    
+    def _write_references(self, file_hash: str, evidence_ids: set):
+        refs_file = self.blob_path(file_hash).with_suffix('.refs')
+        refs_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = refs_file.with_suffix('.refs.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(sorted(evidence_ids), f)
+        os.replace(temp_file, refs_file)
+    
+    def _update_references(self, file_hash: str, add: Optional[str] = None,
+                           remove: Optional[str] = None) -> int:
+        references = self._read_references(file_hash)
+        if add:
+            references.add(add)
+        if remove:
+            references.discard(remove)
+        self._write_references(file_hash, references)
+        return len(references)
+    
+    def _new_temp_path(self) -> Path:
+        return self.temp_path / f"{uuid.uuid4().hex}.part"
+    
+    def _find_meta(self, evidence_id: str) -> Optional[Path]:
+        entry = self.index.get(evidence_id)
+        if entry is not None and entry["meta_path"].exists():
+            return entry["meta_path"]
+        
+        # أدلة سابقة للفهرس: البحث في المجلد ثم إضافتها للفهرس
+        for meta_file in self.storage_path.glob(f"{evidence_id}_*.meta.json"):
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            self.index.add(evidence_id, meta_file, metadata["file_path"], metadata["hash"])
+            return meta_file
+        return None
+    
+    def index_similarity(self, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """حساب بصمة التشابه لدليل مخزن وتسجيلها"""
+        file = Path(metadata["file_path"])
+        if not file.exists():
+            return None
+        similarity = compute_similarity_hash(file)
+        if similarity is None:
+            return None
+        self.similarity.add(metadata["evidence_id"], metadata["case_id"], *similarity)
+        return self.similarity.get(metadata["evidence_id"])
+    
+    def find_similar(self, evidence_id: str, max_distance: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """الأدلة شبه المتطابقة مع دليل والقضايا المرتبطة بها
+        
+        الأدلة السابقة لهذه الميزة تُحسب بصمتها عند أول طلب.
+        """
+        record = self.similarity.get(evidence_id)
+        if record is None:
+            meta_file = self._find_meta(evidence_id)
+            if meta_file is None:
+                return None
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                record = self.index_similarity(json.load(f))
+            if record is None:
+                return {"evidence_id": evidence_id, "kind": None, "matches": [], "linked_cases": []}
+        
+        if max_distance is None:
+            max_distance = DEFAULT_MAX_DISTANCE[record["kind"]]
+        matches = [
+            match for match in self.similarity.find_similar(record["kind"], record["hash"], max_distance)
+            if match["evidence_id"] != evidence_id
+        ]
+        linked_cases = sorted({m["case_id"] for m in matches} - {record["case_id"]})
+        return {
+            "evidence_id": evidence_id,
+            "kind": record["kind"],
+            "matches": matches,
+            "linked_cases": linked_cases
+        }
+    
+    def rebuild_index(self) -> int:
+        """إعادة بناء فهرس المعرفات من ملفات .meta.json"""
+        return self.index.rebuild(self.storage_path)
+    
     def verify_integrity(self, evidence_id: str) -> bool:
         """التحقق من سلامة الدليل"""
-        # البحث عن ملف الأدلة
-        for file in self.storage_path.glob(f"*{evidence_id}*.dat"):
-            meta_file = file.with_suffix('.meta.json')
-            if meta_file.exists():
-                with open(meta_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                # حساب البصمة الحالية
-                current_content = file.read_bytes()
-                current_hash = hashlib.sha256(current_content).hexdigest()
-                
-                # المقارنة
-                if current_hash == metadata['hash']:
-                    metadata['integrity_verified'] = True
-                    with open(meta_file, 'w', encoding='utf-8') as f:
-                        json.dump(metadata, f, ensure_ascii=False, indent=2)
-                    return True
-                else:
-                    return False
-        return False
+        # البحث عن ملف البيانات الوصفية للأدلة
+        meta_file = self._find_meta(evidence_id)
+        if meta_file is None:
+            return False
+        
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        
+        # حساب البصمة الحالية
+        file = Path(metadata['file_path'])
+        if not file.exists():
+            return False
+        started = time.perf_counter()
+        current_hash = hash_file(file)
+        # البصمة تُحسب على المحتوى الأصلي بعد فك الضغط، فيُسجل حجمه لا حجم الملف المضغوط
+        metrics.observe_evidence("verify", metadata["file_size"], time.perf_counter() - started)
+        
+        # المقارنة
+        if current_hash == metadata['hash']:
+            metadata['integrity_verified'] = True
+            with open(meta_file, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            return True
+        else:
+            return False
+
+_engine: Optional[EvidenceEngine] = None
+_engine_lock = threading.Lock()
+
+def get_evidence_engine() -> EvidenceEngine:
+    """محرك الأدلة المشترك داخل العملية (يُنشأ عند أول استخدام لا عند الاستيراد)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from app.core.config import settings
+                _engine = EvidenceEngine(
+                    settings.EVIDENCE_STORAGE_PATH,
+                    content_addressed=settings.EVIDENCE_CONTENT_ADDRESSED,
+                    compression_setting=settings.EVIDENCE_COMPRESSION
+                )
+    return _engine
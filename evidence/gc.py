@@ -0,0 +1,25 @@
+"""حذف المحتويات غير المرتبطة بأي دليل من المخزن حسب المحتوى
+
+التشغيل من المجلد الأب للمشروع:
+    python -m app.evidence.gc [--rebuild-references]
+"""
+import argparse
+
+from app.core.config import settings
+from app.evidence.engine import EvidenceEngine
+
+def main():
+    parser = argparse.ArgumentParser(description="تنظيف مخزن الأدلة")
+    parser.add_argument(
+        "--rebuild-references",
+        action="store_true",
+        help="إعادة بناء عدادات المراجع من ملفات .meta.json قبل التنظيف"
+    )
+    args = parser.parse_args()
+    
+    engine = EvidenceEngine(settings.EVIDENCE_STORAGE_PATH, content_addressed=True)
+    removed = engine.collect_garbage(rebuild_references=args.rebuild_references)
+    print(f"✅ تم حذف {removed} من المحتويات غير المرتبطة")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""فهرس مضمّن (SQLite) لتحديد موقع الأدلة حسب المعرف دون مسح المجلد
+
+يمكن إعادة بنائه في أي وقت من ملفات .meta.json:
+    python -m app.evidence.index
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+class EvidenceIndex:
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS evidence_index (
+                    evidence_id TEXT PRIMARY KEY,
+                    meta_path TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    file_hash TEXT NOT NULL
+                )
+            """)
+    
+    def _connect(self) -> sqlite3.Connection:
+        # اتصال لكل خيط لأن اتصالات sqlite3 لا تُشارك بين الخيوط
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def add(self, evidence_id: str, meta_path: Path, file_path: str, file_hash: str):
+        """إضافة دليل إلى الفهرس أو تحديثه"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO evidence_index VALUES (?, ?, ?, ?)",
+                (evidence_id, str(meta_path), file_path, file_hash)
+            )
+    
+    def get(self, evidence_id: str) -> Optional[Dict[str, Any]]:
+        """البحث عن دليل بالمعرف"""
+        row = self._connect().execute(
+            "SELECT meta_path, file_path, file_hash FROM evidence_index WHERE evidence_id = ?",
+            (evidence_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"meta_path": Path(row[0]), "file_path": row[1], "hash": row[2]}
+    
+    def remove(self, evidence_id: str):
+        """حذف دليل من الفهرس"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM evidence_index WHERE evidence_id = ?", (evidence_id,))
+    
+    def rebuild(self, storage_path: Path) -> int:
+        """إعادة بناء الفهرس بالكامل من ملفات .meta.json وإرجاع عدد الأدلة"""
+        rows = []
+        for meta_file in storage_path.glob("*.meta.json"):
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            rows.append((metadata["evidence_id"], str(meta_file), metadata["file_path"], metadata["hash"]))
+        
+        with self._connect() as conn:
+            conn.execute("DELETE FROM evidence_index")
+            conn.executemany("INSERT OR REPLACE INTO evidence_index VALUES (?, ?, ?, ?)", rows)
+        
+        return len(rows)
+
+def main():
+    from app.core.config import settings
+    
+    storage_path = settings.EVIDENCE_STORAGE_PATH
+    storage_path.mkdir(parents=True, exist_ok=True)
+    count = EvidenceIndex(storage_path / "index.sqlite3").rebuild(storage_path)
+    print(f"✅ تمت فهرسة {count} دليل")
+
+if __name__ == "__main__":
+    main()
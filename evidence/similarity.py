@@ -0,0 +1,270 @@
+"""كشف الأدلة شبه المتطابقة
+
+لكل دليل بصمة تشابه بطول 64 بت تُحسب عند الاستلام:
+- الصور: بصمة إدراكية (dHash) لا تتأثر كثيرًا بإعادة الضغط أو تغيير الحجم
+- بقية الملفات: بصمة ضبابية (SimHash) لعينة من مقاطع المحتوى
+
+تُخزن البصمات في جدول evidence_similarity بجانب فهرس المعرفات، وتُبحث في
+الذاكرة عبر جدول تجزئة متعدد الفهارس حسب مسافة هامنج دون مقارنة كل الأدلة.
+
+حساب البصمات للأدلة السابقة:
+    python -m app.evidence.similarity
+"""
+import hashlib
+import heapq
+import json
+import re
+import sqlite3
+import threading
+import zlib
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # بدون Pillow تُعامل الصور كملفات عادية
+    Image = None
+
+from app.evidence import compression
+
+HASH_BITS = 64
+IMAGE_HASH = "image"
+FUZZY_HASH = "fuzzy"
+
+# أقصى مسافة هامنج افتراضية لاعتبار دليلين شبه متطابقين
+DEFAULT_MAX_DISTANCE = {IMAGE_HASH: 8, FUZZY_HASH: 12}
+
+# عدد المقاطع المستخدمة في البصمة الضبابية (أصغر قيم CRC في الملف)
+FUZZY_SAMPLE_SIZE = 256
+_SEGMENT = re.compile(rb"[^\x00\n\r\t ]{4,64}")
+_READ_SIZE = 1024 * 1024
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+def image_hash(path: Path) -> Optional[int]:
+    """بصمة dHash: مقارنة سطوع كل بكسل بجاره في صورة مصغرة 9×8"""
+    if Image is None:
+        return None
+    try:
+        with compression.open_seekable(path) as f, Image.open(f) as img:
+            small = img.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    except (OSError, Image.DecompressionBombError):
+        return None
+    
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+def fuzzy_hash(path: Path) -> Optional[int]:
+    """بصمة SimHash لأصغر المقاطع قيمة
+    
+    تُقسم البيانات إلى مقاطع حسب المحتوى نفسه، فلا يغير إدراج أو حذف بايتات
+    إلا المقاطع القريبة منه، وتبقى البصمة متقاربة للنسخ المعدلة قليلاً.
+    """
+    sample: List[int] = []  # كومة عظمى (بقيم سالبة) لأصغر القيم
+    seen = set()
+    with compression.open_blob(path) as f:
+        while True:
+            chunk = f.read(_READ_SIZE)
+            if not chunk:
+                break
+            for segment in _SEGMENT.findall(chunk):
+                crc = zlib.crc32(segment)
+                if crc in seen:
+                    continue
+                if len(sample) < FUZZY_SAMPLE_SIZE:
+                    heapq.heappush(sample, -crc)
+                    seen.add(crc)
+                elif crc < -sample[0]:
+                    seen.discard(-heapq.heapreplace(sample, -crc))
+                    seen.add(crc)
+    if not seen:
+        return None
+    
+    weights = [0] * HASH_BITS
+    for crc in seen:
+        feature = int.from_bytes(hashlib.blake2b(crc.to_bytes(4, 'big'), digest_size=8).digest(), 'big')
+        for bit in range(HASH_BITS):
+            weights[bit] += 1 if feature >> bit & 1 else -1
+    
+    return sum(1 << bit for bit in range(HASH_BITS) if weights[bit] > 0)
+
+def compute_similarity_hash(path: Path) -> Optional[Tuple[str, int]]:
+    """حساب بصمة التشابه المناسبة لنوع الملف (None إن لم يكن فيه محتوى كافٍ)"""
+    value = image_hash(path)
+    if value is not None:
+        return IMAGE_HASH, value
+    value = fuzzy_hash(path)
+    if value is not None:
+        return FUZZY_HASH, value
+    return None
+
+class MultiIndexHash:
+    """جدول تجزئة متعدد الفهارس لمسافة هامنج
+    
+    تُقسم البصمة إلى أجزاء ولكل جزء جدول. إذا كانت المسافة لا تتجاوز r فلا بد
+    أن يختلف جزء واحد على الأقل بما لا يتجاوز r // عدد الأجزاء، فيكفي البحث
+    في الجداول عن القيم القريبة من كل جزء ثم التحقق من المرشحين فقط.
+    """
+    
+    def __init__(self, blocks: int = 4):
+        self.blocks = blocks
+        self.block_bits = HASH_BITS // blocks
+        self._mask = (1 << self.block_bits) - 1
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(blocks)]
+        self._items: Dict[int, List[Any]] = {}  # البصمة -> العناصر
+    
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._items.values())
+    
+    def _block(self, value: int, index: int) -> int:
+        return (value >> (index * self.block_bits)) & self._mask
+    
+    def add(self, value: int, item: Any):
+        items = self._items.get(value)
+        if items is None:
+            items = self._items[value] = []
+            for index, table in enumerate(self._tables):
+                table.setdefault(self._block(value, index), []).append(value)
+        items.append(item)
+    
+    def search(self, value: int, max_distance: int) -> List[Tuple[Any, int]]:
+        """العناصر التي تبعد بصمتها عن value بما لا يتجاوز max_distance"""
+        flips = _flip_masks(self.block_bits, max_distance // self.blocks)
+        candidates = set()
+        for index, table in enumerate(self._tables):
+            key = self._block(value, index)
+            for flip in flips:
+                candidates.update(table.get(key ^ flip, ()))
+        
+        results = []
+        for candidate in candidates:
+            distance = hamming(candidate, value)
+            if distance <= max_distance:
+                results.extend((item, distance) for item in self._items[candidate])
+        return results
+
+@lru_cache(maxsize=None)
+def _flip_masks(bits: int, radius: int) -> Tuple[int, ...]:
+    """كل الأقنعة التي تقلب ما لا يتجاوز radius بت من bits"""
+    masks = [0]
+    for count in range(1, min(radius, bits) + 1):
+        for positions in combinations(range(bits), count):
+            masks.append(sum(1 << position for position in positions))
+    return tuple(masks)
+
+class SimilarityIndex:
+    """بصمات التشابه المخزنة مع جدول متعدد الفهارس لكل نوع في الذاكرة
+    
+    تُحمّل الجداول عند أول بحث ثم تُكمل بالصفوف الجديدة فقط (بما فيها ما
+    أضافته عمليات أخرى). العناصر المحذوفة تُستبعد بالتحقق من الجدول.
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._tables: Dict[str, MultiIndexHash] = {}
+        self._loaded_rowid = 0
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS evidence_similarity (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    evidence_id TEXT NOT NULL UNIQUE,
+                    case_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    hash TEXT NOT NULL
+                )
+            """)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def add(self, evidence_id: str, case_id: str, kind: str, value: int):
+        """تسجيل بصمة دليل (تحديثها إن وُجدت)"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO evidence_similarity (evidence_id, case_id, kind, hash) VALUES (?, ?, ?, ?)",
+                (evidence_id, case_id, kind, f"{value:016x}")
+            )
+    
+    def get(self, evidence_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT case_id, kind, hash FROM evidence_similarity WHERE evidence_id = ?",
+            (evidence_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"evidence_id": evidence_id, "case_id": row[0], "kind": row[1], "hash": int(row[2], 16)}
+    
+    def remove(self, evidence_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM evidence_similarity WHERE evidence_id = ?", (evidence_id,))
+    
+    def _refresh(self):
+        rows = self._connect().execute(
+            "SELECT id, evidence_id, kind, hash FROM evidence_similarity WHERE id > ? ORDER BY id",
+            (self._loaded_rowid,)
+        ).fetchall()
+        for rowid, evidence_id, kind, value in rows:
+            self._tables.setdefault(kind, MultiIndexHash()).add(int(value, 16), evidence_id)
+            self._loaded_rowid = rowid
+    
+    def find_similar(self, kind: str, value: int, max_distance: int) -> List[Dict[str, Any]]:
+        """الأدلة ذات البصمة القريبة مرتبة حسب المسافة"""
+        with self._lock:
+            self._refresh()
+            table = self._tables.get(kind)
+            candidates = table.search(value, max_distance) if table else []
+        if not candidates:
+            return []
+        
+        # استبعاد المحذوف والقيم القديمة للأدلة التي أعيد حساب بصمتها
+        current = {}
+        ids = list({evidence_id for evidence_id, _ in candidates})
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for evidence_id, case_id, row_kind, row_hash in self._connect().execute(
+                f"SELECT evidence_id, case_id, kind, hash FROM evidence_similarity WHERE evidence_id IN ({placeholders})",
+                batch
+            ):
+                current[evidence_id] = (case_id, row_kind, int(row_hash, 16))
+        
+        matches = {}
+        for evidence_id, distance in candidates:
+            record = current.get(evidence_id)
+            if record is None or record[1] != kind or hamming(record[2], value) != distance:
+                continue
+            matches[evidence_id] = {"evidence_id": evidence_id, "case_id": record[0], "distance": distance}
+        
+        return sorted(matches.values(), key=lambda m: (m["distance"], m["evidence_id"]))
+
+def main():
+    from app.core.config import settings
+    from app.evidence.engine import EvidenceEngine
+    
+    engine = EvidenceEngine(settings.EVIDENCE_STORAGE_PATH)
+    count = 0
+    for meta_file in settings.EVIDENCE_STORAGE_PATH.glob("*.meta.json"):
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if engine.similarity.get(metadata["evidence_id"]) is None:
+            if engine.index_similarity(metadata) is not None:
+                count += 1
+    print(f"✅ تم حساب بصمات التشابه لـ {count} دليل")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""صور مصغرة لأدلة الصور (تتطلب Pillow)"""
+from pathlib import Path
+
+from app.evidence import compression
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+THUMBNAIL_SIZE = (256, 256)
+
+def create_thumbnail(source: Path, destination: Path) -> bool:
+    """إنشاء صورة مصغرة JPEG وإرجاع False إن لم يكن الملف صورة"""
+    if Image is None:
+        return False
+    
+    temp_path = destination.with_suffix('.part')
+    try:
+        with compression.open_seekable(source) as f, Image.open(f) as img:
+            img.thumbnail(THUMBNAIL_SIZE)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            img.convert("RGB").save(temp_path, "JPEG", quality=80)
+    except (OSError, Image.DecompressionBombError):
+        temp_path.unlink(missing_ok=True)
+        return False
+    temp_path.replace(destination)
+    return True
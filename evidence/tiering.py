@@ -0,0 +1,116 @@
+"""نقل أدلة القضايا المغلقة إلى مجلد الأرشيف
+
+ملفات أدلة القضايا المغلقة منذ EVIDENCE_ARCHIVE_AFTER_DAYS يومًا تُنسخ إلى
+EVIDENCE_ARCHIVE_PATH بأعلى ضغط متاح، ثم يُحدَّث مسارها في قاعدة البيانات، وبعدها
+فقط يُحذف الأصل من المخزن (التوقف بين الخطوتين يُستكمل في التشغيل التالي). تبقى
+بياناتها الوصفية وفهرسها في المخزن فيستمر البحث والتنزيل والتحقق كما هي.
+يُشغَّل دوريًا:
+    python -m app.evidence.tiering [--days 30] [--limit 1000] [--dry-run]
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import models
+from app.evidence import custody
+from app.evidence.engine import EvidenceEngine, EvidenceIntegrityError, get_evidence_engine
+
+def select_candidates(connection, archive_path: Path, older_than_days: int,
+                      limit: Optional[int] = None) -> List[str]:
+    """معرفات أدلة القضايا المغلقة الأقدم من المدة والتي لم تُنقل بعد"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    # closed_at لا يُسجل لكل القضايا (مثل المغلقة قبل هذا الحقل): آخر تعديل بديل عنه
+    closed_at = func.coalesce(models.Case.closed_at, models.Case.updated_at, models.Case.created_at)
+    query = (
+        select(models.Evidence.evidence_id)
+        .join(models.Case, models.Evidence.case_id == models.Case.id)
+        .where(
+            models.Case.status == models.CaseStatus.CLOSED,
+            closed_at <= cutoff,
+            models.Evidence.file_path.not_like(f"{archive_path}%")
+        )
+        .order_by(models.Evidence.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return list(connection.execute(query).scalars())
+
+def archive_closed_cases(db_engine, evidence_engine: EvidenceEngine, archive_path: Path,
+                         older_than_days: int, limit: Optional[int] = None) -> Dict[str, int]:
+    """نقل أدلة القضايا المغلقة وتحديث مسارها في قاعدة البيانات وتسجيله في سجل العهدة"""
+    with db_engine.connect() as connection:
+        evidence_ids = select_candidates(connection, archive_path, older_than_days, limit)
+    
+    result = {"archived": 0, "skipped": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+    custody_log = custody.get_custody_log()
+    pending = []
+    for evidence_id in evidence_ids:
+        try:
+            metadata = evidence_engine.archive_evidence(evidence_id, archive_path)
+            if metadata is None:
+                # محتوى مشترك أو ملف مفقود
+                result["skipped"] += 1
+                continue
+            source = Path(metadata["archived_from"])
+            size_before = source.stat().st_size
+            
+            # الأصل يُحذف بعد أن يشير السجل إلى النسخة المؤرشفة، لا قبله
+            with db_engine.begin() as connection:
+                connection.execute(
+                    update(models.Evidence)
+                    .where(models.Evidence.evidence_id == evidence_id)
+                    .values(file_path=metadata["file_path"], metadata_=metadata)
+                )
+            evidence_engine.remove_archived_source(metadata)
+        except (EvidenceIntegrityError, OSError, SQLAlchemyError) as exc:
+            # الأصل باقٍ في المخزن: يُعاد المحاولة في التشغيل التالي بعد فحص السبب
+            print(f"❌ {evidence_id}: {exc}")
+            result["failed"] += 1
+            continue
+        
+        pending.append(custody_log.append(custody.ARCHIVE, evidence_id=evidence_id, case_id=metadata["case_id"], details={
+            "from": str(source), "to": metadata["file_path"], "compression": metadata["compression"]
+        }))
+        result["archived"] += 1
+        result["bytes_before"] += size_before
+        result["bytes_after"] += metadata["stored_size"]
+    
+    for future in pending:
+        future.result()
+    return result
+
+def main():
+    from app.core.config import settings
+    from app.database.session import engine
+    
+    parser = argparse.ArgumentParser(description="نقل أدلة القضايا المغلقة إلى الأرشيف")
+    parser.add_argument("--days", type=int, default=settings.EVIDENCE_ARCHIVE_AFTER_DAYS,
+                        help="عدد الأيام منذ إغلاق القضية")
+    parser.add_argument("--limit", type=int, default=None, help="أقصى عدد أدلة في هذا التشغيل")
+    parser.add_argument("--dry-run", action="store_true", help="عرض عدد الأدلة المرشحة دون نقلها")
+    args = parser.parse_args()
+    
+    archive_path = settings.EVIDENCE_ARCHIVE_PATH
+    if args.dry_run:
+        with engine.connect() as connection:
+            count = len(select_candidates(connection, archive_path, args.days, args.limit))
+        print(f"{count} دليل مرشح للنقل إلى {archive_path}")
+        return
+    
+    try:
+        result = archive_closed_cases(engine, get_evidence_engine(), archive_path, args.days, args.limit)
+    finally:
+        custody.get_custody_log().close()
+    print(
+        f"✅ نُقل {result['archived']} دليل (من {result['bytes_before']} إلى {result['bytes_after']} بايت)، "
+        f"تُخطي {result['skipped']}، وفشل {result['failed']}"
+    )
+    if result["failed"]:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
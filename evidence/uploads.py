@@ -0,0 +1,288 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.evidence.engine import (
+    EvidenceEngine, EvidenceTooLargeError, get_evidence_engine, stream_to_temp, CHUNK_SIZE
+)
+
+# أقصى عدد للأجزاء في جلسة رفع واحدة
+MAX_PARTS = 10000
+# أقصى مدة بين عمليتي تنظيف للجلسات المتروكة (عند بدء جلسة جديدة)
+CLEANUP_INTERVAL = 3600
+
+class UploadSessionError(Exception):
+    """جلسة رفع غير موجودة أو طلب غير صالح"""
+
+class UploadIntegrityError(Exception):
+    """البصمة المحسوبة لا تطابق البصمة المتوقعة"""
+
+class UploadSessionManager:
+    """إدارة جلسات الرفع المجزأ القابلة للاستئناف
+
+    كل جلسة مجلد مستقل يحتوي على session.json وملف لكل جزء مع بصمته،
+    لذلك يمكن رفع الأجزاء بالتوازي وإعادة المحاولة للأجزاء الفاشلة فقط.
+    """
+
+    def __init__(self, engine: EvidenceEngine, uploads_path: Optional[Path] = None,
+                 max_age: Optional[float] = None):
+        self.engine = engine
+        self.uploads_path = uploads_path or engine.storage_path / "uploads"
+        self.uploads_path.mkdir(parents=True, exist_ok=True)
+        # الجلسات المتروكة (دون complete أو abort) تُحذف بعد max_age ثانية بلا نشاط
+        self.max_age = max_age
+        self._next_cleanup = 0.0
+
+    def initiate(self, case_id: str, evidence_type: str, user_id: int,
+                 source_url: Optional[str] = None, expected_hash: Optional[str] = None,
+                 total_size: Optional[int] = None) -> Dict[str, Any]:
+        """بدء جلسة رفع جديدة"""
+        if self.max_age is not None and time.monotonic() >= self._next_cleanup:
+            self._next_cleanup = time.monotonic() + CLEANUP_INTERVAL
+            self.cleanup_expired(self.max_age)
+
+        upload_id = uuid.uuid4().hex
+        session = {
+            "upload_id": upload_id,
+            "case_id": case_id,
+            "type": evidence_type,
+            "user_id": user_id,
+            "source_url": source_url,
+            "expected_hash": expected_hash.lower() if expected_hash else None,
+            "total_size": total_size,
+            "created_at": datetime.now().isoformat()
+        }
+
+        session_dir = self.uploads_path / upload_id
+        session_dir.mkdir()
+        with open(session_dir / "session.json", 'w', encoding='utf-8') as f:
+            json.dump(session, f, ensure_ascii=False, indent=2)
+
+        return session
+
+    def get_session(self, upload_id: str) -> Dict[str, Any]:
+        """قراءة بيانات الجلسة"""
+        session_file = self._session_dir(upload_id) / "session.json"
+        if not session_file.exists():
+            raise UploadSessionError("جلسة الرفع غير موجودة")
+        with open(session_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    async def write_part(self, upload_id: str, part_number: int, file,
+                         max_size: Optional[int] = None,
+                         expected_hash: Optional[str] = None) -> Dict[str, Any]:
+        """تخزين جزء مرقّم مع حساب بصمته المستقلة (إعادة الرفع تستبدل الجزء)"""
+        received = await self.receive_part(upload_id, part_number, file, max_size)
+        return self.commit_part(upload_id, part_number, received, expected_hash)
+
+    async def receive_part(self, upload_id: str, part_number: int, file,
+                           max_size: Optional[int] = None) -> Tuple[Path, str, int]:
+        """استلام جزء إلى ملف مؤقت خاص بهذا الطلب وإرجاع (المسار، البصمة، الحجم)
+
+        max_size حد الجلسة كلها: يُرفض الجزء فور تجاوزه مع بقية الأجزاء المستلمة
+        الحد أو الحجم المعلن عند البدء. الجزء المستلم سابقًا بنفس الرقم لا يُمس
+        حتى commit_part.
+        """
+        session = self.get_session(upload_id)
+        if not 1 <= part_number <= MAX_PARTS:
+            raise UploadSessionError("رقم الجزء غير صالح")
+
+        limit = self._remaining_size(session, part_number, max_size)
+        if limit is not None and limit <= 0:
+            raise EvidenceTooLargeError(upload_id)
+        temp_path = self._part_path(upload_id, part_number).with_suffix(f".{uuid.uuid4().hex}.part")
+        part_hash, part_size = await stream_to_temp(file, temp_path, limit)
+        return temp_path, part_hash, part_size
+
+    def commit_part(self, upload_id: str, part_number: int, received: Tuple[Path, str, int],
+                    expected_hash: Optional[str] = None, max_size: Optional[int] = None) -> Dict[str, Any]:
+        """مطابقة بصمة جزء استلمه receive_part ثم وضعه مكان الجزء السابق
+
+        عند عدم المطابقة يُحذف الملف المؤقت ويبقى الجزء السابق كما هو. يُعاد
+        فحص حد الجلسة تحت قفلها، فالأجزاء المرفوعة بالتوازي لا تتجاوزه معًا.
+        """
+        temp_path, part_hash, part_size = received
+        part_path = self._part_path(upload_id, part_number)
+        part_meta = part_path.with_suffix('.json')
+        temp_meta = temp_path.with_suffix('.json.tmp')
+        part = {"part_number": part_number, "size": part_size, "hash": part_hash}
+        try:
+            if expected_hash and part_hash != expected_hash.lower():
+                raise UploadIntegrityError("بصمة الجزء لا تطابق البصمة المرسلة")
+            with self._session_lock(upload_id):
+                limit = self._remaining_size(self.get_session(upload_id), part_number, max_size)
+                if limit is not None and part_size > limit:
+                    raise EvidenceTooLargeError(upload_id)
+                with open(temp_meta, 'w', encoding='utf-8') as f:
+                    json.dump(part, f)
+                os.replace(temp_path, part_path)
+                os.replace(temp_meta, part_meta)
+        finally:
+            temp_path.unlink(missing_ok=True)
+            temp_meta.unlink(missing_ok=True)
+
+        return part
+
+    def list_parts(self, upload_id: str) -> List[Dict[str, Any]]:
+        """الأجزاء المستلمة مرتبة حسب الرقم"""
+        session_dir = self._session_dir(upload_id)
+        self.get_session(upload_id)
+
+        parts = []
+        for part_meta in session_dir.glob("part-*.json"):
+            with open(part_meta, 'r', encoding='utf-8') as f:
+                parts.append(json.load(f))
+        parts.sort(key=lambda p: p["part_number"])
+        return parts
+
+    def complete(self, upload_id: str, expected_hash: Optional[str] = None,
+                 max_size: Optional[int] = None, index_similarity: bool = True) -> Dict[str, Any]:
+        """دمج الأجزاء والتحقق من البصمة النهائية ثم نقل الدليل إلى المخزن
+
+        عملية متزامنة تقرأ الملفات بالكامل، لذا يجب تشغيلها خارج حلقة الأحداث.
+        تُنفذ تحت قفل الجلسة: طلب إكمال ثانٍ متزامن يُرفض بدل أن يكتب نفس ملف
+        الدمج ويسجل الدليل مرتين، والأجزاء الجديدة تنتظر حتى ينتهي.
+        """
+        try:
+            with self._session_lock(upload_id, blocking=False):
+                return self._complete(upload_id, expected_hash, max_size, index_similarity)
+        except BlockingIOError:
+            raise UploadSessionError("جلسة الرفع قيد الإكمال أو التعديل")
+
+    def _complete(self, upload_id: str, expected_hash: Optional[str],
+                  max_size: Optional[int], index_similarity: bool) -> Dict[str, Any]:
+        # الجلسة قد تكون أُكملت بطلب سابق قبل الحصول على القفل
+        session = self.get_session(upload_id)
+        parts = self.list_parts(upload_id)
+        expected_hash = (expected_hash or session["expected_hash"] or "").lower() or None
+
+        if not parts:
+            raise UploadSessionError("لا توجد أجزاء مرفوعة")
+        numbers = [p["part_number"] for p in parts]
+        if numbers != list(range(1, len(parts) + 1)):
+            missing = sorted(set(range(1, numbers[-1] + 1)) - set(numbers))
+            raise UploadSessionError(f"أجزاء مفقودة: {missing}")
+
+        total_size = sum(p["size"] for p in parts)
+        if max_size is not None and total_size > max_size:
+            raise UploadSessionError("حجم الملف يتجاوز الحد المسموح")
+        if session["total_size"] is not None and total_size != session["total_size"]:
+            raise UploadSessionError("الحجم الكلي لا يطابق الحجم المعلن")
+
+        # دمج الأجزاء مع حساب البصمة النهائية في مرور واحد
+        session_dir = self._session_dir(upload_id)
+        assembled = session_dir / "assembled.part"
+        hasher = hashlib.sha256()
+        with open(assembled, 'wb') as out:
+            for part in parts:
+                try:
+                    src = open(self._part_path(upload_id, part["part_number"]), 'rb')
+                except FileNotFoundError:
+                    assembled.unlink(missing_ok=True)
+                    raise UploadSessionError(f"الجزء {part['part_number']} مفقود، يجب إعادة رفعه")
+                with src:
+                    while True:
+                        chunk = src.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        hasher.update(chunk)
+                        out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+
+        file_hash = hasher.hexdigest()
+        if expected_hash and file_hash != expected_hash:
+            assembled.unlink(missing_ok=True)
+            raise UploadIntegrityError("البصمة النهائية لا تطابق البصمة المتوقعة")
+
+        metadata = self.engine.store_evidence_file(
+            assembled,
+            file_hash=file_hash,
+            file_size=total_size,
+            case_id=session["case_id"],
+            evidence_type=session["type"],
+            source_url=session["source_url"],
+            index_similarity=index_similarity
+        )
+        self.abort(upload_id)
+
+        return metadata
+
+    def cleanup_expired(self, max_age: float) -> int:
+        """حذف الجلسات التي لم يُرفع إليها شيء منذ max_age ثانية وإرجاع عددها"""
+        cutoff = time.time() - max_age
+        removed = 0
+        for session_dir in self.uploads_path.iterdir():
+            try:
+                # إضافة جزء أو استبداله تُحدّث وقت تعديل المجلد
+                if not session_dir.is_dir() or session_dir.stat().st_mtime > cutoff:
+                    continue
+                with self._session_lock(session_dir.name, blocking=False):
+                    shutil.rmtree(session_dir, ignore_errors=True)
+            except (BlockingIOError, UploadSessionError, FileNotFoundError):
+                # قيد الاستخدام أو ليس مجلد جلسة أو حُذف للتو
+                continue
+            removed += 1
+        return removed
+
+    def abort(self, upload_id: str):
+        """حذف الجلسة وجميع أجزائها"""
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+
+    def _session_dir(self, upload_id: str) -> Path:
+        # معرف الجلسة يُستخدم كاسم مجلد، لذا يُقبل الشكل الست عشري فقط
+        if len(upload_id) != 32 or not all(c in "0123456789abcdef" for c in upload_id):
+            raise UploadSessionError("جلسة الرفع غير موجودة")
+        return self.uploads_path / upload_id
+
+    def _remaining_size(self, session: Dict[str, Any], part_number: int,
+                        max_size: Optional[int]) -> Optional[int]:
+        """ما يتسع له هذا الجزء: الحد أو الحجم المعلن ناقص بقية الأجزاء المستلمة"""
+        limits = [size for size in (max_size, session["total_size"]) if size is not None]
+        if not limits:
+            return None
+        others = sum(p["size"] for p in self.list_parts(session["upload_id"]) if p["part_number"] != part_number)
+        return min(limits) - others
+
+    @contextmanager
+    def _session_lock(self, upload_id: str, blocking: bool = True):
+        # قفل على مستوى الملفات ليشمل جميع العمليات العاملة على نفس المخزن
+        session_dir = self._session_dir(upload_id)
+        try:
+            lock = open(session_dir / ".lock", 'a')
+        except FileNotFoundError:
+            raise UploadSessionError("جلسة الرفع غير موجودة")
+        with lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _part_path(self, upload_id: str, part_number: int) -> Path:
+        return self._session_dir(upload_id) / f"part-{part_number:05d}.dat"
+
+_sessions: Optional[UploadSessionManager] = None
+_sessions_lock = threading.Lock()
+
+def get_upload_sessions() -> UploadSessionManager:
+    """جلسات الرفع على محرك الأدلة المشترك"""
+    global _sessions
+    if _sessions is None:
+        with _sessions_lock:
+            if _sessions is None:
+                from app.core.config import settings
+                _sessions = UploadSessionManager(
+                    get_evidence_engine(),
+                    max_age=settings.UPLOAD_SESSION_MAX_AGE_HOURS * 3600
+                )
+    return _sessions
@@ -1,63 +1,45 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
+from datetime import datetime
 import uvicorn
-import os
-from pathlib import Path
 
-from app.api.endpoints import auth, cases, evidence
+from app.api.endpoints import auth, cases, entities, evidence, jobs, metrics, rules
+from app.api.middleware import MetricsMiddleware
 from app.core.config import settings
-from app.database.session import engine, Base
+from app.core.auth import password_hasher
+from app.database.init import init_database
+from app.database.session import async_engine
+from app.pipeline.worker import start_embedded_workers
 
-# إنشاء المجلدات الضرورية
-def create_required_dirs():
-    dirs = [
-        "storage",
-        "storage/evidence",
-        "storage/databases",
-        "logs"
-    ]
-    
-    for dir_path in dirs:
-        Path(dir_path).mkdir(parents=True, exist_ok=True)
-
-# إنشاء الجداول عند بدء التشغيل
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # عند البدء
-    create_required_dirs()
-    Base.metadata.create_all(bind=engine)
+    # عند البدء: المخطط والمسؤول الافتراضي يُهيآن مرة واحدة بـ python -m app.database.init
+    # لا في كل عامل (التطوير المحلي يمكنه تفعيل DB_INIT_ON_STARTUP)
+    if settings.DB_INIT_ON_STARTUP:
+        await run_in_threadpool(init_database)
     
-    # إنشاء مستخدم مسؤول افتراضي إذا لم يكن موجودًا
-    from app.database.session import SessionLocal
-    from app.database import models
-    from app.core.auth import get_password_hash
+    # ترجمة قواعد التصنيف في الخلفية دون تأخير بدء الخادم
+    cases.rule_registry.warm_up()
     
-    db = SessionLocal()
-    try:
-        admin_user = db.query(models.User).filter(
-            models.User.username == "admin"
-        ).first()
-        
-        if not admin_user:
-            admin_user = models.User(
-                username="admin",
-                email="admin@cybershield.legal",
-                full_name="System Administrator",
-                hashed_password=get_password_hash("admin123"),
-                role=models.UserRole.ADMIN
-            )
-            db.add(admin_user)
-            db.commit()
-            print("✅ تم إنشاء المستخدم المسؤول الافتراضي")
-    except:
-        pass
-    finally:
-        db.close()
+    # استئناف مهام فحص السلامة غير المكتملة
+    evidence.auditor.resume_pending()
+    
+    # عمال طابور المعالجة داخل العملية (يمكن تشغيل عمال منفصلين بدلًا منهم)
+    stop_workers = None
+    if settings.PIPELINE_ENABLED:
+        stop_workers = start_embedded_workers(jobs.job_queue, settings.PIPELINE_EMBEDDED_WORKERS)
     
     yield
     # عند الإغلاق
+    if stop_workers is not None:
+        stop_workers.set()
+    cases.rule_registry.close()
+    evidence.custody_log.close()
+    password_hasher.close()
+    await async_engine.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -74,13 +56,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# قياس زمن الطلبات (/metrics)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # تسجيل الروابط
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["authentication"])
 app.include_router(cases.router, prefix=f"{settings.API_V1_STR}/cases", tags=["cases"])
 app.include_router(evidence.router, prefix=f"{settings.API_V1_STR}/evidence", tags=["evidence"])
+app.include_router(entities.router, prefix=f"{settings.API_V1_STR}/entities", tags=["entities"])
+app.include_router(jobs.router, prefix=f"{settings.API_V1_STR}/jobs", tags=["jobs"])
+app.include_router(rules.router, prefix=f"{settings.API_V1_STR}/rules", tags=["rules"])
+app.include_router(metrics.router, tags=["metrics"])
 
 # خدمة الملفات الثابتة لواجهة المستخدم
-app.mount("/static", StaticFiles(directory="app/frontend/assets"), name="static")
+# المجلد اختياري: غيابه لا يمنع بدء الخادم
+app.mount("/static", StaticFiles(directory="app/frontend/assets", check_dir=False), name="static")
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,35 @@
+from alembic import context
+
+from app.database.session import engine, Base, IS_SQLITE
+from app.database import models  # noqa: F401 - تسجيل الجداول في Base.metadata
+
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    """توليد SQL دون اتصال بقاعدة البيانات"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=IS_SQLITE
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    """تنفيذ الترحيلات على قاعدة البيانات المحددة في DATABASE_URL"""
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite لا يدعم معظم أوامر ALTER TABLE
+            render_as_batch=IS_SQLITE
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
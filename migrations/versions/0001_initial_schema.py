@@ -0,0 +1,80 @@
+"""الجداول الأساسية: users و cases و evidence
+
+قواعد البيانات التي أنشأها create_all سابقًا تُعلَّم بهذه النسخة:
+    alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+USER_ROLES = ("ADMIN", "INTAKE", "ANALYST", "REPORTER", "VIEWER")
+CASE_STATUSES = (
+    "NEW", "UNDER_ANALYSIS", "EVIDENCE_COLLECTED", "REPORT_SUBMITTED", "CLOSED", "ESCALATED"
+)
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(50), nullable=False),
+        sa.Column("email", sa.String(100), nullable=False),
+        sa.Column("full_name", sa.String(100)),
+        sa.Column("hashed_password", sa.String(100), nullable=False),
+        sa.Column("role", sa.Enum(*USER_ROLES, name="userrole"), nullable=False),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    
+    op.create_table(
+        "cases",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("case_id", sa.String(20), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("reporter_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("status", sa.Enum(*CASE_STATUSES, name="casestatus"), nullable=False),
+        sa.Column("priority", sa.String(10)),
+        sa.Column("category", sa.String(50)),
+        sa.Column("assigned_to", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("closed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("tags", sa.JSON()),
+    )
+    op.create_index("ix_cases_id", "cases", ["id"])
+    op.create_index("ix_cases_case_id", "cases", ["case_id"], unique=True)
+    
+    op.create_table(
+        "evidence",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("evidence_id", sa.String(20), nullable=False),
+        sa.Column("case_id", sa.Integer(), sa.ForeignKey("cases.id"), nullable=False),
+        sa.Column("type", sa.String(20), nullable=False),
+        sa.Column("file_hash", sa.String(64), nullable=False),
+        sa.Column("file_path", sa.Text(), nullable=False),
+        sa.Column("source_url", sa.Text()),
+        sa.Column("metadata", sa.JSON()),
+        sa.Column("collected_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("integrity_verified", sa.Boolean()),
+    )
+    op.create_index("ix_evidence_id", "evidence", ["id"])
+    op.create_index("ix_evidence_evidence_id", "evidence", ["evidence_id"], unique=True)
+
+def downgrade():
+    op.drop_table("evidence")
+    op.drop_table("cases")
+    op.drop_table("users")
+    sa.Enum(name="casestatus").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="userrole").drop(op.get_bind(), checkfirst=True)
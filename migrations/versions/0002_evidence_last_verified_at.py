@@ -0,0 +1,21 @@
+"""تاريخ آخر تحقق من سلامة الدليل
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("evidence") as batch_op:
+        batch_op.add_column(sa.Column("last_verified_at", sa.DateTime(timezone=True), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("evidence") as batch_op:
+        batch_op.drop_column("last_verified_at")
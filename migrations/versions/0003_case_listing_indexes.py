@@ -0,0 +1,28 @@
+"""فهارس مركبة لقائمة القضايا المقسمة إلى صفحات
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_cases_created_at_id": ["created_at", "id"],
+    "ix_cases_status_created_at_id": ["status", "created_at", "id"],
+    "ix_cases_priority_created_at_id": ["priority", "created_at", "id"],
+    "ix_cases_category_created_at_id": ["category", "created_at", "id"],
+    "ix_cases_reporter_id_created_at_id": ["reporter_id", "created_at", "id"],
+}
+
+def upgrade():
+    for name, columns in INDEXES.items():
+        op.create_index(name, "cases", columns)
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="cases")
@@ -0,0 +1,23 @@
+"""فهرس البحث النصي cases_fts (SQLite FTS5)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+"""
+from alembic import op
+
+from app.database.search import rebuild_search_index
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        rebuild_search_index(bind)
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS cases_fts")
@@ -0,0 +1,40 @@
+"""جداول إحصائيات القضايا التراكمية
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:04
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.stats import rebuild_case_stats
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    bind = op.get_bind()
+    existing = sa.inspect(bind).get_table_names()
+    # قد تكون أُنشئت فارغة مسبقًا عبر create_all عند بدء التشغيل
+    if "case_stats" not in existing:
+        op.create_table(
+            "case_stats",
+            sa.Column("dimension", sa.String(20), primary_key=True),
+            sa.Column("value", sa.String(50), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False)
+        )
+    if "case_daily_stats" not in existing:
+        op.create_table(
+            "case_daily_stats",
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("dimension", sa.String(20), primary_key=True),
+            sa.Column("value", sa.String(50), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False)
+        )
+    rebuild_case_stats(bind)
+
+def downgrade():
+    op.drop_table("case_daily_stats")
+    op.drop_table("case_stats")
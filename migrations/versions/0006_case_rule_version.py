@@ -0,0 +1,21 @@
+"""نسخة قواعد التصنيف لكل قضية
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:05
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("cases") as batch_op:
+        batch_op.add_column(sa.Column("rule_version", sa.String(20), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("cases") as batch_op:
+        batch_op.drop_column("rule_version")
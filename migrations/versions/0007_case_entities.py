@@ -0,0 +1,31 @@
+"""الفهرس المعكوس لكيانات القضايا
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:06
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.entities import rebuild_entity_index
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "case_entities",
+        sa.Column("value", sa.String(512), primary_key=True),
+        sa.Column("case_id", sa.Integer(), sa.ForeignKey("cases.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("source", sa.String(20), primary_key=True),
+        sa.Column("kind", sa.String(20), nullable=False)
+    )
+    op.create_index("ix_case_entities_case_id_source", "case_entities", ["case_id", "source"])
+    # فهرسة القضايا والأدلة الموجودة
+    rebuild_entity_index(op.get_bind())
+
+def downgrade():
+    op.drop_index("ix_case_entities_case_id_source", table_name="case_entities")
+    op.drop_table("case_entities")
@@ -0,0 +1,239 @@
+"""طابور مهام محلي دائم (SQLite) دون وسيط خارجي
+
+يحجز المهمة أحد العمال بعقد إيجار محدد المدة يجدده ما دام ينفذها؛ إذا توقف
+العامل قبل الإنهاء تعود المهمة للطابور بعد انتهاء العقد.
+المهام الفاشلة تُعاد بتأخير متزايد حتى الحد الأقصى للمحاولات.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class PermanentJobError(Exception):
+    """خطأ لا تفيد معه إعادة المحاولة (مثل حذف القضية)"""
+
+class JobQueue:
+    def __init__(self, db_path: Path, lease_seconds: float = 300, retry_delay: float = 5):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self._local = threading.local()
+        # إيقاظ العمال داخل نفس العملية فور إضافة مهمة
+        self.wakeup = threading.Event()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_after REAL NOT NULL,
+                locked_by TEXT,
+                locked_until REAL,
+                user_id INTEGER,
+                result TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after)")
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # وضع autocommit لإدارة المعاملات يدويًا (BEGIN IMMEDIATE عند الحجز)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def enqueue(self, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None,
+                max_attempts: int = 5, delay: float = 0) -> str:
+        """إضافة مهمة وإرجاع معرفها"""
+        job_id = uuid.uuid4().hex[:12]
+        now = datetime.now().isoformat()
+        self._connect().execute(
+            "INSERT INTO jobs (job_id, kind, payload, status, max_attempts, run_after, user_id, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload, ensure_ascii=False), QUEUED, max_attempts,
+             time.time() + delay, user_id, now, now)
+        )
+        self.wakeup.set()
+        return job_id
+    
+    def enqueue_missing(self, kind: str, payloads: List[Dict[str, Any]], key: str,
+                        max_attempts: int = 5) -> int:
+        """إضافة مهام للبيانات التي ليس لقيمة key فيها مهمة من نفس النوع بأي حالة
+        
+        الفحص والإضافة في معاملة واحدة، فتكرار الاستدعاء من عدة عمليات لا يكرر المهام.
+        """
+        if not payloads:
+            return 0
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            values = [payload[key] for payload in payloads]
+            existing = {
+                row[0] for row in conn.execute(
+                    f"SELECT json_extract(payload, '$.{key}') FROM jobs WHERE kind = ? "
+                    f"AND json_extract(payload, '$.{key}') IN ({','.join('?' * len(values))})",
+                    [kind, *values]
+                )
+            }
+            now = datetime.now().isoformat()
+            rows = [
+                (uuid.uuid4().hex[:12], kind, json.dumps(payload, ensure_ascii=False), QUEUED,
+                 max_attempts, time.time(), now, now)
+                for payload in payloads if payload[key] not in existing
+            ]
+            conn.executemany(
+                "INSERT INTO jobs (job_id, kind, payload, status, max_attempts, run_after, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if rows:
+            self.wakeup.set()
+        return len(rows)
+    
+    def claim(self, worker_id: str, kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """حجز أقدم مهمة جاهزة (أو مهمة انتهى عقد عاملها)"""
+        conn = self._connect()
+        now = time.time()
+        kind_filter = ""
+        params: list = [QUEUED, now, RUNNING, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+            params += kinds
+        
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE ((status = ? AND run_after <= ?) OR (status = ? AND locked_until < ?))"
+                    f"{kind_filter} ORDER BY run_after LIMIT 1",
+                    params
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                
+                if row["status"] == RUNNING and row["attempts"] >= row["max_attempts"]:
+                    # توقف العامل في المحاولة الأخيرة
+                    self._finish(conn, row["job_id"], row["locked_by"], FAILED, error="انتهت مهلة التنفيذ")
+                    conn.execute("COMMIT")
+                    continue
+                
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, locked_by = ?, locked_until = ?, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (RUNNING, worker_id, now + self.lease_seconds, datetime.now().isoformat(), row["job_id"])
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            break
+        
+        job = self._to_dict(row)
+        job["attempts"] += 1
+        job["status"] = RUNNING
+        return job
+    
+    def renew(self, job_id: str, worker_id: str) -> bool:
+        """تمديد عقد مهمة ما زال العامل ينفذها، وإرجاع False إن لم تعد له"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET locked_until = ? WHERE job_id = ? AND status = ? AND locked_by = ?",
+            (time.time() + self.lease_seconds, job_id, RUNNING, worker_id)
+        )
+        return cursor.rowcount > 0
+    
+    def complete(self, job_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """إنهاء المهمة بنجاح، وإرجاع False إن لم يعد العامل صاحب عقدها"""
+        return self._finish(self._connect(), job_id, worker_id, DONE, result=result)
+    
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """تسجيل فشل المحاولة وإعادة جدولة المهمة إن بقيت محاولات"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND status = ? AND locked_by = ?",
+            (job_id, RUNNING, worker_id)
+        ).fetchone()
+        if row is None:
+            return False
+        if retry and row["attempts"] < row["max_attempts"]:
+            # تأخير متزايد: 5، 10، 20، ... ثانية
+            run_after = time.time() + self.retry_delay * 2 ** (row["attempts"] - 1)
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, run_after = ?, locked_by = NULL, locked_until = NULL, "
+                "error = ?, updated_at = ? WHERE job_id = ? AND status = ? AND locked_by = ?",
+                (QUEUED, run_after, error, datetime.now().isoformat(), job_id, RUNNING, worker_id)
+            )
+            return cursor.rowcount > 0
+        return self._finish(conn, job_id, worker_id, FAILED, error=error)
+    
+    def _finish(self, conn: sqlite3.Connection, job_id: str, worker_id: str, status: str,
+                result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+        # مشروط بأن العامل ما زال صاحب العقد: عامل انتهى عقده وحجز غيرُه المهمة
+        # لا يُنهيها ولا يعيدها للطابور
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, locked_by = NULL, locked_until = NULL, "
+            "updated_at = ? WHERE job_id = ? AND status = ? AND locked_by = ?",
+            (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+             error, datetime.now().isoformat(), job_id, RUNNING, worker_id)
+        )
+        return cursor.rowcount > 0
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+    
+    def list_jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM jobs"
+        params: list = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        return [self._to_dict(row) for row in self._connect().execute(query, params)]
+    
+    def stats(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for row in self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[row[0]] = row[1]
+        return counts
+    
+    def purge(self, older_than_seconds: float) -> int:
+        """حذف المهام المنتهية الأقدم من المدة المحددة"""
+        cutoff = datetime.fromtimestamp(time.time() - older_than_seconds).isoformat()
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (DONE, FAILED, cutoff)
+        )
+        return cursor.rowcount
+    
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
@@ -0,0 +1,140 @@
+"""مراحل معالجة القضايا والأدلة بعد استلامها
+
+كل مرحلة دالة تستقبل بيانات المهمة وتعيد نتيجة قابلة للتحويل إلى JSON.
+الأخطاء العادية تُعاد محاولتها، و PermanentJobError تُنهي المهمة فورًا.
+"""
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Any
+
+from app.core.config import settings
+from app.database import models
+from app.database import entities, search, stats  # تسجيل أحداث الفهارس والإحصائيات في عملية العامل
+from app.database.session import SessionLocal
+from app.evidence import custody
+from app.evidence.engine import get_evidence_engine
+from app.evidence.thumbnails import create_thumbnail
+from app.pipeline.queue import JobQueue, PermanentJobError
+from app.rules_engine.registry import get_registry
+
+CLASSIFY_CASE = "case.classify"
+SEAL_EVIDENCE = "evidence.seal"
+THUMBNAIL_EVIDENCE = "evidence.thumbnail"
+SIMILARITY_EVIDENCE = "evidence.similarity"
+
+# مراحل الدليل بعد تخزينه (مستقلة، فلكل منها محاولاتها)
+EVIDENCE_STAGES = [SEAL_EVIDENCE, THUMBNAIL_EVIDENCE, SIMILARITY_EVIDENCE]
+
+def classify_case(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """تصنيف وصف القضية وتعيين الفئة إن لم يحددها المبلّغ"""
+    db = SessionLocal()
+    try:
+        case = db.query(models.Case).filter(models.Case.case_id == payload["case_id"]).first()
+        if case is None:
+            raise PermanentJobError("القضية غير موجودة")
+        
+        classifier = get_registry().current()
+        classification = classifier.classify_text(case.description or "")
+        if payload.get("set_category") and classification and case.category == "unknown":
+            case.category = classification[0].category
+        case.rule_version = classifier.version
+        db.commit()
+        
+        return {
+            "case_id": case.case_id,
+            "category": case.category,
+            "classification": [c.__dict__ for c in classification],
+            "rule_version": classifier.version
+        }
+    finally:
+        db.close()
+
+def recover_unclassified_cases(queue: JobQueue, batch_size: int = 500) -> int:
+    """إضافة مهام تصنيف للقضايا التي حُفظت ولم تُسجل مهمتها
+    
+    القضية تُحفظ في قاعدة البيانات ثم تُضاف مهمتها إلى الطابور (ملف SQLite منفصل)،
+    فتوقف العملية بينهما يترك القضية دون تصنيف (rule_version فارغ)، سواء حدد
+    المبلّغ فئتها أم لا؛ تُعيَّن الفئة فقط لما بقي unknown. تُستدعى عند بدء
+    العمال، وتتجاهل القضايا الأحدث من PIPELINE_RECOVERY_GRACE_SECONDS (مهمتها
+    قيد الإضافة) والقضايا التي سبقت لها مهمة بأي حالة.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.PIPELINE_RECOVERY_GRACE_SECONDS)
+    added = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            rows = db.query(models.Case.id, models.Case.case_id, models.Case.category).filter(
+                models.Case.rule_version.is_(None),
+                models.Case.created_at < cutoff,
+                models.Case.id > last_id
+            ).order_by(models.Case.id).limit(batch_size).all()
+            if not rows:
+                return added
+            last_id = rows[-1].id
+            added += queue.enqueue_missing(
+                CLASSIFY_CASE,
+                [{"case_id": row.case_id, "set_category": row.category == "unknown"} for row in rows],
+                key="case_id",
+                max_attempts=settings.PIPELINE_MAX_ATTEMPTS
+            )
+    finally:
+        db.close()
+
+def seal_evidence(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """إعادة حساب بصمة الملف المخزن وتسجيل نتيجة التحقق"""
+    is_valid = get_evidence_engine().verify_integrity(payload["evidence_id"])
+    
+    db = SessionLocal()
+    try:
+        evidence = db.query(models.Evidence).filter(
+            models.Evidence.evidence_id == payload["evidence_id"]
+        ).first()
+        if evidence is None:
+            raise PermanentJobError("الدليل غير موجود")
+        evidence.integrity_verified = is_valid
+        evidence.last_verified_at = datetime.now(timezone.utc)
+        db.commit()
+    finally:
+        db.close()
+    
+    custody.get_custody_log().append(
+        custody.VERIFY, evidence_id=payload["evidence_id"], case_id=payload["case_id"],
+        details={"valid": is_valid, "stage": SEAL_EVIDENCE}
+    ).result()
+    
+    return {"evidence_id": payload["evidence_id"], "integrity_verified": is_valid}
+
+def thumbnail_evidence(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """صورة مصغرة لأدلة الصور (تُتجاهل بقية الأنواع)"""
+    entry = get_evidence_engine().index.get(payload["evidence_id"])
+    if entry is None:
+        raise PermanentJobError("الدليل غير موجود في المخزن")
+    
+    destination = settings.EVIDENCE_STORAGE_PATH / "thumbnails" / f"{payload['evidence_id']}.jpg"
+    created = create_thumbnail(Path(entry["file_path"]), destination)
+    return {"evidence_id": payload["evidence_id"], "thumbnail": str(destination) if created else None}
+
+def similarity_evidence(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """حساب بصمة التشابه وتسجيلها"""
+    engine = get_evidence_engine()
+    entry = engine.index.get(payload["evidence_id"])
+    if entry is None:
+        raise PermanentJobError("الدليل غير موجود في المخزن")
+    
+    record = engine.index_similarity({
+        "evidence_id": payload["evidence_id"],
+        "case_id": payload["case_id"],
+        "file_path": entry["file_path"]
+    })
+    return {
+        "evidence_id": payload["evidence_id"],
+        "kind": record["kind"] if record else None
+    }
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    CLASSIFY_CASE: classify_case,
+    SEAL_EVIDENCE: seal_evidence,
+    THUMBNAIL_EVIDENCE: thumbnail_evidence,
+    SIMILARITY_EVIDENCE: similarity_evidence,
+}
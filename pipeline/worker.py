@@ -0,0 +1,133 @@
+"""عمال تنفيذ مهام الطابور
+
+عمليات مستقلة (للنشر مع عدة عمليات أو خوادم على نفس القرص):
+    python -m app.pipeline.worker [--processes 2]
+
+أو خيوط داخل عملية التطبيق عبر start_embedded_workers (PIPELINE_EMBEDDED_WORKERS).
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import traceback
+import uuid
+from typing import Callable, Dict, Any, List, Optional
+
+from app.core.config import settings
+from app.pipeline.queue import JobQueue, PermanentJobError
+
+logger = logging.getLogger("app.pipeline")
+
+class Worker:
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]],
+                 poll_interval: float = 1.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.poll_interval = poll_interval
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    
+    def run_once(self) -> bool:
+        """تنفيذ مهمة واحدة إن وُجدت وإرجاع True عند التنفيذ"""
+        job = self.queue.claim(self.worker_id, kinds=list(self.handlers))
+        if job is None:
+            return False
+        
+        # تجديد العقد في الخلفية ما دام المعالج يعمل (مثل ختم ملف بعدة جيجابايت)
+        finished = threading.Event()
+        threading.Thread(target=self._keep_lease, args=(job["job_id"], finished), daemon=True).start()
+        try:
+            result = self.handlers[job["kind"]](job["payload"])
+        except PermanentJobError as e:
+            owned = self.queue.fail(job["job_id"], self.worker_id, str(e), retry=False)
+        except Exception as e:
+            owned = self.queue.fail(
+                job["job_id"], self.worker_id, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}"
+            )
+        else:
+            owned = self.queue.complete(job["job_id"], self.worker_id, result)
+        finally:
+            finished.set()
+        
+        if not owned:
+            logger.warning("انتهى عقد المهمة %s قبل إنهائها ولم تعد لهذا العامل، فتُجوهلت نتيجته", job["job_id"])
+        return True
+    
+    def _keep_lease(self, job_id: str, finished: threading.Event):
+        interval = self.queue.lease_seconds / 3
+        while not finished.wait(interval):
+            if not self.queue.renew(job_id, self.worker_id):
+                return
+    
+    def run(self, stop: threading.Event):
+        while not stop.is_set():
+            if self.run_once():
+                continue
+            # انتظار مهمة جديدة من نفس العملية أو انتهاء مهلة الاستطلاع
+            self.queue.wakeup.wait(self.poll_interval)
+            self.queue.wakeup.clear()
+
+def build_queue() -> JobQueue:
+    return JobQueue(
+        settings.PIPELINE_QUEUE_PATH,
+        lease_seconds=settings.PIPELINE_LEASE_SECONDS,
+        retry_delay=settings.PIPELINE_RETRY_DELAY
+    )
+
+def start_embedded_workers(queue: JobQueue, count: int) -> Optional[threading.Event]:
+    """تشغيل عمال كخيوط في الخلفية وإرجاع حدث الإيقاف"""
+    if count <= 0:
+        return None
+    from app.pipeline.stages import HANDLERS
+    
+    stop = threading.Event()
+    threading.Thread(target=_recover, args=(queue,), daemon=True).start()
+    for _ in range(count):
+        worker = Worker(queue, HANDLERS, poll_interval=settings.PIPELINE_POLL_INTERVAL)
+        threading.Thread(target=worker.run, args=(stop,), daemon=True).start()
+    return stop
+
+def _recover(queue: JobQueue):
+    """مهام القضايا التي توقفت العملية قبل تسجيل مهمتها"""
+    from app.pipeline.stages import recover_unclassified_cases
+    
+    try:
+        added = recover_unclassified_cases(queue)
+    except Exception:
+        logger.exception("تعذر فحص القضايا غير المصنفة")
+        return
+    if added:
+        logger.warning("أُضيفت %d مهمة تصنيف لقضايا لم تُسجل مهامها", added)
+
+def _run_process(kinds: Optional[List[str]]):
+    from app.pipeline.stages import CLASSIFY_CASE, HANDLERS
+    
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    
+    handlers = {kind: handler for kind, handler in HANDLERS.items() if not kinds or kind in kinds}
+    queue = build_queue()
+    if CLASSIFY_CASE in handlers:
+        _recover(queue)
+    Worker(queue, handlers, poll_interval=settings.PIPELINE_POLL_INTERVAL).run(stop)
+
+def main():
+    parser = argparse.ArgumentParser(description="عمال طابور المعالجة")
+    parser.add_argument("--processes", type=int, default=1, help="عدد العمليات العاملة")
+    parser.add_argument("--kind", action="append", help="أنواع المهام المسموحة (الافتراضي: الكل)")
+    args = parser.parse_args()
+    
+    processes = [
+        multiprocessing.Process(target=_run_process, args=(args.kind,))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    print(f"✅ تم تشغيل {len(processes)} عامل")
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
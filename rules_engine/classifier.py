@@ -1,23 +1,119 @@
 import re
-from typing import Dict, List, Tuple
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
+from app.core import metrics
+from app.rules_engine.matcher import CompiledRuleSet
+
 @dataclass
 class ClassificationResult:
     category: str
     confidence: float
     flags: List[str]
 
+# حجم الدفعة المرسلة لكل عملية في مجمع العمليات
+DEFAULT_CHUNK_SIZE = 256
+
+# المصنف الخاص بكل عملية عاملة، يُبنى مرة واحدة عند بدء العملية
+_worker_classifier = None
+
+def _init_worker(rules: Dict):
+    global _worker_classifier
+    _worker_classifier = RuleBasedClassifier(rules)
+
+def _classify_chunk(texts: List[str]) -> List[List["ClassificationResult"]]:
+    return [_worker_classifier.classify_text(text) for text in texts]
+
+def _chunked(texts: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(texts)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 class RuleBasedClassifier:
-    def __init__(self, rules: Dict):
+    def __init__(self, rules: Dict, max_workers: Optional[int] = None, version: Optional[str] = None):
         self.rules = rules
+        # نسخة مجموعة القواعد (تُسجل مع كل قضية مصنفة)
+        self.version = version
+        # ترجمة القواعد مرة واحدة عند الإنشاء
+        self.compiled = CompiledRuleSet(rules)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """إنشاء مجمع العمليات عند أول استخدام"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.rules,)
+            )
+        return self._pool
+    
+    def close(self, wait: bool = True):
+        """إيقاف مجمع العمليات إن وُجد (الدفعات المرسلة مسبقًا تكتمل)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+    
+    def submit_batch(self, texts: List[str]) -> Future:
+        """إرسال دفعة إلى مجمع العمليات دون انتظار (للاستخدام من الكود غير المتزامن)"""
+        return self._submit(list(texts))
+    
+    def _submit(self, chunk: List[str]) -> Future:
+        # زمن الدفعة يُقاس في العملية الأم (مقاييس العمليات العاملة لا تُعرض)
+        started = time.perf_counter()
+        future = self._get_pool().submit(_classify_chunk, chunk)
+        
+        def record(_):
+            metrics.CLASSIFIER_TEXTS.inc(len(chunk), mode="batch")
+            metrics.CLASSIFIER_DURATION.observe(time.perf_counter() - started, mode="batch")
+        
+        future.add_done_callback(record)
+        return future
+    
+    def classify_batch(self, texts: Iterable[str], 
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[List[ClassificationResult]]:
+        """تصنيف مجموعة نصوص مع الحفاظ على ترتيبها"""
+        return list(self.classify_stream(texts, chunk_size))
+    
+    def classify_stream(self, texts: Iterable[str], 
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[ClassificationResult]]:
+        """تصنيف تدفق من النصوص وتوزيع الدفعات الكبيرة على مجمع عمليات"""
+        chunks = _chunked(texts, chunk_size)
+        first = next(chunks, [])
+        second = next(chunks, None)
+        
+        # دفعة واحدة صغيرة: لا داعي لكلفة نقل البيانات بين العمليات
+        if second is None or self.max_workers == 1:
+            for chunk in itertools.chain([first], [second] if second else [], chunks):
+                for text in chunk:
+                    yield self.classify_text(text)
+            return
         
+        # إبقاء عدد محدود من الدفعات قيد التنفيذ حتى تبقى الذاكرة ثابتة
+        pending = deque()
+        for chunk in itertools.chain([first, second], chunks):
+            pending.append(self._submit(chunk))
+            if len(pending) >= self.max_workers * 2:
+                yield from pending.popleft().result()
+        
+        while pending:
+            yield from pending.popleft().result()
+    
     def classify_text(self, text: str) -> List[ClassificationResult]:
         """تصنيف النص بناءً على القواعد"""
+        started = time.perf_counter()
         results = []
         
-        for category, patterns in self.rules.items():
-            confidence, flags = self._evaluate_patterns(text, patterns)
+        for category, confidence, flags in self.compiled.evaluate(text):
             if confidence > 0:
                 results.append(
                     ClassificationResult(
@@ -29,10 +125,12 @@ class RuleBasedClassifier:
         
         # ترتيب النتائج حسب درجة الثقة
         results.sort(key=lambda x: x.confidence, reverse=True)
+        metrics.CLASSIFIER_TEXTS.inc(mode="single")
+        metrics.CLASSIFIER_DURATION.observe(time.perf_counter() - started, mode="single")
         return results
     
     def _evaluate_patterns(self, text: str, patterns: Dict) -> Tuple[float, List[str]]:
-        """تقييم النص مقابل الأنماط"""
+        """تقييم النص مقابل الأنماط (المسار المرجعي غير المترجم)"""
         confidence = 0.0
         flags = []
         
@@ -0,0 +1,132 @@
+"""استخراج الكيانات من نصوص القضايا وروابط الأدلة بصيغة موحدة
+
+الكيانات: أرقام الهواتف، والبريد، والحسابات (@handle)، والروابط ونطاقاتها،
+وعناوين IPv4، وعناوين المحافظ (Bitcoin و Ethereum و Tron). توحيد القيمة يجعل الكتابات
+المختلفة لنفس الكيان (+966 50-123-4567 و 00966501234567، أو https://www.X.com/a/
+و x.com/a) تُفهرس بقيمة واحدة، فتُربط القضايا التي تذكره.
+"""
+import re
+from typing import List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+PHONE = "phone"
+EMAIL = "email"
+HANDLE = "handle"
+URL = "url"
+DOMAIN = "domain"
+WALLET = "wallet"
+IP = "ip"
+
+# أطول قيمة تُفهرس (الروابط الأطول تُفهرس بنطاقها فقط)
+MAX_VALUE_LENGTH = 512
+
+# الأرقام العربية والفارسية إلى أرقام لاتينية
+_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+
+_URL = re.compile(r"\b(?:https?://|www\.)[^\s<>\"'()\[\]{}]+", re.IGNORECASE)
+_EMAIL = re.compile(r"\b[\w.+-]+@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,})\b")
+_HANDLE = re.compile(r"(?<![\w@/.])@([A-Za-z0-9_](?:[A-Za-z0-9_.]{0,28}[A-Za-z0-9_])?)")
+_IPV4 = re.compile(r"(?<![\d.])(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)(?![\d.])")
+# التواريخ والأوقات تُحذف قبل البحث عن الهواتف حتى لا تُقرأ أرقامها كرقم
+_DATE_TIME = re.compile(r"\b\d{4}[-/.]\d{1,2}[-/.]\d{1,2}\b|\b\d{1,2}[-/.]\d{1,2}[-/.]\d{4}\b|\b\d{1,2}:\d{2}(?::\d{2})?\b")
+_PHONE = re.compile(r"(?<![\w+])(?:\+|00)?\d[\d\s().-]{6,18}\d(?!\w)")
+_WALLETS = [
+    re.compile(r"\b0x[a-fA-F0-9]{40}\b"),                         # Ethereum
+    re.compile(r"\bbc1[ac-hj-np-z02-9]{25,62}\b", re.IGNORECASE),  # Bitcoin (bech32)
+    re.compile(r"\b[13][a-km-zA-HJ-NP-Z1-9]{25,34}\b"),           # Bitcoin (base58)
+    re.compile(r"\bT[a-km-zA-HJ-NP-Z1-9]{33}\b"),                 # Tron
+]
+
+# معاملات التتبع لا تغير المحتوى المشار إليه
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|igshid|si|ref_src)$")
+_TRAILING_PUNCTUATION = ".,;:!?،؛"
+
+def normalize_phone(raw: str) -> Optional[str]:
+    digits = re.sub(r"\D", "", raw)
+    international = raw.lstrip().startswith(("+", "00"))
+    if raw.lstrip().startswith("00"):
+        digits = digits[2:]
+    # أقصر رقم مع رمز المنطقة 9 خانات وأطول رقم دولي 15 (E.164)
+    if not 9 <= len(digits) <= 15:
+        return None
+    return ("+" if international else "") + digits
+
+def normalize_url(raw: str) -> Optional[Tuple[str, str]]:
+    """(الرابط الموحد، النطاق): دون المخطط و www والمنفذ الافتراضي ومعاملات التتبع"""
+    raw = raw.rstrip(_TRAILING_PUNCTUATION)
+    if not re.match(r"^https?://", raw, re.IGNORECASE):
+        raw = "http://" + raw
+    try:
+        parts = urlsplit(raw)
+        host = (parts.hostname or "").rstrip(".")
+        port = parts.port
+    except ValueError:
+        return None
+    if not host or "." not in host:
+        return None
+    host = host.removeprefix("www.")
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(key)
+    ])
+    url = host + parts.path.rstrip("/") + (f"?{query}" if query else "")
+    return url, host.split(":")[0]
+
+def extract_entities(text: str) -> List[Tuple[str, str]]:
+    """الكيانات الموحدة في النص كأزواج (النوع، القيمة) دون تكرار"""
+    if not text:
+        return []
+    text = text.translate(_DIGITS)
+    found: Set[Tuple[str, str]] = set()
+    
+    # الروابط والبريد أولًا ثم تُحذف من النص حتى لا تُقرأ أجزاؤها كهواتف أو حسابات
+    for match in _URL.finditer(text):
+        normalized = normalize_url(match.group())
+        if normalized is not None:
+            url, domain = normalized
+            if len(url) <= MAX_VALUE_LENGTH:
+                found.add((URL, url))
+            found.add((DOMAIN, domain))
+    text = _URL.sub(" ", text)
+    
+    for match in _EMAIL.finditer(text):
+        found.add((EMAIL, match.group().lower()))
+        found.add((DOMAIN, match.group(1).lower().removeprefix("www.")))
+    text = _EMAIL.sub(" ", text)
+    
+    for match in _HANDLE.finditer(text):
+        found.add((HANDLE, "@" + match.group(1).lower()))
+    
+    for pattern in _WALLETS:
+        for match in pattern.finditer(text):
+            address = match.group()
+            if not re.search("[A-Za-z]", address):
+                continue  # رقم طويل وليس عنوانًا
+            # عناوين Ethereum و bech32 لا تميز حالة الأحرف، بعكس base58
+            if address[:2].lower() in ("0x", "bc"):
+                address = address.lower()
+            found.add((WALLET, address))
+        text = pattern.sub(" ", text)
+    
+    for match in _IPV4.finditer(text):
+        found.add((IP, match.group()))
+    text = _DATE_TIME.sub(" ", _IPV4.sub(" ", text))
+    
+    for match in _PHONE.finditer(text):
+        phone = normalize_phone(match.group())
+        if phone is not None:
+            found.add((PHONE, phone))
+    
+    return sorted(found)
+
+def normalize_query(value: str) -> List[str]:
+    """القيم الموحدة المطابقة لقيمة يبحث عنها المستخدم (كما كُتبت في أي صيغة)"""
+    entities = extract_entities(value)
+    if not entities:
+        return [value.strip().lower()] if value.strip() else []
+    # رابط أو بريد كامل: تُطابق قيمته نفسها لا نطاقه فقط
+    specific = [v for kind, v in entities if kind != DOMAIN]
+    return specific or [v for _, v in entities]
@@ -0,0 +1,175 @@
+import re
+from typing import Dict, List, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+class AhoCorasick:
+    """آلة Aho-Corasick للبحث عن عدة كلمات مفتاحية في مرور واحد على النص"""
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = keywords
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        # بناء الشجرة
+        for index, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(index)
+
+        # بناء روابط الفشل بالعرض أولاً
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._out[next_state] = self._out[next_state] + self._out[fail]
+
+    def find_all(self, text: str) -> set:
+        """إرجاع أرقام الكلمات المفتاحية الموجودة في النص"""
+        found = {index for index in self._out[0]}  # الكلمات الفارغة
+        remaining = len(self.keywords) - len(found)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                if index not in found:
+                    found.add(index)
+                    remaining -= 1
+            if not remaining:
+                break
+
+        return found
+
+
+class CompiledRuleSet:
+    """مجموعة قواعد مترجمة مسبقًا تقيّم جميع الفئات في مرور واحد"""
+
+    def __init__(self, rules: Dict):
+        keyword_ids: Dict[str, int] = {}
+        pattern_ids: Dict[str, int] = {}
+        self.categories: List[Tuple[str, List[Tuple[str, int]], List[Tuple[str, int]]]] = []
+
+        for category, patterns in rules.items():
+            keywords = []
+            for keyword in patterns.get("keywords", []):
+                lowered = keyword.lower()
+                keywords.append((keyword, keyword_ids.setdefault(lowered, len(keyword_ids))))
+
+            regexes = []
+            for pattern in patterns.get("regex_patterns", []):
+                regexes.append((pattern, pattern_ids.setdefault(pattern, len(pattern_ids))))
+
+            self.categories.append((category, keywords, regexes))
+
+        self.keyword_matcher = AhoCorasick(list(keyword_ids))
+        self.pattern_count = len(pattern_ids)
+        self._gate, self._combined, self._combined_ids, self._standalone = self._compile_patterns(
+            list(pattern_ids)
+        )
+
+    @staticmethod
+    def _compile_patterns(patterns: List[str]):
+        """دمج الأنماط في تعبير واحد مع مجموعات مسماة
+
+        الأنماط التي يمكن أن تطابق نصًا فارغًا أو تحتوي على مجموعات خاصة بها
+        تُترجم منفردة حتى تبقى نتائج العدّ مطابقة لـ re.findall.
+        """
+        combinable = []
+        standalone = []
+
+        for pattern_id, pattern in enumerate(patterns):
+            compiled = re.compile(pattern, re.IGNORECASE)
+            min_width = sre_parse.parse(pattern).getwidth()[0]
+            if compiled.groups or min_width == 0:
+                standalone.append((pattern_id, compiled))
+            else:
+                combinable.append((pattern_id, pattern))
+
+        if not combinable:
+            return None, None, [], standalone
+
+        # البوابة تحدد أقرب موضع يطابق فيه أي نمط، ثم تُقرأ المجموعات المسماة عنده
+        gate = "|".join(f"(?:{pattern})" for _, pattern in combinable)
+        branches = "".join(
+            f"(?:(?=(?P<p{pattern_id}>{pattern}))|)" for pattern_id, pattern in combinable
+        )
+        try:
+            gate = re.compile(gate, re.IGNORECASE)
+            combined = re.compile(branches, re.IGNORECASE)
+        except re.error:
+            # أعلام عامة داخل الأنماط مثلاً - الرجوع إلى الترجمة المنفردة
+            standalone.extend(
+                (pattern_id, re.compile(pattern, re.IGNORECASE)) for pattern_id, pattern in combinable
+            )
+            return None, None, [], standalone
+
+        return gate, combined, [pattern_id for pattern_id, _ in combinable], standalone
+
+    def count_patterns(self, text: str) -> List[int]:
+        """عدد المطابقات غير المتداخلة لكل نمط كما يعيدها re.findall"""
+        counts = [0] * self.pattern_count
+
+        if self._combined is not None:
+            ids = self._combined_ids
+            next_allowed = [0] * len(ids)
+            hit = self._gate.search(text)
+            while hit:
+                position = hit.start()
+                match = self._combined.match(text, position)
+                for slot, value in enumerate(match.groups()):
+                    if value is not None and position >= next_allowed[slot]:
+                        counts[ids[slot]] += 1
+                        next_allowed[slot] = position + len(value)
+                hit = self._gate.search(text, position + 1)
+
+        for pattern_id, compiled in self._standalone:
+            counts[pattern_id] = len(compiled.findall(text))
+
+        return counts
+
+    def evaluate(self, text: str) -> List[Tuple[str, float, List[str]]]:
+        """تقييم النص مقابل جميع الفئات دفعة واحدة"""
+        found_keywords = self.keyword_matcher.find_all(text.lower())
+        pattern_counts = self.count_patterns(text)
+        evaluations = []
+
+        for category, keywords, regexes in self.categories:
+            confidence = 0.0
+            flags = []
+
+            for keyword, keyword_id in keywords:
+                if keyword_id in found_keywords:
+                    confidence += 0.2
+                    flags.append(f"الكلمة المفتاحية: {keyword}")
+
+            for pattern, pattern_id in regexes:
+                matches = pattern_counts[pattern_id]
+                if matches:
+                    confidence += 0.3 * matches
+                    flags.append(f"النمط: {pattern}")
+
+            evaluations.append((category, min(confidence, 1.0), flags))
+
+        return evaluations
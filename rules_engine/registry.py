@@ -0,0 +1,271 @@
+"""مجموعات قواعد التصنيف المرقمة بنسخ مع إعادة التحميل دون إعادة تشغيل
+
+كل نسخة ملف JSON ثابت باسم معرفها (بصمة المحتوى)، والملف ACTIVE يشير إلى
+النسخة الفعالة. تتحقق كل عملية من المؤشر كل بضع ثوانٍ، وعند تغيره تُترجم
+النسخة الجديدة مرة واحدة ثم تُستبدل بها المرجعية دفعة واحدة، وتستمر بقية
+الطلبات بالنسخة السابقة حتى يكتمل الاستبدال.
+
+نشر نسخة وتفعيلها أو الرجوع إلى نسخة سابقة:
+    python -m app.rules_engine.registry publish rules.json
+    python -m app.rules_engine.registry activate <version>
+    python -m app.rules_engine.registry list
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from app.rules_engine.classifier import RuleBasedClassifier, DEFAULT_RULES
+
+# عدد النسخ المترجمة المحفوظة في الذاكرة (للرجوع السريع)
+COMPILED_CACHE_SIZE = 4
+# مهلة قبل إيقاف مجمع عمليات النسخة المستبدلة حتى تكتمل دفعاتها
+RETIRE_DELAY = 60
+
+_VERSION = re.compile(r"^[0-9a-f]{12}$")
+
+logger = logging.getLogger("app.rules")
+
+def validate_rules(rules: Any) -> Dict[str, Dict[str, List[str]]]:
+    """التحقق من بنية القواعد وصحة التعبيرات النمطية"""
+    if not isinstance(rules, dict) or not rules:
+        raise ValueError("القواعد يجب أن تكون قاموسًا غير فارغ من الفئات")
+    for category, patterns in rules.items():
+        if not isinstance(patterns, dict):
+            raise ValueError(f"قواعد الفئة {category} غير صالحة")
+        for key in ("keywords", "regex_patterns"):
+            values = patterns.get(key, [])
+            if not isinstance(values, list) or not all(isinstance(v, str) and v for v in values):
+                raise ValueError(f"{key} في الفئة {category} يجب أن تكون قائمة نصوص")
+        for pattern in patterns.get("regex_patterns", []):
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"تعبير نمطي غير صالح في الفئة {category}: {pattern} ({e})")
+    return rules
+
+def rules_version(rules: Dict) -> str:
+    """معرف النسخة: بصمة المحتوى بصيغة ثابتة (نفس القواعد = نفس النسخة)"""
+    canonical = json.dumps(rules, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+class RuleRegistry:
+    def __init__(self, rules_path: Path, default_rules: Dict, check_interval: float = 2.0):
+        self.rules_path = rules_path
+        self.default_rules = default_rules
+        self.check_interval = check_interval
+        self._active_file = rules_path / "ACTIVE"
+        self._lock = threading.Lock()
+        self._compiled: "OrderedDict[str, RuleBasedClassifier]" = OrderedDict()
+        self._current: Optional[RuleBasedClassifier] = None
+        self._active_stat = None
+        self._next_check = 0.0
+        rules_path.mkdir(parents=True, exist_ok=True)
+    
+    def publish(self, rules: Dict, activate: bool = True) -> str:
+        """حفظ نسخة جديدة (إن لم تكن موجودة) وتفعيلها اختياريًا"""
+        rules = validate_rules(rules)
+        version = rules_version(rules)
+        version_file = self._version_file(version)
+        if not version_file.exists():
+            self._write_atomic(version_file, json.dumps({
+                "version": version,
+                "created_at": datetime.now().isoformat(),
+                "rules": rules
+            }, ensure_ascii=False, indent=2))
+        if activate:
+            self.activate(version)
+        return version
+    
+    def activate(self, version: str):
+        """تفعيل نسخة موجودة لكل العمليات (تُطبق خلال check_interval)"""
+        if not self._version_file(version).exists():
+            raise KeyError(version)
+        self._write_atomic(self._active_file, version + "\n")
+        # العملية الحالية تطبق التغيير في الطلب التالي مباشرة
+        self._next_check = 0.0
+    
+    def active_version(self) -> Optional[str]:
+        try:
+            return self._active_file.read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def list_versions(self) -> List[Dict[str, Any]]:
+        active = self.active_version()
+        versions = []
+        for version_file in self.rules_path.glob("*.json"):
+            with open(version_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            versions.append({
+                "version": data["version"],
+                "created_at": data["created_at"],
+                "categories": sorted(data["rules"]),
+                "active": data["version"] == active
+            })
+        versions.sort(key=lambda v: v["created_at"], reverse=True)
+        return versions
+    
+    def load(self, version: str) -> Dict:
+        with open(self._version_file(version), 'r', encoding='utf-8') as f:
+            return json.load(f)["rules"]
+    
+    def current(self) -> RuleBasedClassifier:
+        """المصنف المترجم للنسخة الفعالة
+        
+        في المسار المعتاد لا يتجاوز الأمر مقارنة وقت؛ فحص الملف يتم كل
+        check_interval، والترجمة مرة واحدة لكل نسخة.
+        """
+        now = time.monotonic()
+        if self._current is not None and now < self._next_check:
+            return self._current
+        
+        # أثناء ترجمة نسخة جديدة تستمر بقية الطلبات بالنسخة الحالية
+        if not self._lock.acquire(blocking=self._current is None):
+            return self._current
+        try:
+            if self._current is None or time.monotonic() >= self._next_check:
+                try:
+                    self._refresh()
+                except (OSError, ValueError, KeyError):
+                    # نسخة ناقصة أو تالفة: الاستمرار بالنسخة الحالية
+                    if self._current is None:
+                        raise
+                self._next_check = time.monotonic() + self.check_interval
+        finally:
+            self._lock.release()
+        return self._current
+    
+    async def current_async(self) -> RuleBasedClassifier:
+        """current() لنقاط النهاية غير المتزامنة: فحص الملف والترجمة في خيط منفصل
+        
+        في المسار المعتاد (النسخة مترجمة ولم يحن الفحص) لا يغادر حلقة الأحداث.
+        """
+        if self._current is not None and time.monotonic() < self._next_check:
+            return self._current
+        return await asyncio.to_thread(self.current)
+    
+    def warm_up(self) -> threading.Thread:
+        """ترجمة النسخة الفعالة في الخلفية عند بدء العملية حتى لا ينتظرها أول طلب"""
+        thread = threading.Thread(target=self._warm_up, daemon=True)
+        thread.start()
+        return thread
+    
+    def _warm_up(self):
+        try:
+            self.current()
+        except (OSError, ValueError, KeyError):
+            # يُعاد المحاولة عند أول طلب ويظهر الخطأ فيه
+            logger.exception("تعذر تحميل قواعد التصنيف عند البدء")
+    
+    def _refresh(self):
+        try:
+            stat = self._active_file.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            # أول تشغيل: نشر القواعد الافتراضية كنسخة أولى
+            self.publish(self.default_rules)
+            stat = self._active_file.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        
+        if self._current is not None and signature == self._active_stat:
+            return
+        
+        version = self.active_version()
+        if self._current is not None and version == self._current.version:
+            self._active_stat = signature
+            return
+        
+        classifier = self._compiled.get(version)
+        if classifier is None:
+            classifier = RuleBasedClassifier(self.load(version), version=version)
+            self._compiled[version] = classifier
+            while len(self._compiled) > COMPILED_CACHE_SIZE:
+                _, evicted = self._compiled.popitem(last=False)
+                self._retire(evicted)
+        self._compiled.move_to_end(version)
+        
+        previous, self._current = self._current, classifier
+        self._active_stat = signature
+        if previous is not None:
+            self._retire(previous)
+    
+    def _retire(self, classifier: RuleBasedClassifier):
+        # مجمع العمليات يُغلق بعد مهلة حتى تكتمل الدفعات المرسلة إليه
+        timer = threading.Timer(RETIRE_DELAY, classifier.close, kwargs={"wait": False})
+        timer.daemon = True
+        timer.start()
+    
+    def close(self):
+        with self._lock:
+            for classifier in self._compiled.values():
+                classifier.close()
+    
+    def _version_file(self, version: str) -> Path:
+        # المعرف يُستخدم كاسم ملف، لذا يُقبل الشكل الست عشري فقط
+        if not _VERSION.match(version or ""):
+            raise KeyError(version)
+        return self.rules_path / f"{version}.json"
+    
+    @staticmethod
+    def _write_atomic(path: Path, content: str):
+        temp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+_registry: Optional[RuleRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> RuleRegistry:
+    """سجل القواعد المشترك داخل العملية"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from app.core.config import settings
+                _registry = RuleRegistry(
+                    settings.RULES_PATH,
+                    DEFAULT_RULES,
+                    check_interval=settings.RULES_CHECK_INTERVAL
+                )
+    return _registry
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="إدارة نسخ قواعد التصنيف")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    publish = subparsers.add_parser("publish", help="نشر ملف قواعد JSON")
+    publish.add_argument("file", type=Path)
+    publish.add_argument("--no-activate", action="store_true")
+    activate = subparsers.add_parser("activate", help="تفعيل نسخة موجودة")
+    activate.add_argument("version")
+    subparsers.add_parser("list", help="عرض النسخ")
+    args = parser.parse_args()
+    
+    registry = get_registry()
+    if args.command == "publish":
+        with open(args.file, 'r', encoding='utf-8') as f:
+            version = registry.publish(json.load(f), activate=not args.no_activate)
+        print(f"✅ النسخة {version}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"✅ تم تفعيل النسخة {args.version}")
+    else:
+        for version in registry.list_versions():
+            marker = "*" if version["active"] else " "
+            print(f"{marker} {version['version']}  {version['created_at']}  {', '.join(version['categories'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""إعداد الاختبارات: قاعدة SQLite مؤقتة مرحّلة إلى آخر نسخة
+
+التشغيل من المجلد الأب للمشروع (الحزمة تُستورد باسم app):
+    python -m pytest app/tests
+"""
+import os
+import tempfile
+
+import pytest
+
+# قبل أي استيراد من app (الإعدادات تُقرأ عند الاستيراد)
+_TMP = tempfile.mkdtemp(prefix="cybershield-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP}/test.db")
+os.environ.setdefault("DB_INIT_ON_STARTUP", "false")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    from app.database.init import migrate_schema
+    migrate_schema()
+
+@pytest.fixture
+def sync_db(migrated_db):
+    from app.database.session import SessionLocal
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from app.api import deps
+from app.core.config import settings
+from app.database import models
+
+@pytest.fixture
+def stamp_path(tmp_path, monkeypatch):
+    path = tmp_path / "auth" / "users.stamp"
+    monkeypatch.setattr(settings, "AUTH_CACHE_STAMP_PATH", path)
+    deps.user_cache.clear()
+    deps._check_stamp()
+    return path
+
+@pytest.fixture
+def user(sync_db):
+    user = models.User(username="cached", email="cached@example.com", hashed_password="-",
+                       role=models.UserRole.ANALYST)
+    sync_db.add(user)
+    sync_db.commit()
+    yield user
+    sync_db.delete(user)
+    sync_db.commit()
+
+def test_role_change_is_invalidated_after_commit(sync_db, stamp_path, user):
+    deps.user_cache.set("cached", deps.AuthenticatedUser.from_model(user))
+
+    user.role = models.UserRole.VIEWER
+    sync_db.flush()
+    # قبل الحفظ تبقى القيمة: الإبطال الآن يسمح بإعادة حفظ الدور القديم
+    assert deps.user_cache.get("cached") is not None
+
+    sync_db.commit()
+    assert deps.user_cache.get("cached") is None
+    assert stamp_path.exists()
+
+def test_rolled_back_change_does_not_invalidate(sync_db, stamp_path, user):
+    deps.user_cache.set("cached", deps.AuthenticatedUser.from_model(user))
+
+    user.is_active = False
+    sync_db.flush()
+    sync_db.rollback()
+
+    assert deps.user_cache.get("cached") is not None
+    assert not stamp_path.exists()
+
+def test_change_from_another_process_clears_the_cache(stamp_path, user):
+    deps.user_cache.set("cached", deps.AuthenticatedUser.from_model(user))
+    deps._check_stamp()
+    assert deps.user_cache.get("cached") is not None
+
+    # ما تفعله invalidate_user في عملية أخرى
+    stamp_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = stamp_path.with_suffix(".other.tmp")
+    temp_path.write_bytes(b"")
+    os.replace(temp_path, stamp_path)
+
+    deps._check_stamp()
+    assert deps.user_cache.get("cached") is None
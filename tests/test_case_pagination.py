@@ -0,0 +1,69 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.api.endpoints.cases import get_cases
+from app.database import models
+from app.database.session import AsyncSessionLocal
+
+class _User:
+    role = models.UserRole.REPORTER
+    
+    def __init__(self, pk: int):
+        self.id = pk
+
+def _reporter(db) -> _User:
+    user = models.User(
+        username=f"u-{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@test",
+        hashed_password="x", role=models.UserRole.REPORTER
+    )
+    db.add(user)
+    db.commit()
+    return _User(user.id)
+
+def _all_pages(user: _User, limit: int) -> list:
+    async def pages():
+        seen, cursor = [], None
+        while True:
+            async with AsyncSessionLocal() as db:
+                page = await get_cases(
+                    status=None, priority=None, category=None, limit=limit,
+                    cursor=cursor, fields="case_id", current_user=user, db=db
+                )
+            seen += [case["case_id"] for case in page["cases"]]
+            cursor = page["next_cursor"]
+            # حماية من الحلقة اللانهائية إن تكررت صفحة
+            assert len(seen) <= 100
+            if cursor is None:
+                return seen
+    return asyncio.run(pages())
+
+def test_pages_rows_sharing_server_timestamp(sync_db):
+    """func.now() في SQLite يخزن الثواني فقط، فكل القضايا هنا في نفس الثانية غالبًا"""
+    user = _reporter(sync_db)
+    ids = [f"P-{uuid.uuid4().hex[:8]}" for _ in range(5)]
+    for case_id in ids:
+        sync_db.add(models.Case(case_id=case_id, title="t", description="d", reporter_id=user.id))
+    sync_db.commit()
+    
+    assert _all_pages(user, limit=1) == list(reversed(ids))
+    assert _all_pages(user, limit=2) == list(reversed(ids))
+
+def test_pages_mixed_stored_formats(sync_db):
+    """قضايا مستوردة (تاريخ بأجزاء الثانية) مع قضايا بتاريخ func.now() وبنفس الثانية"""
+    user = _reporter(sync_db)
+    shared = datetime(2020, 5, 1, 12, 0, 0)
+    rows = [
+        {"case_id": f"M-{uuid.uuid4().hex[:8]}", "title": "t", "reporter_id": user.id,
+         "status": models.CaseStatus.NEW, "created_at": created_at}
+        for created_at in [shared, shared, shared.replace(microsecond=500), datetime(2020, 5, 1, 11)]
+    ]
+    sync_db.execute(insert(models.Case.__table__), rows)
+    sync_db.commit()
+    
+    seen = _all_pages(user, limit=1)
+    assert sorted(seen) == sorted(row["case_id"] for row in rows)
+    assert len(seen) == len(set(seen))
+    assert seen[-1] == rows[-1]["case_id"]
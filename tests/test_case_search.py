@@ -0,0 +1,62 @@
+import asyncio
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.endpoints.cases import search_cases
+from app.database import models
+from app.database.session import AsyncSessionLocal
+
+class _User:
+    role = models.UserRole.ADMIN
+    id = 0
+
+class _OtherDialect:
+    """جلسة حقيقية تُعرَّف كقاعدة غير SQLite لاختبار مسار البحث الجزئي"""
+
+    def __init__(self, db):
+        self._db = db
+        self.bind = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    async def execute(self, *args, **kwargs):
+        return await self._db.execute(*args, **kwargs)
+
+@pytest.fixture
+def cases(sync_db):
+    marker = uuid.uuid4().hex[:8]
+    created = [
+        models.Case(case_id=f"CASE-{marker}1", title=f"خصم 100% {marker}", description="-"),
+        models.Case(case_id=f"CASE-{marker}2", title=f"خصم 1000 {marker}", description="-"),
+        models.Case(case_id=f"CASE-{marker}3", title=f"ملف a_b {marker}", description="-"),
+        models.Case(case_id=f"CASE-{marker}4", title=f"ملف axb {marker}", description="-"),
+    ]
+    sync_db.add_all(created)
+    sync_db.commit()
+    yield marker
+    for case in created:
+        sync_db.delete(case)
+    sync_db.commit()
+
+def _search(q: str, other_dialect: bool = False) -> list:
+    async def run():
+        async with AsyncSessionLocal() as db:
+            result = await search_cases(
+                q=q, limit=20, prefix=True, current_user=_User(),
+                db=_OtherDialect(db) if other_dialect else db
+            )
+        return result["results"]
+    return asyncio.run(run())
+
+def test_fts_results_use_model_types(cases):
+    results = _search(cases)
+
+    assert len(results) == 4
+    for row in results:
+        assert row["status"] is models.CaseStatus.NEW
+        assert isinstance(row["created_at"], datetime)
+
+def test_like_fallback_treats_wildcards_literally(cases):
+    assert [r["case_id"] for r in _search(f"100% {cases}", other_dialect=True)] == [f"CASE-{cases}1"]
+    assert [r["case_id"] for r in _search("a_b", other_dialect=True)] == [f"CASE-{cases}3"]
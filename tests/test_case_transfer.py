@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from app.database.transfer import parse_record
+
+def test_aware_timestamps_are_stored_as_utc():
+    row = parse_record({
+        "title": "t",
+        "created_at": "2026-01-01T10:00:00+03:00",
+        "closed_at": "2026-01-02T00:30:00-02:00"
+    }, reporter_id=1)
+    
+    assert row["created_at"] == datetime(2026, 1, 1, 7, 0)
+    assert row["closed_at"] == datetime(2026, 1, 2, 2, 30)
+
+def test_naive_timestamps_are_kept():
+    row = parse_record({"title": "t", "created_at": "2026-01-01 10:00:00"}, reporter_id=1)
+    assert row["created_at"] == datetime(2026, 1, 1, 10, 0)
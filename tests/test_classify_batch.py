@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+from app.api.endpoints import cases
+
+class _Request:
+    def __init__(self, chunks: list):
+        self._chunks = chunks
+
+    async def stream(self):
+        for chunk in self._chunks:
+            yield chunk
+
+def _read(chunks: list) -> list:
+    async def run():
+        rows = []
+        async for chunk in cases._read_ndjson_chunks(_Request(chunks)):
+            rows += chunk
+        return rows
+    return asyncio.run(run())
+
+def test_lines_split_across_chunks():
+    body = b'{"id": 1, "text": "first"}\n\n"second"\n{"id": 3, "text": "third"}'
+    rows = _read([body[i:i + 7] for i in range(0, len(body), 7)])
+
+    assert [(line, item_id, text, error) for line, item_id, text, error in rows] == [
+        (1, 1, "first", None), (3, None, "second", None), (4, 3, "third", None)
+    ]
+
+def test_overlong_line_is_reported_and_skipped(monkeypatch):
+    monkeypatch.setattr(cases, "MAX_NDJSON_LINE", 100)
+    long_line = json.dumps({"text": "x" * 1000}).encode()
+    chunks = [b'"before"\n'] + [long_line[i:i + 30] for i in range(0, len(long_line), 30)] + [b'\n"after"\n']
+    rows = _read(chunks)
+
+    assert [(line, text) for line, _, text, _ in rows] == [(1, "before"), (2, None), (3, "after")]
+    assert rows[1][3] is not None
+
+def test_overlong_last_line_without_newline(monkeypatch):
+    monkeypatch.setattr(cases, "MAX_NDJSON_LINE", 10)
+    rows = _read([b'"ok"\n', b"y" * 50])
+
+    assert [(line, error is None) for line, _, _, error in rows] == [(1, True), (2, False)]
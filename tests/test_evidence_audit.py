@@ -0,0 +1,80 @@
+import hashlib
+import threading
+import time
+import uuid
+
+import pytest
+
+from app.database import models
+from app.database.session import SessionLocal
+from app.evidence import audit, custody
+
+class _CustodyLog:
+    def append(self, *args, **kwargs):
+        pass
+
+@pytest.fixture
+def case_with_evidence(sync_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(custody, "get_custody_log", lambda: _CustodyLog())
+    user = models.User(username=f"u-{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@test", hashed_password="x")
+    sync_db.add(user)
+    sync_db.commit()
+    case = models.Case(case_id=f"A-{uuid.uuid4().hex[:8]}", title="t", reporter_id=user.id)
+    sync_db.add(case)
+    sync_db.commit()
+    for i in range(6):
+        path = tmp_path / f"{i}.dat"
+        path.write_bytes(b"x" * i)
+        sync_db.add(models.Evidence(
+            evidence_id=f"E-{uuid.uuid4().hex[:8]}", case_id=case.id, type="document",
+            file_path=str(path), file_hash=hashlib.sha256(b"x" * i).hexdigest()
+        ))
+    sync_db.commit()
+    return case.id
+
+def _auditor(state_path, checked: list, release: threading.Event) -> audit.IntegrityAuditor:
+    auditor = audit.IntegrityAuditor(SessionLocal, state_path, workers=1, batch_size=1)
+    check = auditor._check
+    
+    def slow_check(row):
+        release.wait(5)
+        checked.append(row.evidence_id)
+        return check(row)
+    auditor._check = slow_check
+    return auditor
+
+def _wait(auditor, job_id: str) -> dict:
+    for _ in range(200):
+        job = auditor.get_job(job_id)
+        if job["status"] not in ("pending", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("لم تنته المهمة")
+
+def test_job_runs_in_one_process_only(tmp_path, case_with_evidence):
+    release = threading.Event()
+    first, second = [], []
+    owner = _auditor(tmp_path / "audit", first, release)
+    other = _auditor(tmp_path / "audit", second, release)
+    
+    job = owner.start_job(case_id=case_with_evidence)
+    time.sleep(0.1)
+    # عامل آخر يبدأ أثناء تنفيذ المهمة
+    other.resume_pending()
+    release.set()
+    
+    finished = _wait(owner, job["job_id"])
+    other._threads[job["job_id"]].join(5)
+    assert finished["status"] == "completed"
+    assert finished["processed"] == finished["verified"] == 6
+    assert second == [] and len(first) == 6
+
+def test_cancel_from_another_process(tmp_path, case_with_evidence):
+    release = threading.Event()
+    owner = _auditor(tmp_path / "audit", [], release)
+    other = _auditor(tmp_path / "audit", [], release)
+    
+    job = owner.start_job(case_id=case_with_evidence)
+    assert other.cancel_job(job["job_id"])
+    release.set()
+    assert _wait(owner, job["job_id"])["status"] == "cancelled"
@@ -0,0 +1,30 @@
+import hashlib
+
+from app.evidence.bundle import BundleSigner, stream_bundle, verify_bundle
+
+def _bundle(tmp_path, signer: BundleSigner, name: str = "case.zip"):
+    content = b"evidence content"
+    source = tmp_path / "evidence.dat"
+    source.write_bytes(content)
+    items = [{
+        "evidence_id": "EVID-1", "type": "document", "hash": hashlib.sha256(content).hexdigest(),
+        "file_path": str(source), "file_size": len(content)
+    }]
+    archive = tmp_path / name
+    archive.write_bytes(b"".join(stream_bundle("zip", {"case_id": "CASE-1"}, items, signer, "tester")))
+    return archive
+
+def test_verify_with_trusted_key_or_key_id(tmp_path):
+    signer = BundleSigner(tmp_path / "key.pem")
+    archive = _bundle(tmp_path, signer)
+    
+    assert verify_bundle(archive, signer.public_key_pem())["valid"]
+    assert verify_bundle(archive, trusted_key_id=signer.key_id())["valid"]
+
+def test_embedded_key_alone_is_not_trusted(tmp_path):
+    trusted = BundleSigner(tmp_path / "trusted.pem")
+    forged = _bundle(tmp_path, BundleSigner(tmp_path / "attacker.pem"), "forged.zip")
+    
+    assert not verify_bundle(forged)["valid"]
+    assert not verify_bundle(forged, trusted.public_key_pem())["valid"]
+    assert not verify_bundle(forged, trusted_key_id=trusted.key_id())["valid"]
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+
+from app.api.deps import get_current_user
+from app.api.endpoints import evidence
+from app.database import models
+
+BOUNDARY = "test-boundary"
+
+class _User:
+    id = -1
+    role = models.UserRole.REPORTER
+
+@pytest.fixture
+def app(migrated_db):
+    app = FastAPI()
+    app.include_router(evidence.router)
+    app.dependency_overrides[get_current_user] = lambda: _User()
+    return app
+
+def _field(name: str, value: str) -> bytes:
+    return f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode()
+
+def _post(app, chunks: list):
+    """استدعاء مباشر (TestClient يقرأ الجسم كاملاً قبل تمريره) وإرجاع الحالة وعدد الأجزاء المقروءة"""
+    consumed, sent = [], []
+
+    async def receive():
+        chunk = chunks[len(consumed)]
+        consumed.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": len(consumed) < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/upload", "raw_path": b"/upload",
+        "query_string": b"", "root_path": "", "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())
+        ]
+    }
+    asyncio.run(app(scope, receive, send))
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return status, json.loads(body), len(consumed)
+
+def _file_chunks(count: int) -> list:
+    header = f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.bin\"\r\n\r\n"
+    return [header.encode()] + [b"x" * 1024] * count + [f"\r\n--{BOUNDARY}--\r\n".encode()]
+
+def test_unknown_case_is_rejected_before_the_file_is_read(app):
+    chunks = [_field("case_id", "CASE-MISSING") + _field("evidence_type", "document")] + _file_chunks(100)
+    status, body, consumed = _post(app, chunks)
+
+    assert status == 404
+    assert consumed <= 2
+
+def test_case_id_must_precede_the_file(app):
+    chunks = [_field("evidence_type", "document")] + _file_chunks(100) + [_field("case_id", "CASE-1")]
+    status, body, consumed = _post(app, chunks)
+
+    assert status == 422
+    assert consumed <= 2
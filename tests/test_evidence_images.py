@@ -0,0 +1,47 @@
+import io
+
+import pytest
+
+from app.core import metrics
+from app.evidence import compression
+from app.evidence.engine import EvidenceEngine
+from app.evidence.similarity import image_hash
+from app.evidence.thumbnails import create_thumbnail
+
+Image = pytest.importorskip("PIL.Image")
+
+def _image_bytes(fmt: str) -> bytes:
+    img = Image.new("RGB", (300, 300))
+    img.putdata([(x % 256, y % 256, 0) for y in range(300) for x in range(300)])
+    buf = io.BytesIO()
+    img.save(buf, fmt)
+    return buf.getvalue()
+
+@pytest.mark.parametrize("fmt", ["BMP", "TIFF"])
+@pytest.mark.parametrize("evidence_type", ["screenshot", "document"])
+def test_uncompressed_image_formats_are_not_compressed(tmp_path, fmt, evidence_type):
+    engine = EvidenceEngine(tmp_path / "store", compression_setting="gzip")
+    metadata = engine.store_evidence(_image_bytes(fmt), "CASE-1", evidence_type)
+    
+    assert metadata["compression"] is None
+    assert metadata["similarity"]["kind"] == "image"
+
+@pytest.mark.parametrize("codec", [c for c in compression.SUFFIXES if compression.available(c)])
+def test_thumbnail_and_image_hash_read_compressed_images(tmp_path, codec):
+    source = tmp_path / "image.bmp"
+    source.write_bytes(_image_bytes("BMP"))
+    stored = tmp_path / ("image.dat" + compression.SUFFIXES[codec])
+    compression.copy_blob(source, stored, codec)
+    
+    assert create_thumbnail(stored, tmp_path / "thumb.jpg")
+    assert image_hash(stored) == image_hash(source)
+
+def test_verify_counts_original_bytes_of_compressed_evidence(tmp_path):
+    engine = EvidenceEngine(tmp_path / "store", compression_setting="gzip")
+    content = b"compressible text\n" * 10000
+    metadata = engine.store_evidence(content, "CASE-1", "document")
+    assert metadata["compression"] == "gzip"
+    
+    before = metrics.EVIDENCE_BYTES.value(operation="verify")
+    assert engine.verify_integrity(metadata["evidence_id"])
+    assert metrics.EVIDENCE_BYTES.value(operation="verify") - before == len(content)
@@ -0,0 +1,69 @@
+import uuid
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.database import models
+from app.database.session import engine as db_engine
+from app.evidence import custody, tiering
+from app.evidence.engine import EvidenceEngine
+
+class _CustodyLog:
+    def append(self, *args, **kwargs):
+        future = Future()
+        future.set_result(None)
+        return future
+
+class _FailingUpdates:
+    """محرك تفشل معاملاته (تحديث المسار) بينما تنجح القراءة"""
+    
+    def connect(self):
+        return db_engine.connect()
+    
+    def begin(self):
+        raise OperationalError("UPDATE evidence", {}, Exception("database is locked"))
+
+@pytest.fixture
+def closed_case_evidence(sync_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(custody, "get_custody_log", lambda: _CustodyLog())
+    store = EvidenceEngine(tmp_path / "store", compression_setting="off")
+    user = models.User(username=f"u-{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@test", hashed_password="x")
+    sync_db.add(user)
+    sync_db.commit()
+    case = models.Case(
+        case_id=f"T-{uuid.uuid4().hex[:8]}", title="t", reporter_id=user.id,
+        status=models.CaseStatus.CLOSED, closed_at=datetime.utcnow() - timedelta(days=90)
+    )
+    sync_db.add(case)
+    sync_db.commit()
+    metadata = store.store_evidence(b"evidence " * 1000, case.case_id, "document")
+    sync_db.add(models.Evidence(
+        evidence_id=metadata["evidence_id"], case_id=case.id, type="document",
+        file_path=metadata["file_path"], file_hash=metadata["hash"]
+    ))
+    sync_db.commit()
+    return store, metadata
+
+def _db_path(sync_db, evidence_id: str) -> str:
+    sync_db.expire_all()
+    return sync_db.query(models.Evidence.file_path).filter(models.Evidence.evidence_id == evidence_id).scalar()
+
+def test_original_kept_until_database_points_to_archive(sync_db, tmp_path, closed_case_evidence):
+    store, metadata = closed_case_evidence
+    archive_path = tmp_path / "archive"
+    original = Path(metadata["file_path"])
+    
+    result = tiering.archive_closed_cases(_FailingUpdates(), store, archive_path, older_than_days=30)
+    assert result["failed"] >= 1
+    assert original.exists()
+    assert _db_path(sync_db, metadata["evidence_id"]) == str(original)
+    
+    # التشغيل التالي يكمل النقل دون نسخ الملف مرة أخرى
+    result = tiering.archive_closed_cases(db_engine, store, archive_path, older_than_days=30)
+    archived = _db_path(sync_db, metadata["evidence_id"])
+    assert archived.startswith(str(archive_path)) and Path(archived).exists()
+    assert not original.exists()
+    assert store.verify_integrity(metadata["evidence_id"])
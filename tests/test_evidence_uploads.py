@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+from app.evidence.engine import EvidenceEngine, EvidenceTooLargeError
+from app.evidence.uploads import UploadIntegrityError, UploadSessionError, UploadSessionManager
+
+class _Body:
+    """مصدر متدفق بواجهة read() غير المتزامنة"""
+
+    def __init__(self, content: bytes):
+        self._stream = io.BytesIO(content)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+@pytest.fixture
+def sessions(tmp_path):
+    return UploadSessionManager(EvidenceEngine(tmp_path / "store"))
+
+def _write(sessions, upload_id, number, content, **kwargs):
+    return asyncio.run(sessions.write_part(upload_id, number, _Body(content), **kwargs))
+
+def test_rejected_retry_keeps_the_received_part(sessions):
+    upload_id = sessions.initiate("CASE-1", "document", user_id=1)["upload_id"]
+    _write(sessions, upload_id, 1, b"first part")
+
+    with pytest.raises(UploadIntegrityError):
+        _write(sessions, upload_id, 1, b"corrupted", expected_hash="0" * 64)
+
+    assert [p["hash"] for p in sessions.list_parts(upload_id)] == [hashlib.sha256(b"first part").hexdigest()]
+    metadata = sessions.complete(upload_id, index_similarity=False)
+    assert metadata["hash"] == hashlib.sha256(b"first part").hexdigest()
+
+def test_failed_part_leaves_no_temporary_files(sessions):
+    upload_id = sessions.initiate("CASE-1", "document", user_id=1)["upload_id"]
+    with pytest.raises(UploadIntegrityError):
+        _write(sessions, upload_id, 1, b"data", expected_hash="0" * 64)
+
+    assert sorted(p.name for p in sessions._session_dir(upload_id).iterdir()) == ["session.json"]
+
+def test_parts_are_limited_by_the_session_total(sessions):
+    upload_id = sessions.initiate("CASE-1", "document", user_id=1)["upload_id"]
+    _write(sessions, upload_id, 1, b"x" * 60, max_size=100)
+
+    with pytest.raises(EvidenceTooLargeError):
+        _write(sessions, upload_id, 2, b"x" * 60, max_size=100)
+    # استبدال جزء لا يُحسب مع نسخته السابقة
+    _write(sessions, upload_id, 1, b"y" * 90, max_size=100)
+
+    assert [p["size"] for p in sessions.list_parts(upload_id)] == [90]
+
+def test_parts_are_limited_by_the_declared_size(sessions):
+    upload_id = sessions.initiate("CASE-1", "document", user_id=1, total_size=10)["upload_id"]
+    _write(sessions, upload_id, 1, b"x" * 8)
+
+    with pytest.raises(EvidenceTooLargeError):
+        _write(sessions, upload_id, 2, b"x" * 3)
+
+def test_cleanup_removes_only_abandoned_sessions(sessions):
+    old = sessions.initiate("CASE-1", "document", user_id=1)["upload_id"]
+    fresh = sessions.initiate("CASE-1", "document", user_id=1)["upload_id"]
+    hour_ago = time.time() - 3600
+    os.utime(sessions._session_dir(old), (hour_ago, hour_ago))
+
+    assert sessions.cleanup_expired(max_age=600) == 1
+    assert not sessions._session_dir(old).exists()
+    assert sessions.get_session(fresh)["upload_id"] == fresh
+
+def test_concurrent_complete_is_rejected(sessions):
+    upload_id = sessions.initiate("CASE-1", "document", user_id=1)["upload_id"]
+    _write(sessions, upload_id, 1, b"content")
+
+    with sessions._session_lock(upload_id):
+        with pytest.raises(UploadSessionError):
+            sessions.complete(upload_id, index_similarity=False)
+
+    sessions.complete(upload_id, index_similarity=False)
+    # الجلسة حُذفت بعد الإكمال الأول
+    with pytest.raises(UploadSessionError):
+        sessions.complete(upload_id, index_similarity=False)
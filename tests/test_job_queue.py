@@ -0,0 +1,90 @@
+import threading
+import time
+
+from app.pipeline.queue import DONE, QUEUED, RUNNING, JobQueue
+from app.pipeline.worker import Worker
+
+def test_stale_worker_cannot_finish_reclaimed_job(tmp_path):
+    queue = JobQueue(tmp_path / "queue.sqlite3", lease_seconds=0.05)
+    job_id = queue.enqueue("k", {})
+    
+    assert queue.claim("a")["job_id"] == job_id
+    time.sleep(0.1)
+    # العقد انتهى فيحجزها عامل آخر
+    assert queue.claim("b")["job_id"] == job_id
+    
+    assert not queue.complete(job_id, "a", {"by": "a"})
+    assert not queue.fail(job_id, "a", "error")
+    assert not queue.renew(job_id, "a")
+    assert queue.get(job_id)["status"] == RUNNING
+    
+    assert queue.complete(job_id, "b", {"by": "b"})
+    assert queue.get(job_id)["result"] == {"by": "b"}
+
+def test_fail_requeues_only_for_owner(tmp_path):
+    queue = JobQueue(tmp_path / "queue.sqlite3", retry_delay=0)
+    job_id = queue.enqueue("k", {})
+    queue.claim("a")
+    assert queue.fail(job_id, "a", "error")
+    assert queue.get(job_id)["status"] == QUEUED
+
+def test_worker_renews_lease_while_handler_runs(tmp_path):
+    queue = JobQueue(tmp_path / "queue.sqlite3", lease_seconds=0.2)
+    job_id = queue.enqueue("slow", {})
+    claimed_by_other = []
+    
+    def slow(payload):
+        # أطول من العقد بعدة مرات؛ عامل آخر يحاول الحجز أثناءها
+        for _ in range(6):
+            time.sleep(0.1)
+            claimed_by_other.append(queue.claim("other"))
+        return {"ok": True}
+    
+    worker = Worker(queue, {"slow": slow})
+    thread = threading.Thread(target=worker.run_once)
+    thread.start()
+    thread.join()
+    
+    assert claimed_by_other == [None] * 6
+    job = queue.get(job_id)
+    assert job["status"] == DONE and job["attempts"] == 1
+
+def test_enqueue_missing_skips_existing_jobs(tmp_path):
+    queue = JobQueue(tmp_path / "queue.sqlite3")
+    queue.enqueue("k", {"case_id": "A"})
+    payloads = [{"case_id": "A"}, {"case_id": "B"}]
+    
+    assert queue.enqueue_missing("k", payloads, key="case_id") == 1
+    assert queue.enqueue_missing("k", payloads, key="case_id") == 0
+    assert sorted(job["payload"]["case_id"] for job in queue.list_jobs()) == ["A", "B"]
+
+def test_recovery_includes_cases_with_an_explicit_category(tmp_path, sync_db, monkeypatch):
+    from datetime import datetime, timedelta, timezone
+    import uuid
+    
+    from app.core.config import settings
+    from app.database import models
+    from app.pipeline.stages import CLASSIFY_CASE, recover_unclassified_cases
+    
+    monkeypatch.setattr(settings, "PIPELINE_RECOVERY_GRACE_SECONDS", 0)
+    marker = uuid.uuid4().hex[:8].upper()
+    created_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    cases = [
+        models.Case(case_id=f"CASE-{marker}U", title="t", description="d", category="unknown", created_at=created_at),
+        models.Case(case_id=f"CASE-{marker}F", title="t", description="d", category="fraud", created_at=created_at),
+    ]
+    sync_db.add_all(cases)
+    sync_db.commit()
+    
+    queue = JobQueue(tmp_path / "queue.sqlite3")
+    try:
+        recover_unclassified_cases(queue)
+        jobs = {}
+        while (job := queue.claim("w", kinds=[CLASSIFY_CASE])) is not None:
+            jobs[job["payload"]["case_id"]] = job["payload"]["set_category"]
+        assert jobs[f"CASE-{marker}U"] is True
+        assert jobs[f"CASE-{marker}F"] is False
+    finally:
+        for case in cases:
+            sync_db.delete(case)
+        sync_db.commit()
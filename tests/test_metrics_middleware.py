@@ -0,0 +1,96 @@
+import asyncio
+import pstats
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.endpoints import metrics as metrics_endpoint
+from app.api.middleware import MetricsMiddleware
+from app.core.auth import create_access_token
+from app.core.config import settings
+from app.database import models
+
+def other_request_work():
+    return sum(range(1000))
+
+def profiled_request_work():
+    return sum(range(1000))
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_PATH", tmp_path / "profiles")
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_endpoint.router)
+
+    @app.get("/slow")
+    async def slow():
+        for _ in range(5):
+            profiled_request_work()
+            await asyncio.sleep(0.01)
+        return {}
+
+    @app.get("/busy")
+    async def busy():
+        for _ in range(5):
+            other_request_work()
+            await asyncio.sleep(0.005)
+        return {}
+
+    return app
+
+@pytest.fixture
+def users(sync_db):
+    created = [
+        models.User(username="profile-admin", email="pa@example.com", hashed_password="-",
+                    role=models.UserRole.ADMIN),
+        models.User(username="profile-analyst", email="pn@example.com", hashed_password="-",
+                    role=models.UserRole.ANALYST),
+    ]
+    sync_db.add_all(created)
+    sync_db.commit()
+    yield
+    for user in created:
+        sync_db.delete(user)
+    sync_db.commit()
+
+async def _get(app, path: str, **headers):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+def test_profile_role_comes_from_the_database_not_the_token(app, users):
+    # توكن يدّعي دور المسؤول لمستخدم دوره محلل
+    token = create_access_token({"sub": "profile-analyst", "role": models.UserRole.ADMIN.value})
+    response = asyncio.run(_get(app, "/slow", **{"X-Profile": "1", "Authorization": f"Bearer {token}"}))
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+def test_profile_excludes_concurrent_requests(app, users):
+    token = create_access_token({"sub": "profile-admin"})
+
+    async def run():
+        return await asyncio.gather(
+            _get(app, "/slow", **{"X-Profile": "1", "Authorization": f"Bearer {token}"}),
+            _get(app, "/busy")
+        )
+
+    profiled, _ = asyncio.run(run())
+    profile_id = profiled.headers["x-profile-id"]
+    stats = pstats.Stats(str(settings.PROFILE_PATH / f"{profile_id}.prof")).stats
+    functions = {name for (_, _, name) in stats}
+
+    assert "profiled_request_work" in functions
+    assert "other_request_work" not in functions
+
+def test_metrics_require_a_token_by_default(app, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    assert asyncio.run(_get(app, "/metrics")).status_code == 401
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secret")
+    assert asyncio.run(_get(app, "/metrics")).status_code == 401
+    assert asyncio.run(_get(app, "/metrics", Authorization="Bearer secret")).status_code == 200
+
+    monkeypatch.setattr(settings, "METRICS_PUBLIC", True)
+    assert asyncio.run(_get(app, "/metrics")).status_code == 200
@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.multipart import StreamingForm, check_content_length
+from app.evidence.engine import EvidenceTooLargeError, stream_to_temp
+
+MAX_SIZE = 1024
+BOUNDARY = "test-boundary"
+
+def _app(tmp_path, consumed: list) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        check_content_length(request, MAX_SIZE)
+        fields = {}
+        try:
+            async for part in StreamingForm(request):
+                if part.filename is None:
+                    fields[part.name] = await part.text()
+                else:
+                    fields[part.name] = await stream_to_temp(part, tmp_path / "upload.part", MAX_SIZE)
+        except EvidenceTooLargeError:
+            return {"rejected_after_chunks": len(consumed)}
+        return fields
+
+    return app
+
+def _body(file_content: bytes):
+    yield (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"case_id\"\r\n\r\nCASE-1\r\n"
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.bin\"\r\n\r\n"
+    ).encode()
+    for i in range(0, len(file_content), 256):
+        yield file_content[i:i + 256]
+    yield (
+        f"\r\n--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"sha256\"\r\n\r\nabc\r\n"
+        f"--{BOUNDARY}--\r\n"
+    ).encode()
+
+def _post(client: TestClient, body, consumed: list):
+    def tracked():
+        for chunk in body:
+            consumed.append(len(chunk))
+            yield chunk
+    return client.post(
+        "/upload", content=tracked(),
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+
+def test_fields_before_and_after_the_file_are_read(tmp_path):
+    consumed = []
+    response = _post(TestClient(_app(tmp_path, consumed)), _body(b"x" * 600), consumed)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["case_id"] == "CASE-1"
+    assert data["sha256"] == "abc"
+    assert data["file"][1] == 600
+    assert (tmp_path / "upload.part").read_bytes() == b"x" * 600
+
+def test_oversized_file_is_rejected_before_the_body_is_read(tmp_path):
+    # TestClient يقرأ الجسم كاملاً قبل تمريره، لذا يُستدعى التطبيق مباشرة
+    chunks = list(_body(b"x" * (MAX_SIZE * 64)))
+    consumed = []
+    sent = []
+
+    async def receive():
+        chunk = chunks[len(consumed)]
+        consumed.append(len(chunk))
+        return {"type": "http.request", "body": chunk, "more_body": len(consumed) < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/upload", "raw_path": b"/upload",
+        "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    }
+    asyncio.run(_app(tmp_path, consumed)(scope, receive, send))
+
+    body = json.loads(b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body"))
+    # الرفض بعد تجاوز الحد بقليل وليس بعد استلام الجسم كله
+    assert body["rejected_after_chunks"] < 10 < len(chunks)
+    assert not (tmp_path / "upload.part").exists()
+
+def test_declared_content_length_over_limit_is_rejected(tmp_path):
+    client = TestClient(_app(tmp_path, []))
+    response = client.post(
+        "/upload", content=b"",
+        headers={
+            "Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+            "Content-Length": str(MAX_SIZE * 1024)
+        }
+    )
+
+    assert response.status_code == 413
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+from app.rules_engine.classifier import DEFAULT_RULES
+from app.rules_engine.registry import RuleRegistry
+
+def test_refresh_runs_off_the_event_loop(tmp_path):
+    registry = RuleRegistry(tmp_path, DEFAULT_RULES, check_interval=60)
+    refresh_threads = []
+    refresh = registry._refresh
+
+    def recording_refresh():
+        refresh_threads.append(threading.get_ident())
+        refresh()
+
+    registry._refresh = recording_refresh
+
+    async def run():
+        loop_thread = threading.get_ident()
+        first = await registry.current_async()
+        second = await registry.current_async()
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(run())
+
+    assert first is second
+    # الترجمة الأولى فقط، وخارج خيط الحلقة؛ الطلب الثاني من المسار السريع
+    assert len(refresh_threads) == 1
+    assert refresh_threads[0] != loop_thread
+    registry.close()
+
+def test_warm_up_compiles_the_active_version(tmp_path):
+    registry = RuleRegistry(tmp_path, DEFAULT_RULES)
+    registry.warm_up().join()
+
+    assert registry._current is not None
+    assert registry._current.version == registry.active_version()
+    registry.close()
@@ -0,0 +1,23 @@
+import json
+
+from app.benchmarks import bench_startup
+
+# أوسع من حد الأداة (0.25) لتذبذب أجهزة CI المشتركة؛ التراجع الحقيقي أكبر بكثير
+TOLERANCE = 0.5
+
+def test_startup_within_committed_baseline():
+    baseline = json.loads(bench_startup.BASELINE_PATH.read_text(encoding="utf-8"))
+    result = bench_startup.measure(runs=3)
+
+    assert bench_startup.compare(result, baseline, TOLERANCE) == []
+
+def test_compare_is_relative_to_the_reference():
+    baseline = {"import_ms": 600, "first_request_ms": 700, "reference_ms": 200}
+    # جهاز أبطأ بمرتين: ليس تراجعًا
+    assert bench_startup.compare(
+        {"import_ms": 1200, "first_request_ms": 1400, "reference_ms": 400}, baseline, 0.25
+    ) == []
+    # نفس الجهاز وبدء أبطأ بمرتين: تراجع
+    assert len(bench_startup.compare(
+        {"import_ms": 600, "first_request_ms": 1400, "reference_ms": 200}, baseline, 0.25
+    )) == 1